@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic OSM-like tables for benchmarking
+
+The tables mimic the layout of the Geofabrik shapefiles that geomancer is
+usually casted against (:code:`gis_osm_pois_free_1` and
+:code:`gis_osm_roads_free_1`): an :code:`osm_id`, a feature class in
+:code:`fclass`, a :code:`name`, and the geometry as :code:`WKT`. Features are
+drawn within a bounding box, partly around a few dense centers to mimic
+cities, with a seeded random generator so that runs are reproducible:
+
+    .. code-block:: python
+
+        from benchmarks.generate import pois, roads, targets, write_sqlite
+
+        write_sqlite(
+            "benchmarks/data/bench.sqlite",
+            {
+                "gis_osm_pois_free_1": pois(100000),
+                "gis_osm_roads_free_1": roads(10000),
+            },
+        )
+        df = targets(10000)
+"""
+
+# Import standard library
+import os
+import sqlite3
+
+# Import modules
+import numpy as np
+import pandas as pd
+
+# Metro Manila, where the sample points of the tests are
+BBOX = (120.95, 14.40, 121.15, 14.78)
+
+# Relative frequency of the POI feature classes, roughly as in OSM extracts
+POI_CLASSES = {
+    "restaurant": 0.20,
+    "convenience": 0.15,
+    "school": 0.12,
+    "bank": 0.10,
+    "pharmacy": 0.10,
+    "cafe": 0.10,
+    "supermarket": 0.08,
+    "hospital": 0.05,
+    "police": 0.05,
+    "fire_station": 0.04,
+    "embassy": 0.01,
+}
+
+ROAD_CLASSES = {
+    "residential": 0.45,
+    "service": 0.20,
+    "footway": 0.12,
+    "tertiary": 0.10,
+    "secondary": 0.07,
+    "primary": 0.05,
+    "trunk": 0.01,
+}
+
+# Approximate length of a degree of latitude
+METERS_PER_DEGREE = 111320.0
+
+
+def points(
+    size,
+    bbox=BBOX,
+    clustering=0.5,
+    centers=5,
+    spread=0.02,
+    seed=0,
+    center_seed=0,
+):
+    """Draw longitudes and latitudes within a bounding box
+
+    Parameters
+    ----------
+    size : int
+        Number of points
+    bbox : tuple of float, optional
+        Bounding box as :code:`(min_lon, min_lat, max_lon, max_lat)`
+    clustering : float, optional
+        Fraction of the points drawn around the centers instead of uniformly.
+        Default is :code:`0.5`
+    centers : int, optional
+        Number of dense centers. Default is :code:`5`
+    spread : float, optional
+        Standard deviation in degrees of the points around their center.
+        Default is :code:`0.02`
+    seed : int, optional
+        Seed of the random generator. Default is :code:`0`
+    center_seed : int, optional
+        Seed of the centers. Tables generated with the same one share their
+        dense centers. Default is :code:`0`
+
+    Returns
+    -------
+    (:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        Longitudes and latitudes
+    """
+    rng = np.random.RandomState(seed)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lon = rng.uniform(min_lon, max_lon, size)
+    lat = rng.uniform(min_lat, max_lat, size)
+    clustered = rng.uniform(size=size) < clustering
+    if centers and clustered.any():
+        # Centers are drawn with their own seed so that POIs, roads, and
+        # targets are dense in the same places
+        center_rng = np.random.RandomState(center_seed)
+        center_lon = center_rng.uniform(min_lon, max_lon, centers)
+        center_lat = center_rng.uniform(min_lat, max_lat, centers)
+        which = rng.randint(centers, size=clustered.sum())
+        lon[clustered] = rng.normal(center_lon[which], spread)
+        lat[clustered] = rng.normal(center_lat[which], spread)
+    return (
+        np.clip(lon, min_lon, max_lon),
+        np.clip(lat, min_lat, max_lat),
+    )
+
+
+def pois(size, classes=POI_CLASSES, seed=0, **kwargs):
+    """Generate a table of points-of-interest
+
+    Parameters
+    ----------
+    size : int
+        Number of POIs
+    classes : dict, optional
+        Relative frequency of each feature class
+    seed : int, optional
+        Seed of the random generator. Default is :code:`0`
+    **kwargs
+        Passed to :code:`points`
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        POIs with :code:`osm_id`, :code:`fclass`, :code:`name`, and
+        :code:`WKT` columns
+    """
+    lon, lat = points(size, seed=seed, **kwargs)
+    fclass = _classes(size, classes, seed)
+    return pd.DataFrame(
+        {
+            "osm_id": np.arange(1, size + 1),
+            "fclass": fclass,
+            "name": ["{} {}".format(c, i) for i, c in enumerate(fclass)],
+            "WKT": _wkt_points(lon, lat),
+        },
+        columns=["osm_id", "fclass", "name", "WKT"],
+    )
+
+
+def roads(
+    size, classes=ROAD_CLASSES, vertices=(2, 8), step=150, seed=0, **kwargs
+):
+    """Generate a table of roads as random walks
+
+    Parameters
+    ----------
+    size : int
+        Number of roads
+    classes : dict, optional
+        Relative frequency of each feature class
+    vertices : tuple of int, optional
+        Minimum and maximum number of vertices per road. Default is
+        :code:`(2, 8)`
+    step : float, optional
+        Mean length in meters of a road segment. Default is :code:`150`
+    seed : int, optional
+        Seed of the random generator. Default is :code:`0`
+    **kwargs
+        Passed to :code:`points` to place the start of the roads
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Roads with :code:`osm_id`, :code:`fclass`, :code:`name`, and
+        :code:`WKT` columns
+    """
+    rng = np.random.RandomState(seed + 2)
+    lon, lat = points(size, seed=seed, **kwargs)
+    counts = rng.randint(vertices[0], vertices[1] + 1, size)
+    fclass = _classes(size, classes, seed)
+    wkt = []
+    for x, y, count in zip(lon, lat, counts):
+        heading = rng.uniform(0, 2 * np.pi)
+        # Mostly straight roads that bend a little at each vertex
+        headings = heading + np.cumsum(rng.normal(0, 0.3, count - 1))
+        lengths = rng.exponential(step, count - 1) / METERS_PER_DEGREE
+        xs = x + np.concatenate([[0], np.cumsum(lengths * np.cos(headings))])
+        ys = y + np.concatenate([[0], np.cumsum(lengths * np.sin(headings))])
+        wkt.append(
+            "LINESTRING ({})".format(
+                ", ".join("{:.7f} {:.7f}".format(*xy) for xy in zip(xs, ys))
+            )
+        )
+    return pd.DataFrame(
+        {
+            "osm_id": np.arange(1, size + 1),
+            "fclass": fclass,
+            "name": ["{} {}".format(c, i) for i, c in enumerate(fclass)],
+            "WKT": wkt,
+        },
+        columns=["osm_id", "fclass", "name", "WKT"],
+    )
+
+
+def targets(size, seed=0, **kwargs):
+    """Generate target points to cast spells on
+
+    Parameters
+    ----------
+    size : int
+        Number of points
+    seed : int, optional
+        Seed of the random generator. Default is :code:`0`
+    **kwargs
+        Passed to :code:`points`
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Points in a :code:`WKT` column
+    """
+    lon, lat = points(size, seed=seed + 100, **kwargs)
+    return pd.DataFrame({"WKT": _wkt_points(lon, lat)})
+
+
+def write_sqlite(path, tables):
+    """Write tables into a new SQLite database
+
+    Any existing database at the path is replaced. Spatial indexes are not
+    built here: :code:`SQLiteCore.prepare_source` builds them with
+    SpatiaLite.
+
+    Parameters
+    ----------
+    path : str
+        Path of the database file
+    tables : dict
+        Mapping of table names to :class:`pandas.DataFrame`
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        for name, df in tables.items():
+            df.to_sql(name, con=conn, index=False)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _classes(size, classes, seed):
+    """Draw feature classes according to their relative frequency"""
+    rng = np.random.RandomState(seed + 3)
+    names = list(classes)
+    weights = np.array([classes[name] for name in names], dtype=float)
+    return np.array(names)[
+        rng.choice(len(names), size=size, p=weights / weights.sum())
+    ]
+
+
+def _wkt_points(lon, lat):
+    """Format coordinates as WKT points"""
+    return ["POINT ({:.7f} {:.7f})".format(x, y) for x, y in zip(lon, lat)]
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""Time spells and spellbooks on synthetic data
+
+For every number of POIs, a SpatiaLite database of synthetic POIs and roads is
+generated (see :mod:`benchmarks.generate`) and its spatial indexes are built.
+Each spell, and a :code:`SpellBook` of all of them, is then casted on targets
+of increasing size. For every case, the best wall time out of a few repeats,
+the throughput in targets per second, the peak memory traced by
+:mod:`tracemalloc`, and the time spent per stage of the cast (see
+:mod:`geomancer.instrumentation`) are reported:
+
+    .. code-block:: shell
+
+        python -m benchmarks.run --targets 1000 10000 100000 1000000 \\
+            --pois 10000 100000 --output benchmarks/results.csv
+
+Results are appended to the output CSV along with the current commit, so
+that runs can be compared over time. New targets are generated for each
+repeat, so that uploads are not served from the cores' upload cache.
+"""
+
+# Import standard library
+import argparse
+import datetime
+import os
+import subprocess
+import time
+import tracemalloc
+from collections import OrderedDict
+
+# Import modules
+import pandas as pd
+from loguru import logger
+
+# Import from package
+from geomancer.backend.cores import LocalCore, SQLiteCore
+from geomancer.instrumentation import Collector
+from geomancer.spellbook import SpellBook
+from geomancer.spells import DistanceToNearest, LengthOf, NumberOf
+
+from . import generate
+
+POIS_TABLE = "gis_osm_pois_free_1"
+ROADS_TABLE = "gis_osm_roads_free_1"
+
+# Stages reported as columns, see geomancer.instrumentation
+STAGES = ["get_core", "load", "reflect", "query", "fetch", "frame", "evaluate"]
+
+
+def spells(dburl, backend):
+    """Spells to benchmark, keyed on their case name
+
+    LengthOf is only benchmarked on SQL backends since LocalCore cannot
+    evaluate it.
+    """
+    cases = OrderedDict(
+        [
+            (
+                "DistanceToNearest",
+                DistanceToNearest(
+                    "hospital",
+                    source_table=POIS_TABLE,
+                    feature_name="dist_hospital",
+                    dburl=dburl,
+                ),
+            ),
+            (
+                "NumberOf",
+                NumberOf(
+                    "restaurant",
+                    within=1000,
+                    source_table=POIS_TABLE,
+                    feature_name="num_restaurant",
+                    dburl=dburl,
+                ),
+            ),
+        ]
+    )
+    if backend != "local":
+        cases["LengthOf"] = LengthOf(
+            "residential",
+            within=1000,
+            source_table=ROADS_TABLE,
+            feature_name="len_residential",
+            dburl=dburl,
+        )
+    return cases
+
+
+def prepare(backend, num_pois, directory, segment_length=None):
+    """Generate the source tables and get the database url to cast with
+
+    Parameters
+    ----------
+    backend : str
+        :code:`sqlite` or :code:`local`
+    num_pois : int
+        Number of POIs. One road is generated for every ten POIs.
+    directory : str
+        Directory to write the SQLite databases in
+    segment_length : float, optional
+        Subdivide the roads into pieces of at most this many meters, see
+        :code:`DBCore.prepare_segments`. Default is not to subdivide them
+
+    Returns
+    -------
+    str
+        Database url
+    """
+    tables = {
+        POIS_TABLE: generate.pois(num_pois),
+        ROADS_TABLE: generate.roads(max(num_pois // 10, 1)),
+    }
+    if backend == "local":
+        core = LocalCore.instance("local://")
+        for name, df in tables.items():
+            core.register_table(name, df)
+        return "local://"
+    path = os.path.join(directory, "bench_{}.sqlite".format(num_pois))
+    generate.write_sqlite(path, tables)
+    dburl = "sqlite:///{}".format(path)
+    core = SQLiteCore.instance(dburl)
+    # Tables were replaced, so drop what the core knows about them
+    core.invalidate()
+    for name in tables:
+        core.prepare_source(name)
+    if segment_length:
+        core.prepare_segments(ROADS_TABLE, segment_length)
+    return dburl
+
+
+def measure(cast, size, repeat, memory):
+    """Time a cast on fresh targets
+
+    Parameters
+    ----------
+    cast : callable
+        Function casting on a target dataframe
+    size : int
+        Number of targets
+    repeat : int
+        Number of timed casts, the best of which is kept
+    memory : bool
+        Also trace the peak memory of an additional cast
+
+    Returns
+    -------
+    :class:`collections.OrderedDict`
+        Best seconds, throughput, peak memory, and mean seconds per stage
+    """
+    times = []
+    with Collector() as collector:
+        for i in range(repeat):
+            target = generate.targets(size, seed=i)
+            start = time.perf_counter()
+            cast(target)
+            times.append(time.perf_counter() - start)
+    best = min(times)
+    result = OrderedDict(
+        [
+            ("seconds", best),
+            ("targets_per_second", size / best if best else float("inf")),
+            ("peak_mb", None),
+        ]
+    )
+    if memory:
+        target = generate.targets(size, seed=repeat)
+        tracemalloc.start()
+        try:
+            cast(target)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = peak / 2**20
+    summary = collector.summary()
+    for stage in STAGES:
+        seconds = (
+            summary.loc[stage, "seconds"] if stage in summary.index else 0.0
+        )
+        result["{}_seconds".format(stage)] = seconds / repeat
+    return result
+
+
+def commit():
+    """Short hash of the current commit, if in a git repository"""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("utf-8")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(
+    backends=("sqlite",),
+    targets=(1000, 10000),
+    pois=(10000,),
+    repeat=3,
+    memory=True,
+    max_workers=None,
+    directory="benchmarks/data",
+    segment_length=None,
+):
+    """Run the benchmarks
+
+    Parameters
+    ----------
+    backends : list of str, optional
+        Backends to benchmark, :code:`sqlite` or :code:`local`
+    targets : list of int, optional
+        Numbers of targets to cast on
+    pois : list of int, optional
+        Numbers of POIs in the source table
+    repeat : int, optional
+        Number of timed casts per case. Default is :code:`3`
+    memory : bool, optional
+        Trace the peak memory of each case. Default is :code:`True`
+    max_workers : int, optional
+        Workers used by :code:`SpellBook.cast`. Default is to cast
+        sequentially
+    directory : str, optional
+        Directory to write the SQLite databases in
+    segment_length : float, optional
+        Subdivide the roads into pieces of at most this many meters. Default
+        is not to subdivide them
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        One row per case
+    """
+    rows = []
+    info = OrderedDict(
+        [
+            ("commit", commit()),
+            ("timestamp", datetime.datetime.now().isoformat()),
+        ]
+    )
+    for backend in backends:
+        for num_pois in pois:
+            dburl = prepare(backend, num_pois, directory, segment_length)
+            cases = spells(dburl, backend)
+            casts = OrderedDict(
+                (name, spell.cast) for name, spell in cases.items()
+            )
+            spellbook = SpellBook(list(cases.values()))
+            casts["SpellBook"] = lambda df: spellbook.cast(
+                df, max_workers=max_workers
+            )
+            for size in targets:
+                for name, cast in casts.items():
+                    logger.info(
+                        "Casting {} on {} targets and {} POIs ({})".format(
+                            name, size, num_pois, backend
+                        )
+                    )
+                    row = OrderedDict(info)
+                    row.update(
+                        [
+                            ("backend", backend),
+                            ("case", name),
+                            ("targets", size),
+                            ("pois", num_pois),
+                            ("segment_length", segment_length),
+                        ]
+                    )
+                    row.update(measure(cast, size, repeat, memory))
+                    rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["sqlite"],
+        choices=["sqlite", "local"],
+        help="backends to benchmark",
+    )
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        type=int,
+        default=[1000, 10000, 100000],
+        help="numbers of targets to cast on",
+    )
+    parser.add_argument(
+        "--pois",
+        nargs="+",
+        type=int,
+        default=[10000, 100000],
+        help="numbers of POIs in the source table",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed casts per case"
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="do not trace peak memory",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="workers used by SpellBook.cast",
+    )
+    parser.add_argument(
+        "--directory",
+        default="benchmarks/data",
+        help="directory to write the SQLite databases in",
+    )
+    parser.add_argument(
+        "--segment-length",
+        type=float,
+        default=None,
+        help="subdivide the roads into pieces of at most this many meters",
+    )
+    parser.add_argument(
+        "--output", default=None, help="CSV file to append the results to"
+    )
+    args = parser.parse_args(argv)
+
+    # Spells log at INFO and above, which would drown the progress messages
+    logger.disable("geomancer")
+
+    results = run(
+        backends=args.backends,
+        targets=args.targets,
+        pois=args.pois,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+        max_workers=args.max_workers,
+        directory=args.directory,
+        segment_length=args.segment_length,
+    )
+    columns = [
+        "backend",
+        "case",
+        "targets",
+        "pois",
+        "seconds",
+        "targets_per_second",
+        "peak_mb",
+    ]
+    print(results[columns].to_string(index=False, float_format="%.3f"))
+    if args.output:
+        exists = os.path.exists(args.output)
+        results.to_csv(args.output, mode="a", header=not exists, index=False)
+
+
+if __name__ == "__main__":
+    main()
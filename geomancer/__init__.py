@@ -3,7 +3,7 @@
 """Geomancer"""
 
 import os
-from .backend.settings import BQConfig, SQLiteConfig
+from .backend.settings import BQConfig, LocalConfig, SQLiteConfig
 
 os.environ["LOGURU_LEVEL"] = "INFO"
 
@@ -11,4 +11,4 @@ __version__ = "1.1.0"
 __author__ = "Thinking Machines Data Science"
 __email__ = "hello@thinkingmachin.es"
 
-__all__ = ["BQConfig", "SQLiteConfig"]
+__all__ = ["BQConfig", "LocalConfig", "SQLiteConfig"]
@@ -6,7 +6,9 @@ databases. We strive for Geomaner to be database-agnostic: a query should
 ideally be executable across **all** types of data warehouse.
 """
 
+from .base import close_all
 from .bq import BigQueryCore
+from .local import LocalCore
 from .sqlite import SQLiteCore
 
-__all__ = ["BigQueryCore", "SQLiteCore"]
+__all__ = ["BigQueryCore", "LocalCore", "SQLiteCore", "close_all"]
@@ -5,17 +5,91 @@
 A DBCore is simply a database backend. It can be BigQuery, PostGIS, or an
 SQLite database. Whenever you want to add a new DBCore, simply
 subclass from the base :code:`DBCore` class and implement the required methods
+
+Cores are meant to be long-lived. :code:`DBCore.instance` returns a
+process-wide core for a given database url and configuration, so that engines,
+connection pools, and clients are set up once and reused across casts:
+
+    .. code-block:: python
+
+        from geomancer.backend.cores import SQLiteCore, close_all
+
+        core = SQLiteCore.instance("sqlite:///source.sqlite")
+        assert core is SQLiteCore.instance("sqlite:///source.sqlite")
+
+        # Dispose all pooled connections, e.g., on service shutdown
+        close_all()
 """
 
 # Import standard library
 import abc
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 
 # Import modules
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, Numeric, Text
 from sqlalchemy.engine import create_engine
 from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import NoSuchTableError
 from sqlalchemy.schema import MetaData, Table
+from sqlalchemy.sql import func, literal, null, select, union_all
+from sqlalchemy.sql.sqltypes import NullType
+
+from ... import instrumentation
+from ..settings import BQConfig, LocalConfig, SQLiteConfig
+
+# Column holding parsed geometries that cores may add to tables
+GEOMETRY_COLUMN = "__geometry__"
+
+# Suffix of the tables of subdivided source lines, see prepare_segments
+SEGMENTS_SUFFIX = "__segments"
+
+# Default maximum length in meters of subdivided source lines
+SEGMENT_LENGTH = 250
+
+# Process-wide registry of cores, keyed by (class, dburl, options)
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_REGISTRY_PID = os.getpid()
 
-from ..settings import BQConfig, SQLiteConfig
+
+def _get_registry():
+    """Return the core registry, starting afresh in a forked process
+
+    Connections cannot be shared across processes, so a child process never
+    reuses the cores of its parent. The parent's cores are simply dropped
+    (not disposed) since their connections still belong to the parent.
+    """
+    global _REGISTRY, _REGISTRY_PID
+    if _REGISTRY_PID != os.getpid():
+        _REGISTRY = {}
+        _REGISTRY_PID = os.getpid()
+    return _REGISTRY
+
+
+def _default_options(dburl):
+    """Default configuration of the core for a database url"""
+    return {
+        "bigquery": BQConfig,
+        "sqlite": SQLiteConfig,
+        "local": LocalConfig,
+    }[dburl.get_backend_name()]()
+
+
+def close_all():
+    """Close all registered cores and dispose their connection pools"""
+    with _REGISTRY_LOCK:
+        cores = list(_get_registry().values())
+    for core in cores:
+        core.close()
 
 
 class DBCore(abc.ABC):
@@ -34,11 +108,189 @@ class DBCore(abc.ABC):
             Auto-detected if not set.
         """
         self.dburl = make_url(dburl)
-        if not options:
-            options = {"bigquery": BQConfig(), "sqlite": SQLiteConfig()}[
-                self.dburl.get_backend_name()
-            ]
-        self.options = options
+        self.options = options or _default_options(self.dburl)
+        self._key = None
+        self._engine = None
+        self._engine_pid = None
+        self._engine_lock = threading.Lock()
+        self._metadata = None
+        self._tables = {}
+        self._tables_lock = threading.RLock()
+        self._unsegmented = set()
+        self._uploads = {}
+        self._upload_locks = defaultdict(threading.Lock)
+        self._uploads_lock = threading.Lock()
+        self._sessions = 0
+        self._session_tables = []
+        self._loose_tables = []
+        self._sessions_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.options.MAX_CONCURRENCY)
+
+    @classmethod
+    def instance(cls, dburl, options=None):
+        """Get the process-wide core for a database url and configuration
+
+        Cores are created on first use and shared afterwards, so repeated
+        casts against the same database reuse warm engines and clients.
+        This method is thread-safe.
+
+        Parameters
+        ----------
+        dburl : str
+            Database url used to configure backend connection
+        options : :class:`geomancer.backend.settings.Config`, optional
+            Specify configuration for interacting with the database backend.
+            Auto-detected if not set.
+
+        Returns
+        -------
+        :class:`geomancer.backend.cores.base.DBCore`
+        """
+        key = cls._registry_key(dburl, options)
+        with _REGISTRY_LOCK:
+            registry = _get_registry()
+            core = registry.get(key)
+            if core is None:
+                core = cls(dburl, options)
+                # Kept on the core, since its options may be changed later
+                core._key = key
+                registry[key] = core
+            return core
+
+    @property
+    def executor(self):
+        """str: Kind of worker pool to cast spells concurrently in
+
+        Either :code:`thread` or :code:`process`. Queries against remote
+        databases mostly wait on the network, so threads are enough.
+        """
+        return "thread"
+
+    def worker_options(self):
+        """Configuration of the cores casting in worker processes, see
+        :code:`executor`
+
+        Returns
+        -------
+        :class:`geomancer.backend.settings.Config`
+        """
+        return self.options
+
+    @property
+    def max_parameters(self):
+        """int or None: Number of parameters a query can bind, or None if
+        unlimited
+
+        Each value of an inlined target, including its index, is bound as a
+        parameter, see :code:`inline_table`.
+        """
+        return None
+
+    @property
+    def slots(self):
+        """:class:`threading.BoundedSemaphore`: Limits the number of spells
+        casted at the same time with this core, see :code:`MAX_CONCURRENCY`
+        """
+        return self._slots
+
+    def close(self):
+        """Dispose the engine's connection pool and unregister the core
+
+        Tables uploaded by this core outside of a session are dropped, see
+        :code:`session`. The core can still be used afterwards, but a new
+        engine will be created on the next call to :code:`get_engine`.
+        """
+        with self._sessions_lock:
+            tables, self._loose_tables = self._loose_tables, []
+        if tables:
+            self.drop_tables(tables)
+        with _REGISTRY_LOCK:
+            registry = _get_registry()
+            if self._key is not None and registry.get(self._key) is self:
+                del registry[self._key]
+        with self._engine_lock:
+            if self._engine is not None and self._engine_pid == os.getpid():
+                self._engine.dispose()
+            self._engine = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def session(self):
+        """Scope the tables uploaded by this core to a block of code
+
+        Tables that this core uploads while a session is open are dropped
+        once the last open session ends. Sessions nest and can be opened
+        from several threads, so a :code:`SpellBook` holds one for its whole
+        cast while each spell opens its own. Tables uploaded by other
+        processes, e.g., a target preloaded before casting in worker
+        processes, are left to the process that uploaded them.
+
+        Yields
+        ------
+        :class:`geomancer.backend.cores.base.DBCore`
+            This core
+        """
+        with self._sessions_lock:
+            self._sessions += 1
+        try:
+            yield self
+        finally:
+            with self._sessions_lock:
+                self._sessions -= 1
+                tables = []
+                if not self._sessions:
+                    tables, self._session_tables = self._session_tables, []
+            if tables:
+                self.drop_tables(tables)
+
+    def drop_tables(self, tables):
+        """Drop tables uploaded by this core
+
+        Does nothing by default: backends whose uploads expire on their own
+        keep them until then.
+
+        Parameters
+        ----------
+        tables : list of (str, str)
+            Content IDs and URIs of the tables to drop
+        """
+
+    def _track_upload(self, content_id, table_uri):
+        """Record a table created by this core, to be dropped with the
+        current session or when the core is closed
+        """
+        with self._sessions_lock:
+            if self._sessions:
+                self._session_tables.append((content_id, table_uri))
+            else:
+                self._loose_tables.append((content_id, table_uri))
+
+    def _forget_upload(self, content_id, table_uri):
+        """Remove a dropped table from the upload and metadata caches"""
+        with self._uploads_lock:
+            self._uploads.pop(content_id, None)
+        self.invalidate(table_uri)
+
+    @classmethod
+    def _registry_key(cls, dburl, options=None):
+        """Key identifying a core in the registry, computed from the values
+        of its options at the time it is registered
+        """
+        dburl = make_url(dburl)
+        options = tuple(
+            sorted(
+                (name, repr(value))
+                for name, value in cls._inspect_options(
+                    options or _default_options(dburl)
+                ).items()
+            )
+        )
+        return (cls, str(dburl), options)
 
     @abc.abstractmethod
     def ST_GeoFromText(self, x):
@@ -50,14 +302,263 @@ class DBCore(abc.ABC):
         """
         raise NotImplementedError
 
+    def within_predicate(self, target_geom, source_geom, within):
+        """Cheap predicate for geometries that may be within a distance
+
+        Spells evaluate this before the exact distance, so each core can use
+        whatever envelope test its engine evaluates fastest. It may return
+        false positives, but never false negatives.
+
+        Parameters
+        ----------
+        target_geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry of the target
+        source_geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry of the source feature
+        within : float
+            Distance in meters
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ClauseElement` or None
+            None if the core has no such predicate
+        """
+        return None
+
+    def distance(self, a, b):
+        """Distance between two geometries in meters
+
+        Spells compare it with :code:`within`, which is in meters like the
+        envelopes of :code:`within_predicate` and :code:`index_predicate`.
+        The default measures geographies, as BigQuery does.
+
+        Parameters
+        ----------
+        a : :class:`sqlalchemy.sql.expression.ColumnElement`
+            First geometry
+        b : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Second geometry
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement`
+        """
+        return func.ST_Distance(a, b)
+
+    def buffer(self, geom, within):
+        """Area within a distance of a geometry
+
+        The default buffers geographies, whose distances are in meters, as
+        BigQuery does.
+
+        Parameters
+        ----------
+        geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry to buffer
+        within : float
+            Distance in meters
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement`
+            Polygon in the same coordinate system as :code:`geom`
+        """
+        return func.ST_Buffer(geom, within)
+
+    def length(self, geom):
+        """Length of a geometry in meters
+
+        Parameters
+        ----------
+        geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Lines to measure
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement`
+        """
+        return func.ST_Length(geom)
+
+    def rowid(self, source):
+        """Column identifying source rows in the core's spatial index
+
+        Spells include this column, labeled :code:`__rowid__`, when selecting
+        features so that :code:`index_predicate` can refer to it.
+
+        Parameters
+        ----------
+        source : :class:`sqlalchemy.schema.Table`
+            Source table to extract features from.
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement` or None
+            None if the source table has no spatial index
+        """
+        return None
+
+    def index_predicate(self, source, features, target_geom, within):
+        """Predicate selecting candidate features through a spatial index
+
+        Parameters
+        ----------
+        source : :class:`sqlalchemy.schema.Table`
+            Source table the features were selected from
+        features : :class:`sqlalchemy.sql.expression.CTE`
+            Features selected from the source, see :code:`rowid`
+        target_geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry of the target
+        within : float
+            Search radius in meters
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ClauseElement` or None
+            None if the source table has no spatial index
+        """
+        return None
+
+    def geometry(self, table, column):
+        """Geometries of a table, preferring an already parsed column
+
+        Parameters
+        ----------
+        table : :class:`sqlalchemy.sql.expression.FromClause`
+            Table or common table expression to read geometries from
+        column : str
+            Column with the WKT geometries, used if the table has no
+            :code:`__geometry__` column
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement`
+        """
+        if GEOMETRY_COLUMN in table.c:
+            return table.c[GEOMETRY_COLUMN]
+        return self.ST_GeoFromText(table.c[column])
+
+    def prepare_source(self, source_uri, column="WKT"):
+        """Add a parsed geometry column to a source table
+
+        This is a one-time step: the :code:`__geometry__` column is stored in
+        the source table and picked up by the spells afterwards, so WKT
+        strings are no longer parsed on every cast.
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to prepare
+        column : str, optional
+            Column to read the WKT geometries from. Default is :code:`WKT`
+
+        Raises
+        ------
+        NotImplementedError
+            If the core does not support preparing sources
+        """
+        raise NotImplementedError
+
+    def prepare_segments(
+        self, source_uri, max_length=SEGMENT_LENGTH, column="WKT"
+    ):
+        """Subdivide the lines of a source table into a derived table
+
+        Long lines, e.g., highways, have bounding boxes overlapping many
+        targets, so they get past the index and envelope prefilters and are
+        intersected as a whole. The derived table,
+        :code:`<source_uri>__segments`, holds the lines cut into pieces of at
+        most :code:`max_length` meters, along with the other columns of their
+        line such as the source ID. Other geometries are copied as they are.
+        The table is indexed like a prepared source, and :code:`LengthOf`
+        uses it instead of the source table once it exists, see
+        :code:`segments`. Prepare it again when the source table changes.
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to subdivide
+        max_length : float, optional
+            Maximum length of the pieces in meters. Default is :code:`250`
+        column : str, optional
+            Column to read the WKT geometries from. Default is :code:`WKT`
+
+        Raises
+        ------
+        NotImplementedError
+            If the core does not support subdividing sources
+        """
+        raise NotImplementedError
+
+    def segments(self, source_uri):
+        """Get the table of subdivided lines of a source, if prepared
+
+        See :code:`prepare_segments`. Sources without one are remembered
+        until the cache is cleared with :code:`invalidate`.
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table
+
+        Returns
+        -------
+        str or None
+            URI of the derived table, None if the source was not subdivided
+        """
+        segments_uri = source_uri + SEGMENTS_SUFFIX
+        with self._tables_lock:
+            if segments_uri in self._unsegmented:
+                return None
+            try:
+                self.reflect_table(segments_uri, self.get_engine())
+            except NoSuchTableError:
+                self._unsegmented.add(segments_uri)
+                return None
+        return segments_uri
+
+    def _attribute_columns(self, source_uri, column="WKT"):
+        """Names of the columns of a source table besides its geometries"""
+        source = self.reflect_table(source_uri, self.get_engine())
+        return [
+            col.name
+            for col in source.columns
+            if col.name not in (column, GEOMETRY_COLUMN)
+        ]
+
+    def fingerprint(self, source_uri):
+        """Cheap fingerprint of a source table's contents
+
+        It changes when rows are added to or removed from the table, and is
+        used to invalidate cached features, see
+        :class:`geomancer.cache.ResultCache`.
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to fingerprint
+
+        Returns
+        -------
+        str
+
+        Raises
+        ------
+        NotImplementedError
+            If the core cannot fingerprint tables
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
-    def load(self, df):
+    def load(self, df, column=None):
         """Load a pandas.Dataframe into the database
 
         Parameters
         ----------
         df : :class:`pandas.DataFrame`
             Input dataframe
+        column : str, optional
+            Column with WKT geometries. If set, the geometries are also
+            stored parsed in a :code:`__geometry__` column.
 
         Raises
         ------
@@ -66,9 +567,16 @@ class DBCore(abc.ABC):
         """
         raise NotImplementedError
 
-    def get_tables(self, source_uri, target, engine):
+    def get_tables(self, source_uri, target, engine, column="WKT"):
         """Create tables given a :class:`sqlalchemy.engine.base.Engine`
 
+        The source table is reflected once and cached, see
+        :code:`reflect_table`. A dataframe target is uploaded and its table is
+        constructed from the dataframe's schema without reflection. Targets of
+        up to :code:`INLINE_THRESHOLD` rows are not uploaded but embedded in
+        the query, see :code:`inline_table`, unless their values are more than
+        the database can bind, see :code:`max_parameters`.
+
         Parameters
         -----------
         source_uri : str
@@ -78,6 +586,8 @@ class DBCore(abc.ABC):
             a table location found in the database.
         engine : :class:`sqlalchemy.engine.base.Engine`
             Engine with the database dialect
+        column : str, optional
+            Column with the target's WKT geometries. Default is :code:`WKT`
 
         Returns
         -------
@@ -85,29 +595,486 @@ class DBCore(abc.ABC):
             Source and Target table
         """
         if isinstance(target, str):
-            target_uri = target
+            target_table = self.reflect_table(target, engine, refresh=True)
+        elif 0 < len(target) <= self.options.INLINE_THRESHOLD and (
+            self.max_parameters is None
+            or len(target) * (len(target.columns) + 1) <= self.max_parameters
+        ):
+            with instrumentation.span("inline", rows=len(target)):
+                target_table = self.inline_table(target, column)
         else:
             # Load the dataframe to database and get its URI
-            target_uri = self.load(
-                df=target, **self._inspect_options(self.options)
+            with instrumentation.span(
+                "load",
+                rows=len(target),
+                bytes=int(target.memory_usage(deep=True).sum()),
+            ):
+                target_uri = self.load(
+                    df=target,
+                    column=column,
+                    **self._inspect_options(self.options)
+                )
+            # We know the schema of what we just uploaded, so there is no
+            # need to reflect it back from the database
+            target_table = self._table_from_dataframe(
+                target_uri, target, engine, column
             )
-        # Create SQLAlchemy primitives
-        metadata = MetaData(bind=engine)
-        source_table = Table(source_uri, metadata, autoload=True)
-        target_table = Table(target_uri, metadata, autoload=True)
+        source_table = self.reflect_table(source_uri, engine)
         return source_table, target_table
 
+    def inline_table(self, df, column=None):
+        """Embed the rows of a dataframe in a query as literals
+
+        This saves the round trips of uploading small targets to the
+        database. The rows are selected as literals and combined with
+        :code:`UNION ALL` in a common table expression, and the index is kept
+        as a column like :code:`load` does.
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Target dataframe, with at least one row
+        column : str, optional
+            Column with WKT geometries. If set, the geometries are also parsed
+            into a :code:`__geometry__` column.
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.CTE`
+            Common table expression with the same columns as the uploaded
+            table would have
+        """
+        index = df.index.name or "__index_level_0__"
+        frame = df.reset_index().rename(columns={"index": index})
+        types = [
+            (name, self._column_type(dtype))
+            for name, dtype in frame.dtypes.items()
+        ]
+        values = frame.astype(object).where(frame.notnull(), None)
+        selects = [
+            select(
+                [
+                    # NULLs cannot be rendered as typed literals
+                    (null() if value is None else literal(value, type_)).label(
+                        name
+                    )
+                    for value, (name, type_) in zip(row, types)
+                ]
+            )
+            for row in values.itertuples(index=False)
+        ]
+        rows = selects[0] if len(selects) == 1 else union_all(*selects)
+        if not column:
+            return rows.cte("__target__")
+        rows = rows.alias("__rows__")
+        return select(
+            [rows, self.ST_GeoFromText(rows.c[column]).label(GEOMETRY_COLUMN)]
+        ).cte("__target__")
+
+    def reflect_table(self, table_uri, engine, refresh=False):
+        """Reflect a table from the database, reusing cached metadata
+
+        Reflected tables are cached per engine for the lifetime of the core,
+        or up to :code:`TABLE_CACHE_TTL` seconds if that option is set.
+
+        Parameters
+        ----------
+        table_uri : str
+            Table URI to reflect
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        refresh : bool, optional
+            Reflect the table again even if it is cached. Default is
+            :code:`False`
+
+        Returns
+        -------
+        :class:`sqlalchemy.schema.Table`
+        """
+        with self._tables_lock:
+            metadata = self._get_metadata(engine)
+            cached = self._tables.get(table_uri)
+            if cached and not refresh and not self._is_expired(cached[1]):
+                return cached[0]
+            if table_uri in metadata.tables:
+                metadata.remove(metadata.tables[table_uri])
+            with instrumentation.span("reflect", table=table_uri):
+                table = self._reflect(table_uri, metadata)
+            self._tables[table_uri] = (table, time.time())
+            return table
+
+    def _reflect(self, table_uri, metadata):
+        """Reflect a table into the metadata"""
+        return Table(table_uri, metadata, autoload=True)
+
+    def invalidate(self, table_uri=None):
+        """Drop cached table metadata
+
+        Parameters
+        ----------
+        table_uri : str, optional
+            Table URI to invalidate. If not set, the whole cache is cleared.
+        """
+        with self._tables_lock:
+            if table_uri is None:
+                self._metadata = None
+                self._tables = {}
+                self._unsegmented = set()
+                return
+            self._unsegmented.discard(table_uri)
+            if table_uri in self._tables:
+                table, _ = self._tables.pop(table_uri)
+                self._metadata.remove(table)
+
+    def read_table(self, table_uri):
+        """Read a whole table from the database
+
+        Parameters
+        ----------
+        table_uri : str
+            Table URI to read
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+        """
+        engine = self.get_engine()
+        table = self.reflect_table(table_uri, engine, refresh=True)
+        return self.fetch_frame(engine, select([table]))
+
+    def _get_metadata(self, engine):
+        """Get the cached MetaData bound to an engine"""
+        if self._metadata is None or self._metadata.bind is not engine:
+            self._metadata = MetaData(bind=engine)
+            self._tables = {}
+        return self._metadata
+
+    def _is_expired(self, loaded_at):
+        """Check if a cached table is older than the configured TTL"""
+        ttl = self.options.TABLE_CACHE_TTL
+        return ttl is not None and time.time() - loaded_at > ttl
+
+    def _table_from_dataframe(self, table_uri, df, engine, column=None):
+        """Construct the Table of an uploaded dataframe from its dtypes
+
+        Parameters
+        ----------
+        table_uri : str
+            Table URI where the dataframe was uploaded
+        df : :class:`pandas.DataFrame`
+            The uploaded dataframe
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        column : str, optional
+            Column whose geometries were stored parsed during the upload
+
+        Returns
+        -------
+        :class:`sqlalchemy.schema.Table`
+        """
+        index = df.index.name or "__index_level_0__"
+        columns = [Column(index, self._column_type(df.index.dtype))] + [
+            Column(name, self._column_type(dtype))
+            for name, dtype in df.dtypes.items()
+        ]
+        if column:
+            columns.append(Column(GEOMETRY_COLUMN, NullType))
+        with self._tables_lock:
+            metadata = self._get_metadata(engine)
+            if table_uri in metadata.tables:
+                metadata.remove(metadata.tables[table_uri])
+            table = Table(table_uri, metadata, *columns)
+            self._tables[table_uri] = (table, time.time())
+            return table
+
+    def _column_type(self, dtype):
+        """SQLAlchemy column type for a pandas dtype"""
+        if ptypes.is_bool_dtype(dtype):
+            return Boolean
+        if ptypes.is_integer_dtype(dtype):
+            return Integer
+        if ptypes.is_float_dtype(dtype):
+            return Float
+        if ptypes.is_datetime64_any_dtype(dtype):
+            return DateTime
+        return Text
+
+    def fetch_batches(self, engine, query, chunksize):
+        """Execute a query and yield its results as column arrays
+
+        Rows are read through a streaming cursor with :code:`fetchmany`, so
+        at most one batch of row tuples is held at a time, and each batch is
+        converted into one NumPy array per output column.
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int
+            Maximum number of rows per batch
+
+        Yields
+        ------
+        :class:`collections.OrderedDict`
+            Mapping of column names to :class:`numpy.ndarray` for a batch
+        """
+        dtypes = OrderedDict(
+            (col.key, self._buffer_dtype(col.type)) for col in query.columns
+        )
+        with engine.connect() as conn:
+            results = conn.execution_options(stream_results=True).execute(
+                query
+            )
+            while True:
+                rows = results.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield self._to_batch(dtypes, rows)
+
+    def fetch_iter(self, engine, query, chunksize):
+        """Execute a query and yield its results in bounded chunks
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int
+            Maximum number of rows per chunk
+
+        Yields
+        ------
+        :class:`pandas.DataFrame`
+            A chunk of the query results
+        """
+        for batch in self.fetch_batches(engine, query, chunksize):
+            yield pd.DataFrame(batch).infer_objects()
+
+    def fetch_frame(self, engine, query, chunksize=10000):
+        """Execute a query and build a :class:`pandas.DataFrame` from its
+        column arrays
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int, optional
+            Number of rows fetched per round trip. Default is :code:`10000`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+        """
+        columns = OrderedDict((col.key, []) for col in query.columns)
+        with instrumentation.span("fetch"):
+            for batch in self._measure(
+                self.fetch_batches(engine, query, chunksize)
+            ):
+                for name, values in batch.items():
+                    columns[name].append(values)
+        with instrumentation.span("frame"):
+            return pd.DataFrame(
+                OrderedDict(
+                    (name, np.concatenate(arrays) if arrays else [])
+                    for name, arrays in columns.items()
+                ),
+                columns=list(columns),
+            ).infer_objects()
+
+    def fetch_arrow(self, engine, query, chunksize=10000):
+        """Execute a query and return its results as a :class:`pyarrow.Table`
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int, optional
+            Number of rows per record batch. Default is :code:`10000`
+
+        Returns
+        -------
+        :class:`pyarrow.Table`
+
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed
+        """
+        pa = self._import_pyarrow()
+        names = [col.key for col in query.columns]
+        with instrumentation.span("fetch"):
+            batches = [
+                pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(values, from_pandas=True)
+                        for values in batch.values()
+                    ],
+                    names,
+                )
+                for batch in self._measure(
+                    self.fetch_batches(engine, query, chunksize)
+                )
+            ]
+        with instrumentation.span("frame"):
+            if not batches:
+                return pa.table(OrderedDict((name, []) for name in names))
+            return pa.Table.from_batches(batches)
+
+    def _measure(self, batches):
+        """Count the rows and bytes of fetched batches on the current span
+
+        Parameters
+        ----------
+        batches : iterable of :class:`collections.OrderedDict`
+            Column arrays, see :code:`fetch_batches`
+
+        Yields
+        ------
+        :class:`collections.OrderedDict`
+            The batches, unchanged
+        """
+        rows, size = 0, 0
+        for batch in batches:
+            arrays = list(batch.values())
+            rows += len(arrays[0]) if arrays else 0
+            size += sum(values.nbytes for values in arrays)
+            yield batch
+        instrumentation.annotate(rows=rows, bytes=size)
+
+    def compile(self, engine, query):
+        """Render a query into a SQL string for the engine's dialect
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to render
+
+        Returns
+        -------
+        str
+        """
+        return str(
+            query.compile(
+                dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+
     def get_engine(self):
         """Get the engine from the DBCore
 
+        The engine is created once and reused by subsequent calls. In a forked
+        process, the parent's engine is discarded and a new one is created.
+
         Returns
         -------
         :class:`sqlalchemy.engine.base.Engine`
             Engine with the database dialect
         """
-        return create_engine(self.dburl)
+        with self._engine_lock:
+            if self._engine is None or self._engine_pid != os.getpid():
+                self._engine = self._create_engine()
+                self._engine_pid = os.getpid()
+            return self._engine
+
+    def _create_engine(self):
+        """Create a new engine for the database url"""
+        return create_engine(self.dburl, pool_size=self.options.POOL_SIZE)
+
+    def _content_id(self, df, column=None):
+        """Deterministic table ID derived from the contents of a dataframe
+
+        The ID hashes the index, column names, dtypes, and values, so uploading
+        the same dataframe twice yields the same table name. It is formatted as
+        a UUID v4 hex string to stay compatible with the random IDs used
+        before.
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Dataframe to be uploaded
+        column : str, optional
+            Column whose geometries are stored parsed in the table
+
+        Returns
+        -------
+        str
+            32-char table ID
+        """
+        digest = hashlib.sha1()
+        schema = [df.index.name, column] + [
+            (name, str(dtype)) for name, dtype in df.dtypes.items()
+        ]
+        digest.update(repr(schema).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=True).values)
+        return uuid.UUID(hex=digest.hexdigest()[:32], version=4).hex
+
+    def _upload_lock(self, content_id):
+        """Lock serializing concurrent uploads of the same contents"""
+        with self._uploads_lock:
+            return self._upload_locks[content_id]
+
+    def _cached_upload(self, content_id):
+        """Get the URI of a live table previously uploaded by this process"""
+        with self._uploads_lock:
+            entry = self._uploads.get(content_id)
+        if entry and (entry[1] is None or entry[1] > time.time()):
+            return entry[0]
+        return None
+
+    def _remember_upload(self, content_id, table_uri, expires_at=None):
+        """Record an uploaded table, optionally with its expiry timestamp"""
+        with self._uploads_lock:
+            self._uploads[content_id] = (table_uri, expires_at)
+
+    def _buffer_dtype(self, type_):
+        """NumPy dtype of the fetched values of a column type"""
+        return np.float64 if isinstance(type_, (Float, Numeric)) else object
+
+    def _to_batch(self, dtypes, rows):
+        """Convert row tuples into one NumPy array per column
+
+        Parameters
+        ----------
+        dtypes : :class:`collections.OrderedDict`
+            Mapping of column names to the dtypes of their arrays
+        rows : list of tuple
+            Values of each row, in the order of :code:`dtypes`
+
+        Returns
+        -------
+        :class:`collections.OrderedDict`
+            Mapping of column names to :class:`numpy.ndarray`
+        """
+        batch = OrderedDict()
+        for (name, dtype), values in zip(dtypes.items(), zip(*rows)):
+            # Filled in place rather than with np.array, which would unpack
+            # values that are sequences themselves
+            batch[name] = np.empty(len(rows), dtype=dtype)
+            batch[name][:] = values
+        return batch
+
+    def _import_pyarrow(self):
+        """Import pyarrow, which is only needed for columnar outputs"""
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError(
+                "pyarrow is required to fetch results as an Arrow table: "
+                "pip install geomancer[bq] or pip install pyarrow"
+            )
+        return pyarrow
 
-    def _inspect_options(self, options):
+    @staticmethod
+    def _inspect_options(options):
         """Helper method to return the attributes of a configuration
 
         Returns
@@ -2,17 +2,59 @@
 
 # Import standard library
 import datetime
+import os
+import threading
 import time
-import uuid
+from collections import OrderedDict
 
 # Import modules
 import pytz
-from google.api_core.exceptions import Conflict
+from google.api_core.exceptions import Conflict, NotFound
 from google.cloud import bigquery
 from loguru import logger
 from sqlalchemy import func
 
-from .base import DBCore
+from ... import instrumentation
+from .base import GEOMETRY_COLUMN, SEGMENT_LENGTH, SEGMENTS_SUFFIX, DBCore
+
+# Number of parameters a BigQuery query can have
+MAX_QUERY_PARAMETERS = 10000
+
+# Uploaded tables expiring within this many seconds are not reused
+REUSE_MARGIN = 10 * 60
+
+# Seconds between the first polls of a load job, doubled after every poll up
+# to the maximum
+POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 10
+
+
+# Cuts lines into pieces of equal fractions of their length, as many as
+# needed for each piece to be at most max_length meters long
+SEGMENTS_QUERY = """
+CREATE OR REPLACE TABLE `{segments}` CLUSTER BY `{geometry}` AS
+WITH lines AS (
+    SELECT {columns}, geog,
+        IF(
+            ST_GEOMETRYTYPE(geog) = 'ST_LineString',
+            CAST(FLOOR(ST_LENGTH(geog) / {max_length}) AS INT64) + 1,
+            1
+        ) AS pieces
+    FROM (
+        SELECT {columns}, ST_GEOGFROMTEXT(`{column}`) AS geog
+        FROM `{source}`
+    )
+), cuts AS (
+    SELECT {columns}, IF(
+        pieces = 1,
+        geog,
+        ST_LINESUBSTRING(geog, piece / pieces, (piece + 1) / pieces)
+    ) AS geog
+    FROM lines, UNNEST(GENERATE_ARRAY(0, pieces - 1)) AS piece
+)
+SELECT {columns}, ST_ASTEXT(geog) AS `{column}`, geog AS `{geometry}`
+FROM cuts
+"""
 
 
 class BigQueryCore(DBCore):
@@ -26,17 +68,108 @@ class BigQueryCore(DBCore):
 
     def __init__(self, dburl, options=None):
         super(BigQueryCore, self).__init__(dburl, options)
-        self.client = bigquery.Client(
-            project=self.dburl.host,
-            credentials=self.dburl.query.get("credentials_path"),
-            location=self.dburl.query.get("location"),
-        )
+        self._client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """BigQuery client, created on first use and once per process"""
+        with self._client_lock:
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = bigquery.Client(
+                    project=self.dburl.host,
+                    credentials=self.dburl.query.get("credentials_path"),
+                    location=self.dburl.query.get("location"),
+                )
+                self._client_pid = os.getpid()
+            return self._client
+
+    @property
+    def max_parameters(self):
+        return MAX_QUERY_PARAMETERS
 
     def ST_GeoFromText(self, x):
         return func.ST_GeogFromText(x)
 
-    def load(self, df, dataset_id, expiry=3, max_retries=10, **kwargs):
-        """Upload a pandas.DataFrame as a BigQuery table with a unique 32-char ID
+    def within_predicate(self, target_geom, source_geom, within):
+        """Use :code:`ST_DWithin`, which can prune using geography
+        clustering"""
+        return func.ST_DWithin(target_geom, source_geom, within)
+
+    def fetch_batches(self, engine, query, chunksize):
+        """Run a query as a BigQuery job and yield its result pages as column
+        arrays
+
+        Pages are requested one at a time as they are iterated, so only one
+        page of rows is held at a time.
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int
+            Maximum number of rows per batch
+
+        Yields
+        ------
+        :class:`collections.OrderedDict`
+            Mapping of column names to :class:`numpy.ndarray` for a batch
+        """
+        dtypes = OrderedDict(
+            (col.key, self._buffer_dtype(col.type)) for col in query.columns
+        )
+        job = self.client.query(self.compile(engine, query))
+        instrumentation.annotate(job_id=job.job_id)
+        rows = job.result(page_size=chunksize)
+        for page in rows.pages:
+            values = [row.values() for row in page]
+            if values:
+                yield self._to_batch(dtypes, values)
+
+    def fetch_arrow(self, engine, query, chunksize=None):
+        """Run a query as a BigQuery job and download it as a
+        :class:`pyarrow.Table`
+
+        Parameters
+        ----------
+        engine : :class:`sqlalchemy.engine.base.Engine`
+            Engine with the database dialect
+        query : :class:`sqlalchemy.sql.expression.ClauseElement`
+            The statement to execute
+        chunksize : int, optional
+            Number of rows per result page
+
+        Returns
+        -------
+        :class:`pyarrow.Table`
+        """
+        self._import_pyarrow()
+        with instrumentation.span("fetch") as span:
+            job = self.client.query(self.compile(engine, query))
+            span.set(job_id=job.job_id)
+            table = job.result(page_size=chunksize).to_arrow()
+            span.set(rows=table.num_rows, bytes=table.nbytes)
+        return table
+
+    def load(
+        self,
+        df,
+        dataset_id,
+        column=None,
+        expiry=3,
+        load_timeout=600,
+        materialize_geometry=False,
+        **kwargs
+    ):
+        """Upload a pandas.DataFrame as a BigQuery table with a 32-char ID
+
+        The table ID is derived from the dataframe's contents. If a table with
+        the same contents was already uploaded and has not expired yet, it is
+        reused instead of running another load job. This also lets BigQuery's
+        query cache hit when the same spell is casted again.
 
         Parameters
         ----------
@@ -44,51 +177,232 @@ class BigQueryCore(DBCore):
             Input dataframe to upload to BigQuery
         dataset_id : str
             ID to name the created Dataset
+        column : str, optional
+            Column with WKT geometries
         expiry : int, None
             Number of hours for a given table to expire. Default
             is :code:`3`.
-        max_retries: int
-            Number of retries for the upload job to ensure
-            that the table exists. Default is :code:`10`
+        load_timeout : float, None
+            Number of seconds to wait for the load job to finish. Default is
+            :code:`600`. If :code:`None`, wait indefinitely.
+        materialize_geometry : bool, optional
+            Also store the geometries in :code:`column` as GEOGRAPHY in a
+            :code:`__geometry__` column, which takes another query job.
+            Default is :code:`False`
 
         Returns
         -------
         str
             The full path for the created table
+
+        Raises
+        ------
+        TimeoutError
+            If the load job did not finish within :code:`load_timeout`
+        google.api_core.exceptions.GoogleAPICallError
+            If the load job failed
         """
-        # Fetch dataset
-        dataset = self._fetch_dataset(dataset_id)
+        # Name the table after its contents so identical uploads are reused
+        column = column if materialize_geometry else None
+        table_id = self._content_id(df, column)
+        content_id = "{}.{}".format(dataset_id, table_id)
 
-        # Generate a unique table_id for every dataframe upload job
-        table_id = uuid.uuid4().hex
-        table_ref = dataset.table(table_id)
+        with self._upload_lock(content_id):
+            table_path = self._cached_upload(content_id)
+            if table_path:
+                logger.debug("Reusing uploaded table: {}".format(table_path))
+                return table_path
 
-        # Run job
-        job = self.client.load_table_from_dataframe(df, table_ref)
+            # Fetch dataset
+            dataset = self._fetch_dataset(dataset_id)
+            table_ref = dataset.table(table_id)
+
+            # Create full table path
+            table_path = "{}.{}.{}".format(
+                dataset.project, dataset.dataset_id, table_id
+            )
+
+            table = self._existing_table(table_ref)
+            if table is None:
+                # Store the index as a column, since the client drops a
+                # RangeIndex from the uploaded table
+                index = df.index.name or "__index_level_0__"
+                frame = df.reset_index().rename(columns={"index": index})
+                self._upload(frame, table_ref, table_path, load_timeout)
+                if column:
+                    self._materialize_geometry(table_path, column)
+            elif column and GEOMETRY_COLUMN not in {
+                field.name for field in table.schema
+            }:
+                # A previous load stopped before the geometries were parsed
+                logger.debug(
+                    "Parsing the geometries of existing table: {}".format(
+                        table_path
+                    )
+                )
+                self._materialize_geometry(table_path, column)
+            else:
+                logger.debug("Reusing existing table: {}".format(table_path))
+
+            # Wait for the table to be uploaded before setting expiry
+            expires_at = None
+            if expiry:
+                self._set_table_expiry(table_ref, expiry)
+                expires_at = time.time() + expiry * 3600 - REUSE_MARGIN
+
+            self._remember_upload(content_id, table_path, expires_at)
+
+        return table_path
+
+    def _upload(self, df, table_ref, table_path, timeout):
+        """Run a load job for a dataframe and wait for it to finish
 
-        # Create full table path
-        table_path = "{}.{}.{}".format(
-            dataset.project, dataset.dataset_id, table_id
+        The dataframe is serialized as Parquet by the client. The job is
+        polled with exponential backoff, so small uploads are not held up by
+        long sleeps.
+        """
+        # Overwrite instead of append in case a previous upload was partial
+        job_config = bigquery.LoadJobConfig(
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
         )
 
+        # Run job
+        job = self.client.load_table_from_dataframe(
+            df, table_ref, job_config=job_config
+        )
+        instrumentation.annotate(job_id=job.job_id)
+
         # Poll until the job is complete
-        while max_retries > 0 and not job.done():
+        start = time.monotonic()
+        interval = POLL_INTERVAL
+        while not job.done():
+            elapsed = time.monotonic() - start
+            if timeout is not None and elapsed >= timeout:
+                # Do not leave a job running that may overwrite the table
+                # once it is uploaded again
+                job.cancel()
+                raise TimeoutError(
+                    "Upload job {} did not finish in {} seconds".format(
+                        job.job_id, timeout
+                    )
+                )
             logger.debug(
-                "Upload job is not yet done, retrying... (Retries left: {})".format(
-                    max_retries
+                "Upload job is not yet done, polling again in {}s".format(
+                    interval
                 )
             )
-            max_retries -= 1
-            time.sleep(10)
-            job.reload()
+            if timeout is not None:
+                interval = min(interval, timeout - elapsed)
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        # Raise if the job failed
+        job.result()
 
         logger.debug("Done uploading dataframe to: {}".format(table_path))
 
-        # Wait for the table to be uploaded before setting expiry
-        if expiry:
-            self._set_table_expiry(table_ref, expiry)
+    def prepare_source(self, source_uri, column="WKT"):
+        """Add a GEOGRAPHY column with the parsed geometries to a source table
 
-        return table_path
+        The column is added in place, so the table keeps its other settings.
+        """
+        if (
+            GEOMETRY_COLUMN
+            in self.reflect_table(source_uri, self.get_engine()).c
+        ):
+            return
+        self._run_query(
+            "ALTER TABLE `{}` ADD COLUMN `{}` GEOGRAPHY".format(
+                source_uri, GEOMETRY_COLUMN
+            )
+        )
+        self._run_query(
+            "UPDATE `{0}` SET `{1}` = ST_GeogFromText(`{2}`) "
+            "WHERE TRUE".format(source_uri, GEOMETRY_COLUMN, column)
+        )
+        self.invalidate(source_uri)
+
+    def prepare_segments(
+        self, source_uri, max_length=SEGMENT_LENGTH, column="WKT"
+    ):
+        """Subdivide lines with ST_LINESUBSTRING into a table clustered on
+        their geographies
+
+        Each line is cut at equal fractions of its length, into as many
+        pieces as needed for them to be at most :code:`max_length` meters
+        long. The derived table replaces any previous one.
+        """
+        segments_uri = source_uri + SEGMENTS_SUFFIX
+        columns = ", ".join(
+            "`{}`".format(name)
+            for name in self._attribute_columns(source_uri, column)
+        )
+        logger.info("Subdividing the lines of {}".format(source_uri))
+        self._run_query(
+            SEGMENTS_QUERY.format(
+                segments=segments_uri,
+                source=source_uri,
+                columns=columns,
+                column=column,
+                geometry=GEOMETRY_COLUMN,
+                max_length=float(max_length),
+            )
+        )
+        self.invalidate(segments_uri)
+
+    def fingerprint(self, source_uri):
+        """ETag and modification time of the source table"""
+        table = self.client.get_table(
+            bigquery.TableReference.from_string(source_uri)
+        )
+        return "{}:{}:{}".format(table.etag, table.modified, table.num_rows)
+
+    def _table_from_dataframe(self, table_uri, df, engine, column=None):
+        """Geometries are only stored parsed if :code:`MATERIALIZE_GEOMETRY`
+        is set, see :code:`load`
+        """
+        if not self.options.MATERIALIZE_GEOMETRY:
+            column = None
+        return super(BigQueryCore, self)._table_from_dataframe(
+            table_uri, df, engine, column
+        )
+
+    def _materialize_geometry(self, table_path, column):
+        """Rewrite an uploaded table with its geometries parsed"""
+        self._run_query(
+            "CREATE OR REPLACE TABLE `{0}` AS "
+            "SELECT *, ST_GeogFromText(`{1}`) AS `{2}` FROM `{0}`".format(
+                table_path, column, GEOMETRY_COLUMN
+            )
+        )
+
+    def _run_query(self, sql):
+        """Run a query job and wait for it to finish"""
+        logger.debug("Running query: {}".format(sql))
+        return self.client.query(sql).result()
+
+    def _existing_table(self, table_ref):
+        """Get a table if it exists and will not expire soon
+
+        Parameters
+        ----------
+        table_ref : :class:`google.cloud.bigquery.table.TableReference`
+            Reference to a BigQuery table
+
+        Returns
+        -------
+        :class:`google.cloud.bigquery.table.Table` or None
+        """
+        try:
+            table = self.client.get_table(table_ref)
+        except NotFound:
+            return None
+        if table.expires is None:
+            return table
+        margin = datetime.timedelta(seconds=REUSE_MARGIN)
+        if table.expires > datetime.datetime.now(pytz.utc) + margin:
+            return table
+        return None
 
     def _set_table_expiry(self, table_ref, expiry):
         """Set expiration date of table in hours
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+"""In-process core for spells over point features
+
+Some spells do not need a database at all. For point features, the distance to
+the nearest feature or the number of features within a radius can be answered
+by a spatial index held in memory. :code:`LocalCore` loads a source table from
+a Parquet or CSV file (or from a registered :class:`pandas.DataFrame`) once,
+builds a KD-tree over its points, and evaluates spells with vectorized NumPy:
+
+    .. code-block:: python
+
+        from geomancer.spells import DistanceToNearest
+
+        spell = DistanceToNearest("embassy",
+                                  source_table="gis_osm_pois_free_1.parquet",
+                                  feature_name="dist_embassy")
+        df_with_features = spell.cast(df, dburl="local:///path/to/osm/")
+
+The output has the same schema as when casting with the SQL cores. Points are
+placed on a sphere, so distances are great-circle distances in meters.
+"""
+
+# Import standard library
+import os
+import threading
+
+# Import modules
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ... import instrumentation
+from .base import DBCore
+
+# Mean radius of the Earth in meters
+EARTH_RADIUS = 6371008.8
+
+# Extensions tried when resolving a source table to a file
+EXTENSIONS = ("", ".parquet", ".csv")
+
+POINT_PATTERN = r"^\s*POINT\s*\(\s*([-+\d.eE]+)\s+([-+\d.eE]+)\s*\)\s*$"
+
+
+def to_xyz(lon, lat):
+    """Convert longitudes and latitudes to points on the unit sphere
+
+    Parameters
+    ----------
+    lon : :class:`numpy.ndarray`
+        Longitudes in degrees
+    lat : :class:`numpy.ndarray`
+        Latitudes in degrees
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Array of shape :code:`(n, 3)`
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+
+
+def to_chord(distance):
+    """Convert great-circle distances in meters to unit-sphere chords"""
+    return 2 * np.sin(
+        np.minimum(np.asarray(distance) / EARTH_RADIUS, np.pi) / 2
+    )
+
+
+def from_chord(chord):
+    """Convert unit-sphere chords to great-circle distances in meters"""
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(np.asarray(chord) / 2, 1))
+
+
+def parse_points(wkt):
+    """Parse WKT points into points on the unit sphere
+
+    Parameters
+    ----------
+    wkt : :class:`pandas.Series`
+        WKT strings of POINT geometries
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Array of shape :code:`(n, 3)`
+
+    Raises
+    ------
+    ValueError
+        If a geometry is not a point
+    """
+    coords = wkt.astype(str).str.extract(POINT_PATTERN).astype(float)
+    if coords.isnull().values.any():
+        raise ValueError(
+            "LocalCore only supports POINT geometries, got: {}".format(
+                wkt[coords.isnull().any(axis=1)].iloc[0]
+            )
+        )
+    return to_xyz(coords[0].values, coords[1].values)
+
+
+class FeatureIndex(object):
+    """KD-tree over the points of filtered source features
+
+    Attributes
+    ----------
+    ids : :class:`numpy.ndarray`
+        Source IDs of the indexed features
+    tree : :class:`scipy.spatial.cKDTree`
+        Spatial index over the features' points on the unit sphere
+    """
+
+    def __init__(self, ids, points):
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            raise ImportError(
+                "scipy is required to cast spells with LocalCore: "
+                "pip install geomancer[local] or pip install scipy"
+            )
+        self.ids = np.asarray(ids)
+        self.tree = cKDTree(points)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, points, within, k=1):
+        """Distances to the k nearest features within a radius
+
+        Parameters
+        ----------
+        points : :class:`numpy.ndarray`
+            Target points on the unit sphere, see :code:`parse_points`
+        within : float
+            Search radius in meters
+        k : int, optional
+            Number of nearest features. Default is :code:`1`
+
+        Returns
+        -------
+        (:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+            Distances in meters and IDs of the features, each of shape
+            :code:`(n, k)`. Missing neighbors have a distance of
+            :code:`nan` and an ID of :code:`None`
+        """
+        if len(self) == 0:
+            return (
+                np.full((len(points), k), np.nan),
+                np.full((len(points), k), None, dtype=object),
+            )
+        chords, positions = self.tree.query(
+            points, k=k, distance_upper_bound=to_chord(within)
+        )
+        chords = np.asarray(chords, dtype=float).reshape(len(points), k)
+        positions = np.asarray(positions).reshape(len(points), k)
+        found = np.isfinite(chords)
+        distances = np.where(
+            found, from_chord(np.where(found, chords, 0)), np.nan
+        )
+        ids = np.full(positions.shape, None, dtype=object)
+        ids[found] = self.ids[positions[found]]
+        return distances, ids
+
+    def count(self, points, within):
+        """Number of features within a radius
+
+        Parameters
+        ----------
+        points : :class:`numpy.ndarray`
+            Target points on the unit sphere, see :code:`parse_points`
+        within : float
+            Search radius in meters
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            Counts of shape :code:`(n,)`
+        """
+        if len(self) == 0:
+            return np.zeros(len(points), dtype=int)
+        return self.tree.query_ball_point(
+            points, r=to_chord(within), return_length=True
+        )
+
+
+class LocalCore(DBCore):
+    """In-process core that evaluates spells with a spatial index
+
+    The database url points to a source file or to a directory of source files,
+    e.g., :code:`local:///path/to/osm/`. Source tables are resolved relative to
+    that directory, trying the :code:`.parquet` and :code:`.csv` extensions.
+    DataFrames can also be registered as source tables with
+    :code:`register_table`.
+    """
+
+    def __init__(self, dburl, options=None):
+        super(LocalCore, self).__init__(dburl, options)
+        self._frames = {}
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    @property
+    def path(self):
+        """File or directory that source tables are resolved against"""
+        return str(self.dburl)[len("local://") :]
+
+    def ST_GeoFromText(self, x):
+        raise NotImplementedError("LocalCore does not run SQL queries")
+
+    def load(self, df, column=None, **kwargs):
+        """Register a dataframe as a source table named after its contents
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Input dataframe
+        column : str, optional
+            Column with WKT geometries
+
+        Returns
+        -------
+        str
+            Name of the registered table
+        """
+        name = self._content_id(df, column)
+        with self._lock:
+            if name not in self._frames:
+                self.register_table(name, df)
+        return name
+
+    def get_engine(self):
+        raise NotImplementedError("LocalCore does not run SQL queries")
+
+    def register_table(self, name, df):
+        """Register an in-memory dataframe as a source table
+
+        Parameters
+        ----------
+        name : str
+            Source table name used by spells
+        df : :class:`pandas.DataFrame`
+            Source features with a :code:`WKT` column
+        """
+        with self._lock:
+            self._frames[name] = df
+            self._indexes = {
+                key: index
+                for key, index in self._indexes.items()
+                if key[0] != name
+            }
+
+    def read_table(self, source_uri):
+        """Read a source table, caching it for subsequent casts
+
+        Parameters
+        ----------
+        source_uri : str
+            Registered table name, or file name relative to :code:`path`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+        """
+        with self._lock:
+            if source_uri not in self._frames:
+                filename = self._resolve(source_uri)
+                logger.debug("Reading source table from {}".format(filename))
+                if filename.endswith(".csv"):
+                    df = pd.read_csv(filename)
+                else:
+                    df = pd.read_parquet(filename)
+                self._frames[source_uri] = df
+            return self._frames[source_uri]
+
+    def fingerprint(self, source_uri):
+        """Size and modification time of the source file, or a hash of the
+        registered dataframe
+        """
+        with self._lock:
+            if source_uri in self._frames:
+                df = self._frames[source_uri]
+                return "{}:{}".format(
+                    len(df), pd.util.hash_pandas_object(df).sum()
+                )
+        stat = os.stat(self._resolve(source_uri))
+        return "{}:{}".format(stat.st_size, stat.st_mtime)
+
+    def feature_index(
+        self, source_uri, source_column, source_filter, source_id
+    ):
+        """Build (once) the spatial index over a subset of a source table
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to read the features from
+        source_column : str
+            Column to filter the features on
+        source_filter : str
+            Value of :code:`source_column` to keep
+        source_id : str
+            Column with the IDs of the features
+
+        Returns
+        -------
+        :class:`geomancer.backend.cores.local.FeatureIndex`
+        """
+        key = (source_uri, source_column, source_filter, source_id)
+        with self._lock:
+            if key not in self._indexes:
+                source = self.read_table(source_uri)
+                features = source[
+                    source[source_column].astype(str) == str(source_filter)
+                ].drop_duplicates(subset=[source_id])
+                self._indexes[key] = FeatureIndex(
+                    features[source_id].values, parse_points(features["WKT"])
+                )
+            return self._indexes[key]
+
+    def cast(
+        self, spell, target, column, keep_index, features_only, chunksize=None
+    ):
+        """Evaluate a spell on a target dataframe
+
+        Parameters
+        ----------
+        spell : :class:`geomancer.spells.base.Spell`
+            Spell to cast. It must implement :code:`evaluate`.
+        target : :class:`pandas.DataFrame` or str
+            Target points, or a source table to read them from
+        column : str
+            Column to look the geometries from
+        keep_index : boolean
+            Include index in output dataframes
+        features_only : boolean
+            Only return features as output dataframes
+        chunksize : int, optional
+            Evaluate and yield at most this many targets at a time. If not
+            set, all targets are evaluated at once.
+
+        Yields
+        ------
+        :class:`pandas.DataFrame`
+            Output dataframes, with the same columns as the SQL cores return
+        """
+        if isinstance(target, str):
+            target = self.read_table(target)
+        # Here we're mimicking the SQL cores by creating __index_level_0__
+        frame = target.reset_index().rename(
+            columns={"index": "__index_level_0__"}
+        )
+        with instrumentation.span("index"):
+            features = self.feature_index(
+                spell.source_table,
+                spell.source_column,
+                spell.source_filter,
+                spell.source_id,
+            )
+        chunksize = chunksize or max(len(frame), 1)
+        for start in range(0, max(len(frame), 1), chunksize):
+            chunk = frame.iloc[start : start + chunksize]
+            # Spans are not kept open across yields, which would nest the
+            # spans of the consumer under them
+            with instrumentation.span("evaluate", rows=len(chunk)):
+                values, found = spell.evaluate(
+                    features, parse_points(chunk[column])
+                )
+            chunk = chunk.assign(**values)[found]
+            yield chunk[
+                [
+                    name
+                    for name in chunk.columns
+                    if spell._include_column(name, keep_index, features_only)
+                ]
+            ].reset_index(drop=True)
+
+    def _resolve(self, source_uri):
+        """Find the file of a source table"""
+        if os.path.isfile(self.path):
+            return self.path
+        for extension in EXTENSIONS:
+            filename = os.path.join(self.path, source_uri + extension)
+            if os.path.isfile(filename):
+                return filename
+        raise ValueError(
+            "Source table {} not found in {}".format(source_uri, self.path)
+        )
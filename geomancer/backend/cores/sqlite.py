@@ -1,44 +1,698 @@
 # -*- coding: utf-8 -*-
 
 # Import standard library
+import copy
+import hashlib
+import os
 import sqlite3
-import uuid
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
 
 # Import modules
+import pandas as pd
 from loguru import logger
-from sqlalchemy import create_engine, event
-from sqlalchemy.sql import func
+from pandas.api import types as ptypes
+from sqlalchemy import String, and_, create_engine, event
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import Table
+from sqlalchemy.sql import column, func, literal_column, select, table
 
-from .base import DBCore
+from .base import GEOMETRY_COLUMN, SEGMENT_LENGTH, SEGMENTS_SUFFIX, DBCore
+
+# Approximate length of a degree of latitude
+METERS_PER_DEGREE = 111320.0
+
+# Number of rows bound per executemany call when loading dataframes
+INSERT_BATCH_SIZE = 10000
+
+# Number of parameters SQLite binds per statement, unless compiled with a
+# higher SQLITE_MAX_VARIABLE_NUMBER (the default since 3.32 is 32766)
+MAX_VARIABLES = 999
+
+# Name the scratch database is attached under on every connection
+SCRATCH = "scratch"
+
+# Cuts lines into pieces of equal fractions of their length, as many as
+# needed for each piece to be at most max_length meters long
+SEGMENTS_QUERY = """
+CREATE TABLE "{segments}" AS
+WITH RECURSIVE lines AS (
+    SELECT {columns}, geom,
+        CASE WHEN GeometryType(geom) = 'LINESTRING'
+            THEN CAST(ST_Length(geom, 1) / {max_length} AS INTEGER) + 1
+            ELSE 1
+        END AS pieces
+    FROM (
+        SELECT {columns}, ST_GeomFromText("{column}", 4326) AS geom
+        FROM "{source}"
+    )
+), cuts AS (
+    SELECT {columns}, geom, pieces, 0 AS piece FROM lines
+    UNION ALL
+    SELECT {columns}, geom, pieces, piece + 1 FROM cuts
+    WHERE piece + 1 < pieces
+)
+SELECT {columns}, AsText(
+    CASE WHEN pieces = 1 THEN geom ELSE ST_Line_Substring(
+        geom, 1.0 * piece / pieces, 1.0 * (piece + 1) / pieces
+    ) END
+) AS "{column}"
+FROM cuts
+"""
+
+# Virtual table for querying R*Tree spatial indexes in Spatialite
+spatial_index = table(
+    "SpatialIndex",
+    column("f_table_name", String),
+    column("f_geometry_column", String),
+    column("search_frame"),
+)
 
 
 class SQLiteCore(DBCore):
-    """SQLite Core with Spatialite Extension"""
+    """SQLite Core with Spatialite Extension
+
+    Targets are not written to the source database but to a scratch database
+    attached to every connection, see :code:`SCRATCH_DATABASE`. Queries
+    refer to uploaded tables by name only, which SQLite resolves in the
+    attached database once it is not found in the source. Uploaded tables
+    are dropped at the end of the session they were uploaded in, see
+    :code:`DBCore.session`.
+    """
 
     def __init__(self, dburl, options=None):
         super(SQLiteCore, self).__init__(dburl, options)
+        self._indexed = {}
+        self._index_lock = threading.Lock()
+        self._keeper = None
+        self._keeper_lock = threading.Lock()
+        self._scratch_file = None
+        self._scratch_pid = None
+        self._scratch_removals = 0
+
+    @property
+    def executor(self):
+        """Queries on SQLite are CPU-bound, so file databases are casted in
+        processes. In-memory databases are not shared between processes.
+        """
+        if self._in_memory or self.options.SCRATCH_DATABASE == ":memory:":
+            return "thread"
+        return "process"
+
+    @property
+    def max_parameters(self):
+        return MAX_VARIABLES
+
+    @property
+    def scratch_database(self):
+        """str: Path or URI of the database targets are written to
+
+        By default, a file in the temporary directory named after the source
+        database and owned by this core, so that other processes and cores
+        never drop its tables. It is removed once the last session ends, see
+        :code:`session`. Worker processes are pointed to it with
+        :code:`worker_options`. In-memory scratch databases are shared by the
+        connections of this core, and kept alive until it is closed.
+        """
+        scratch = self.options.SCRATCH_DATABASE
+        if scratch == ":memory:" or (scratch is None and self._in_memory):
+            with self._keeper_lock:
+                if self._keeper is None:
+                    uri = (
+                        "file:geomancer-{}-{}?mode=memory&cache=shared".format(
+                            os.getpid(), id(self)
+                        )
+                    )
+                    self._keeper = (
+                        uri,
+                        sqlite3.connect(
+                            uri, uri=True, check_same_thread=False
+                        ),
+                    )
+                return self._keeper[0]
+        if scratch:
+            return os.path.abspath(os.path.expanduser(scratch))
+        with self._keeper_lock:
+            if self._scratch_file is None:
+                digest = hashlib.sha1(
+                    os.path.abspath(self.dburl.database).encode("utf-8")
+                ).hexdigest()[:16]
+                self._scratch_file = os.path.join(
+                    tempfile.gettempdir(),
+                    "geomancer-{}-{}-{}.sqlite".format(
+                        digest, os.getpid(), id(self)
+                    ),
+                )
+                self._scratch_pid = os.getpid()
+            return self._scratch_file
+
+    @property
+    def _in_memory(self):
+        """bool: Whether the source database is in memory"""
+        return self.dburl.database in (None, "", ":memory:")
+
+    @property
+    def _read_only(self):
+        """bool: Whether the source database is opened read-only"""
+        return self.options.READ_ONLY or self.options.IMMUTABLE
+
+    def worker_options(self):
+        """Point the workers to the scratch database of this core, so that
+        they reuse the targets loaded before casting
+        """
+        options = copy.copy(self.options)
+        options.SCRATCH_DATABASE = self.scratch_database
+        return options
+
+    def close(self):
+        """Dispose the engine's connection pool and unregister the core
+
+        An in-memory scratch database is discarded along with its tables,
+        and the default scratch file is removed.
+        """
+        super(SQLiteCore, self).close()
+        with self._keeper_lock:
+            if self._keeper is not None:
+                self._keeper[1].close()
+                self._keeper = None
+        self._remove_scratch()
+
+    @contextmanager
+    def session(self):
+        """Scope the tables uploaded by this core to a block of code
+
+        The default scratch file is removed once the last session ends.
+        """
+        with super(SQLiteCore, self).session():
+            yield self
+        self._remove_scratch()
+
+    def _remove_scratch(self):
+        """Remove the default scratch file once it has no tables left
+
+        Only the process that created the file removes it. Pooled
+        connections attach it again when they are next checked out.
+        """
+        if self._scratch_file is None or self._scratch_pid != os.getpid():
+            return
+        with self._sessions_lock:
+            if self._sessions or self._session_tables or self._loose_tables:
+                return
+            try:
+                os.remove(self._scratch_file)
+            except FileNotFoundError:
+                return
+            self._scratch_removals += 1
 
     def ST_GeoFromText(self, x):
         return func.ST_GeomFromText(x, 4326)
 
+    def get_tables(self, source_uri, target, engine, column="WKT"):
+        """Create tables given a :class:`sqlalchemy.engine.base.Engine`
+
+        If :code:`SPATIAL_INDEX` is enabled and the source database is not
+        read-only, a spatial index is built on the source table the first
+        time it is used, see :code:`create_spatial_index`.
+        """
+        if self.options.SPATIAL_INDEX and not self._read_only:
+            self.create_spatial_index(source_uri)
+        return super(SQLiteCore, self).get_tables(
+            source_uri, target, engine, column
+        )
+
+    def prepare_source(self, source_uri, column="WKT"):
+        """Add a parsed geometry column to a source table and index it
+
+        See :code:`create_spatial_index`.
+        """
+        self.create_spatial_index(source_uri, column)
+
+    def prepare_segments(
+        self, source_uri, max_length=SEGMENT_LENGTH, column="WKT"
+    ):
+        """Subdivide lines with ST_Line_Substring into an indexed table
+
+        Each line is cut at equal fractions of its length, into as many
+        pieces as needed for their geodesic length to be at most
+        :code:`max_length`. The derived table replaces any previous one, and
+        is then indexed with :code:`create_spatial_index`.
+        """
+        segments_uri = source_uri + SEGMENTS_SUFFIX
+        columns = ", ".join(
+            '"{}"'.format(name)
+            for name in self._attribute_columns(source_uri, column)
+        )
+        logger.info("Subdividing the lines of {}".format(source_uri))
+        with self._index_lock:
+            with self.get_engine().begin() as conn:
+                if (
+                    self._has_spatial_metadata(conn)
+                    and self._spatial_index_enabled(conn, segments_uri)
+                    is not None
+                ):
+                    conn.execute(select([func.DropGeoTable(segments_uri)]))
+                conn.execute('DROP TABLE IF EXISTS "{}"'.format(segments_uri))
+                conn.execute(
+                    SEGMENTS_QUERY.format(
+                        segments=segments_uri,
+                        source=source_uri,
+                        columns=columns,
+                        column=column,
+                        max_length=float(max_length),
+                    )
+                )
+            self._indexed.pop(segments_uri, None)
+        self.invalidate(segments_uri)
+        self.create_spatial_index(segments_uri, column)
+
+    def fingerprint(self, source_uri):
+        """Number of rows and largest ROWID of the source table, and the
+        modification time and size of the database file
+
+        The file changes on every committed write, including updates in
+        place. In WAL mode, writes go to the write-ahead log until it is
+        checkpointed, so it is checked as well. :code:`PRAGMA data_version`
+        is not used since it only changes relative to a connection.
+        """
+        engine = self.get_engine()
+        source = self.reflect_table(source_uri, engine)
+        query = select(
+            [func.count(), func.max(literal_column("ROWID"))]
+        ).select_from(source)
+        with engine.connect() as conn:
+            count, last = conn.execute(query).fetchone()
+        stats = []
+        if not self._in_memory:
+            path = os.path.abspath(self.dburl.database)
+            for name in (path, path + "-wal"):
+                try:
+                    stat = os.stat(name)
+                except FileNotFoundError:
+                    continue
+                stats += [stat.st_mtime_ns, stat.st_size]
+        return ":".join(str(value) for value in [count, last, *stats])
+
+    def create_spatial_index(self, source_uri, column="WKT"):
+        """Build a persistent R*Tree spatial index over a source table
+
+        The geometries in :code:`column` are parsed into a Spatialite geometry
+        column, :code:`__geometry__`, which is then indexed. Both are stored in
+        the database, so this only has to be done once per source table.
+
+        Tables uploaded to the scratch database are not indexed, since they
+        are dropped at the end of the session.
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to index
+        column : str, optional
+            Column to read the WKT geometries from. Default is :code:`WKT`
+        """
+        with self._index_lock:
+            if self._indexed.get(source_uri):
+                return
+            with self.get_engine().begin() as conn:
+                if self._in_scratch(conn, source_uri):
+                    self._indexed[source_uri] = False
+                    return
+                if not self._has_spatial_metadata(conn):
+                    conn.execute(select([func.InitSpatialMetadata(1)]))
+                enabled = self._spatial_index_enabled(conn, source_uri)
+                if enabled is None:
+                    logger.info(
+                        "Adding geometry column to {}".format(source_uri)
+                    )
+                    conn.execute(
+                        select(
+                            [
+                                func.AddGeometryColumn(
+                                    source_uri,
+                                    GEOMETRY_COLUMN,
+                                    4326,
+                                    "GEOMETRY",
+                                    "XY",
+                                )
+                            ]
+                        )
+                    )
+                    conn.execute(
+                        'UPDATE "{}" SET "{}" = '
+                        'ST_GeomFromText("{}", 4326)'.format(
+                            source_uri, GEOMETRY_COLUMN, column
+                        )
+                    )
+                if not enabled:
+                    logger.info(
+                        "Building spatial index on {}".format(source_uri)
+                    )
+                    conn.execute(
+                        select(
+                            [
+                                func.CreateSpatialIndex(
+                                    source_uri, GEOMETRY_COLUMN
+                                )
+                            ]
+                        )
+                    )
+            self._indexed[source_uri] = True
+        self.invalidate(source_uri)
+
+    def has_spatial_index(self, source_uri):
+        """Check if a source table has a spatial index
+
+        Parameters
+        ----------
+        source_uri : str
+            Source table to check
+
+        Returns
+        -------
+        bool
+        """
+        with self._index_lock:
+            if source_uri not in self._indexed:
+                with self.get_engine().connect() as conn:
+                    self._indexed[source_uri] = bool(
+                        self._has_spatial_metadata(conn)
+                        and self._spatial_index_enabled(conn, source_uri)
+                    )
+            return self._indexed[source_uri]
+
+    def within_predicate(self, target_geom, source_geom, within):
+        """Compare the source's bounding box with the expanded target's"""
+        return func.MbrIntersects(
+            source_geom, self._envelope(target_geom, within)
+        )
+
+    def distance(self, a, b):
+        """Geodesic distance on the WGS84 ellipsoid
+
+        Without the ellipsoid, :code:`ST_Distance` is in degrees on EPSG:4326.
+        """
+        return func.ST_Distance(a, b, 1)
+
+    def buffer(self, geom, within):
+        """Buffer in Web Mercator, whose units are meters at the equator
+
+        The distance is scaled by the stretch of the projection at the
+        latitude of the geometry, and the buffer is transformed back to
+        EPSG:4326.
+        """
+        scale = func.Cos(func.Radians(func.MbrMinY(geom)))
+        return func.ST_Transform(
+            func.ST_Buffer(func.ST_Transform(geom, 3857), within / scale),
+            4326,
+        )
+
+    def length(self, geom):
+        """Geodesic length on the WGS84 ellipsoid"""
+        return func.ST_Length(geom, 1)
+
+    def rowid(self, source):
+        if self.has_spatial_index(source.name):
+            return literal_column("ROWID")
+        return None
+
+    def index_predicate(self, source, features, target_geom, within):
+        """Look up candidate features in the source's R*Tree index
+
+        The search frame is the bounding box of the target expanded by
+        :code:`within` meters, so only features that may be within range are
+        compared exactly.
+        """
+        if "__rowid__" not in features.c:
+            return None
+        candidates = select([literal_column("ROWID")]).where(
+            and_(
+                spatial_index.c.f_table_name == str(source.name),
+                spatial_index.c.f_geometry_column == GEOMETRY_COLUMN,
+                spatial_index.c.search_frame
+                == self._envelope(target_geom, within),
+            )
+        )
+        return features.c["__rowid__"].in_(candidates)
+
+    def _envelope(self, geom, within):
+        """Bounding box of a geometry expanded by a distance in meters
+
+        Degrees of longitude shrink away from the equator, so the box is
+        widened according to the latitude farthest from it.
+        """
+        dlat = within / METERS_PER_DEGREE
+        lat = func.max(
+            func.abs(func.MbrMinY(geom)), func.abs(func.MbrMaxY(geom))
+        )
+        dlon = dlat / func.Cos(func.Radians(func.min(lat + dlat, 89.0)))
+        return func.BuildMbr(
+            func.MbrMinX(geom) - dlon,
+            func.MbrMinY(geom) - dlat,
+            func.MbrMaxX(geom) + dlon,
+            func.MbrMaxY(geom) + dlat,
+            4326,
+        )
+
+    def _in_scratch(self, conn, table_uri):
+        """Check if a table is in the scratch database and not the source"""
+        query = (
+            "SELECT 1 FROM {}.sqlite_master WHERE type = 'table' AND name = ?"
+        )
+        return (
+            conn.execute(query.format("main"), (table_uri,)).scalar() is None
+            and conn.execute(query.format(SCRATCH), (table_uri,)).scalar()
+            is not None
+        )
+
+    def _reflect(self, table_uri, metadata):
+        """Reflect a table from the source or the scratch database"""
+        with metadata.bind.connect() as conn:
+            schema = SCRATCH if self._in_scratch(conn, table_uri) else None
+        key = "{}.{}".format(schema, table_uri) if schema else table_uri
+        if key in metadata.tables:
+            metadata.remove(metadata.tables[key])
+        return Table(table_uri, metadata, autoload=True, schema=schema)
+
+    def _has_spatial_metadata(self, conn):
+        """Check if Spatialite's geometry_columns table exists"""
+        return (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'geometry_columns'"
+            ).scalar()
+            is not None
+        )
+
+    def _spatial_index_enabled(self, conn, source_uri):
+        """Get whether a source's geometry column is indexed
+
+        Returns None if the source has no registered geometry column.
+        """
+        enabled = conn.execute(
+            "SELECT spatial_index_enabled FROM geometry_columns "
+            "WHERE lower(f_table_name) = lower(?) "
+            "AND lower(f_geometry_column) = lower(?)",
+            (source_uri, GEOMETRY_COLUMN),
+        ).scalar()
+        return None if enabled is None else bool(enabled)
+
     def load(
-        self, df, index_label=None, index=False, if_exists="replace", **kwargs
+        self,
+        df,
+        column=None,
+        index_label=None,
+        index=False,
+        if_exists="replace",
+        **kwargs
     ):
-        """Upload a pandas.DataFrame inside SQLite with a unique 32-char ID"""
+        """Upload a pandas.DataFrame to the scratch database with a 32-char ID
+
+        The table ID is derived from the dataframe's contents, so uploading
+        the same dataframe again reuses the existing table. If :code:`column`
+        is set, its geometries are also stored parsed in a
+        :code:`__geometry__` column. Tables created here are dropped at the
+        end of the current session, or when the core is closed.
+
+        The rows are bulk inserted from the dataframe's column arrays in a
+        single transaction, with syncing and the rollback journal on disk
+        turned off for the connection, and the key is indexed once all rows
+        are in. The geometries are parsed as they are inserted.
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Input dataframe
+        column : str, optional
+            Column with WKT geometries
+        index_label : str, optional
+            Name of the column holding the row positions if :code:`index` is
+            set. Default is :code:`index`
+        index : bool, optional
+            Also store the row positions as a column. Default is
+            :code:`False`
+        if_exists : str, optional
+            Unused. Tables are named after their contents, so an existing
+            table is reused as is.
+
+        Returns
+        -------
+        str
+            Name of the created table
+        """
 
-        # Generate a unique table_id for every dataframe upload job
-        table_id = uuid.uuid4().hex
-        conn = sqlite3.connect(self.dburl.database)
+        # Name the table after its contents so identical uploads are reused
+        table_id = self._content_id(df, column)
 
+        with self._upload_lock(table_id):
+            if self._cached_upload(table_id):
+                logger.debug("Reusing uploaded table: {}".format(table_id))
+                return table_id
+
+            created = False
+            conn = sqlite3.connect(
+                self.scratch_database, uri=True, isolation_level=None
+            )
+            try:
+                conn.execute("PRAGMA synchronous = OFF")
+                # Switching a database out of WAL mode is persistent, so
+                # only databases with a rollback journal keep it in memory
+                mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                if mode.lower() != "wal":
+                    conn.execute("PRAGMA journal_mode = MEMORY")
+                if column:
+                    conn.enable_load_extension(True)
+                    self._load_spatialite(conn)
+                # Take the write lock before checking for the table, so that
+                # concurrent processes do not upload the same table twice
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if not self._table_exists(conn, table_id):
+                        self._bulk_insert(
+                            conn,
+                            table_id,
+                            df,
+                            column,
+                            (index_label or "index") if index else None,
+                        )
+                        created = True
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+
+            self._remember_upload(table_id, table_id)
+            if created:
+                self._track_upload(table_id, table_id)
+
+        return table_id
+
+    def drop_tables(self, tables):
+        """Drop tables uploaded to the scratch database
+
+        Tables that cannot be dropped, e.g., because the scratch database is
+        locked, are left behind with a warning.
+        """
+        conn = sqlite3.connect(
+            self.scratch_database, uri=True, isolation_level=None
+        )
+        try:
+            for content_id, table_uri in tables:
+                with self._upload_lock(content_id):
+                    try:
+                        conn.execute(
+                            'DROP TABLE IF EXISTS "{}"'.format(table_uri)
+                        )
+                    except sqlite3.OperationalError as e:
+                        logger.warning(
+                            "Could not drop table {}: {}".format(table_uri, e)
+                        )
+                    self._forget_upload(content_id, table_uri)
+        finally:
+            conn.close()
+
+    def _bulk_insert(self, conn, table_id, df, column=None, position=None):
+        """Create a table and insert the rows of a dataframe into it
+
+        Parameters
+        ----------
+        conn : :class:`sqlite3.Connection`
+            Connection with an open transaction, and Spatialite loaded if
+            :code:`column` is set
+        table_id : str
+            Name of the table to create
+        df : :class:`pandas.DataFrame`
+            Dataframe to insert. It is not copied: rows are bound from its
+            column arrays a batch at a time.
+        column : str, optional
+            Column with WKT geometries to parse into :code:`__geometry__`
+        position : str, optional
+            Name of a column to store the row positions in
+        """
         # Here we're mimicking BQ client by implicitly creating a column
         # __index_level_0__ via the pyarrow dependency
-        df = df.reset_index()
-        df = df.rename(columns={"index": "__index_level_0__"})
+        key = df.index.name or "__index_level_0__"
+        columns = [(key, df.index)]
+        if position:
+            columns.append((position, pd.RangeIndex(len(df))))
+        columns += list(df.items())
 
-        # Load dataframe into SQL table
-        df.to_sql(table_id, con=conn, index=index, if_exists=if_exists)
+        dialect = sqlite_dialect.dialect()
+        definitions = [
+            '"{}" {}'.format(
+                name, self._column_type(values.dtype)().compile(dialect)
+            )
+            for name, values in columns
+        ]
+        placeholders = ["?{}".format(i + 1) for i in range(len(columns))]
+        if column:
+            definitions.append('"{}" BLOB'.format(GEOMETRY_COLUMN))
+            placeholders.append(
+                "ST_GeomFromText(?{}, 4326)".format(
+                    [name for name, _ in columns].index(column) + 1
+                )
+            )
+        conn.execute(
+            'CREATE TABLE "{}" ({})'.format(table_id, ", ".join(definitions))
+        )
 
-        return table_id
+        insert = 'INSERT INTO "{}" VALUES ({})'.format(
+            table_id, ", ".join(placeholders)
+        )
+        for start in range(0, len(df), INSERT_BATCH_SIZE):
+            stop = start + INSERT_BATCH_SIZE
+            conn.executemany(
+                insert,
+                zip(
+                    *(self._bind(values[start:stop]) for _, values in columns)
+                ),
+            )
+
+        conn.execute(
+            'CREATE INDEX "{0}_key" ON "{0}" ("{1}")'.format(table_id, key)
+        )
+
+    def _bind(self, values):
+        """Convert a slice of a column to values SQLite can bind"""
+        if ptypes.is_datetime64_any_dtype(values.dtype):
+            # Stored as text, as pandas.DataFrame.to_sql does
+            values = pd.Series(values).dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+        values = pd.Series(values)
+        if not values.hasnans:
+            return values.tolist()
+        values = values.astype(object)
+        return values.where(values.notnull(), None).tolist()
+
+    def _table_exists(self, conn, table_id):
+        """Check if a table exists in the database"""
+        cursor = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table_id,),
+        )
+        return cursor.fetchone() is not None
 
     def _load_spatialite(self, conn):
         """Load mod_spatialite or libspatialite"""
@@ -51,12 +705,65 @@ class SQLiteCore(DBCore):
             logger.trace("Using libspatialite")
 
     def _connection_listener(self, conn, record):
-        """Loads spatialite whenever a connection is detected"""
+        """Loads spatialite and attaches the scratch database whenever a
+        connection is detected
+        """
         conn.enable_load_extension(True)
         self._load_spatialite(conn)
+        self._attach_scratch(conn, record)
+
+    def _checkout_listener(self, conn, record, proxy):
+        """Attaches the scratch database again if it was removed since the
+        connection attached it, see :code:`_remove_scratch`
+        """
+        if record.info[SCRATCH] != self._scratch_removals:
+            conn.execute("DETACH DATABASE {}".format(SCRATCH))
+            self._attach_scratch(conn, record)
+
+    def _attach_scratch(self, conn, record):
+        """Attach the scratch database to a connection"""
+        record.info[SCRATCH] = self._scratch_removals
+        conn.execute(
+            "ATTACH DATABASE ? AS {}".format(SCRATCH),
+            (self.scratch_database,),
+        )
+
+    def _connect(self):
+        """Open the source database, read-only or immutable if configured
+
+        Connections are opened with URI filenames, so that in-memory scratch
+        databases can be attached.
+        """
+        if self._in_memory:
+            return sqlite3.connect(
+                ":memory:", uri=True, check_same_thread=False
+            )
+        flags = []
+        if self._read_only:
+            flags.append("mode=ro")
+        if self.options.IMMUTABLE:
+            flags.append("immutable=1")
+        uri = "file:{}{}".format(
+            pathname2url(os.path.abspath(self.dburl.database)),
+            "?" + "&".join(flags) if flags else "",
+        )
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _create_engine(self):
+        """Create a pooled engine that loads spatialite on every connection
 
-    def get_engine(self):
-        """Get the engine from the DBCore and load spatialite"""
-        engine = create_engine(self.dburl)
+        File databases are pooled (SQLAlchemy defaults to no pooling for
+        SQLite), so spatialite is only loaded once per pooled connection.
+        """
+        if self._in_memory:
+            engine = create_engine(self.dburl, creator=self._connect)
+        else:
+            engine = create_engine(
+                self.dburl,
+                creator=self._connect,
+                poolclass=QueuePool,
+                pool_size=self.options.POOL_SIZE,
+            )
         event.listen(engine, "connect", self._connection_listener)
+        event.listen(engine, "checkout", self._checkout_listener)
         return engine
@@ -39,9 +39,32 @@ class BQConfig(Config):
         running the actual query. Default is :code:`geomancer`.
     EXPIRY : int, None
         Number of hours for a given table to expire. Default is :code:`3`
-    MAX_RETRIES : int
-        Number of retries for the upload job to ensure that the table exists.
-        Default is :code:`10`
+    INLINE_THRESHOLD : int
+        Number of rows up to which dataframe targets are embedded in the query
+        instead of being uploaded with a load job. Targets with more values
+        than a query can have parameters are uploaded regardless. Set to
+        :code:`0` to always upload. Default is :code:`500`
+    LOAD_TIMEOUT : float, None
+        Number of seconds to wait for an upload job before raising a
+        :code:`TimeoutError`. The job is polled with exponential backoff,
+        starting at a quarter of a second. Default is :code:`600`
+    MATERIALIZE_GEOMETRY : bool
+        Rewrite uploaded targets with their geometries parsed into a
+        GEOGRAPHY column. This runs a query job after every upload, so by
+        default the geometries are parsed in the spells' queries instead.
+        Default is :code:`False`
+    MAX_CONCURRENCY : int
+        Maximum number of spells a :code:`SpellBook` casts at the same time
+        against the database. Default is :code:`5`
+    POOL_SIZE : int
+        Number of connections kept open in the engine's pool. Default is
+        :code:`5`
+    TABLE_CACHE_TTL : float, None
+        Number of seconds to cache reflected table metadata. Default is
+        :code:`None` (cache until invalidated)
+    UPLOAD_GEOMETRY_ONLY : bool
+        Only upload the geometries of a dataframe target, and join the
+        features back to its other columns locally. Default is :code:`True`
 
     """
 
@@ -51,7 +74,13 @@ class BQConfig(Config):
 
     DATASET_ID = "geomancer"
     EXPIRY = 3
-    MAX_RETRIES = 10
+    INLINE_THRESHOLD = 500
+    LOAD_TIMEOUT = 600
+    MATERIALIZE_GEOMETRY = False
+    MAX_CONCURRENCY = 5
+    POOL_SIZE = 5
+    TABLE_CACHE_TTL = None
+    UPLOAD_GEOMETRY_ONLY = True
 
 
 class SQLiteConfig(Config):
@@ -70,6 +99,45 @@ class SQLiteConfig(Config):
         :code:`replace` (drop the table before inserting new values).
         Other options are :code:`fail` (raise a ValueError) and
         :code:`append` (insert new values to the existing table)
+    IMMUTABLE : bool
+        Open the source database as immutable, i.e., read-only and without
+        any locking, so that many processes read it without contention. The
+        file must not change while it is open. Default is :code:`False`
+    INLINE_THRESHOLD : int
+        Number of rows up to which dataframe targets are embedded in the query
+        instead of being written to the database. Each value is bound as a
+        parameter, so targets with more values than SQLite can bind are
+        written regardless. Set to :code:`0` to always write. Default is
+        :code:`200`
+    MAX_CONCURRENCY : int
+        Maximum number of spells a :code:`SpellBook` casts at the same time
+        against the database. Default is :code:`4`
+    POOL_SIZE : int
+        Number of connections kept open in the engine's pool. Spatialite is
+        loaded once per pooled connection. Default is :code:`5`
+    READ_ONLY : bool
+        Open the source database read-only. Spatial indexes are then not
+        built, so build them beforehand with :code:`prepare_source`.
+        Default is :code:`False`
+    SCRATCH_DATABASE : str or None
+        Database the targets are written to, attached to every connection
+        as :code:`scratch`. Set to :code:`:memory:` to keep them in memory,
+        in which case spells are casted in threads, or to a file path. If not
+        set, each core uses its own file in the temporary directory, which is
+        removed once its last session ends. Default is :code:`None`
+    SPATIAL_INDEX : bool
+        Build a persistent R*Tree spatial index on source tables the first
+        time they are used, so spells only compare nearby features. This
+        writes to the source database, so by default the indexes are only
+        built explicitly with :code:`prepare_source`. Default is
+        :code:`False`
+    TABLE_CACHE_TTL : float, None
+        Number of seconds to cache reflected table metadata. Default is
+        :code:`None` (cache until invalidated)
+    UPLOAD_GEOMETRY_ONLY : bool
+        Only write the geometries of a dataframe target to the database, and
+        join the features back to its other columns locally. Default is
+        :code:`True`
     """
 
     @property
@@ -79,3 +147,33 @@ class SQLiteConfig(Config):
     INDEX = False
     INDEX_LABEL = None
     IF_EXISTS = "replace"
+    IMMUTABLE = False
+    INLINE_THRESHOLD = 200
+    MAX_CONCURRENCY = 4
+    POOL_SIZE = 5
+    READ_ONLY = False
+    SCRATCH_DATABASE = None
+    SPATIAL_INDEX = False
+    TABLE_CACHE_TTL = None
+    UPLOAD_GEOMETRY_ONLY = True
+
+
+class LocalConfig(Config):
+    """Configuration for casting spells in-process with LocalCore
+
+    Attributes
+    ----------
+    CHUNKSIZE : int, None
+        Number of targets evaluated at a time. Default is :code:`None`
+        (all targets at once)
+    MAX_CONCURRENCY : int
+        Maximum number of spells a :code:`SpellBook` evaluates at the same
+        time. Default is :code:`4`
+    """
+
+    @property
+    def name(self):
+        return "local"
+
+    CHUNKSIZE = None
+    MAX_CONCURRENCY = 4
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+"""Persistent cache of casted features
+
+Recasting the same spells over mostly the same points sends the same work to
+the database again. A :code:`ResultCache` stores the features of each distinct
+geometry on disk, so that only the geometries not seen before are sent to the
+backend:
+
+    .. code-block:: python
+
+        from geomancer.cache import ResultCache
+        from geomancer.spells import DistanceToNearest
+
+        cache = ResultCache("/tmp/geomancer", max_bytes=2 ** 30)
+        spell = DistanceToNearest("embassy",
+                                  source_table="gis_osm_pois_free_1",
+                                  feature_name="dist_embassy")
+        df_with_features = spell.cast(df, dburl="sqlite:///source.sqlite",
+                                      cache=cache)
+
+Features are stored in one directory per spell configuration and source
+table version, see :meth:`geomancer.spells.base.Spell.config` and
+:meth:`geomancer.backend.cores.base.DBCore.fingerprint`. Rows are keyed on a
+hash of their geometry. The features of each batch of misses are written to
+their own Parquet file, so that processes sharing the cache never rewrite each
+other's files. The files of a directory are compacted into one once there are
+more than :code:`MAX_PARTS`, and the least recently used directories are
+evicted once the cache grows over :code:`max_bytes`.
+"""
+
+# Import standard library
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+
+# Import modules
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .incremental import nullable
+
+# Environment variable overriding the default cache directory
+CACHE_DIR_ENV = "GEOMANCER_CACHE_DIR"
+
+HASH_COLUMN = "__hash__"
+
+# Number of files of a spell's features over which they are compacted
+MAX_PARTS = 16
+
+
+class ResultCache(object):
+    """On-disk cache of spell results keyed on geometries"""
+
+    def __init__(self, directory=None, max_bytes=2**30):
+        """Initialize the cache
+
+        Parameters
+        ----------
+        directory : str, optional
+            Directory to store the cached features in. Default is the
+            :code:`GEOMANCER_CACHE_DIR` environment variable, or
+            :code:`~/.cache/geomancer`
+        max_bytes : int, optional
+            Size of the directory over which the least recently used files are
+            evicted. Default is 1 GiB
+        """
+        self.directory = directory or os.environ.get(
+            CACHE_DIR_ENV, os.path.join("~", ".cache", "geomancer")
+        )
+        self.directory = os.path.expanduser(self.directory)
+        self.max_bytes = max_bytes
+        self._locks = defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled, e.g., when casting in worker processes
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def key(self, spell, core):
+        """Name of the directory storing the features of a spell
+
+        Parameters
+        ----------
+        spell : :class:`geomancer.spells.base.Spell`
+            Spell whose features are cached
+        core : :class:`geomancer.backend.cores.base.DBCore`
+            Core the spell is casted with
+
+        Returns
+        -------
+        str
+        """
+        digest = hashlib.sha1()
+        digest.update(
+            repr(
+                [
+                    type(spell).__module__,
+                    type(spell).__name__,
+                    sorted(spell.config().items()),
+                    str(core.dburl),
+                    spell.source_table,
+                    core.fingerprint(spell.source_table),
+                ]
+            ).encode("utf-8")
+        )
+        return uuid.UUID(hex=digest.hexdigest()[:32], version=4).hex
+
+    def cast(self, spell, target, dburl, column, keep_index, features_only):
+        """Cast a spell, serving the features of known geometries from disk
+
+        Parameters
+        ----------
+        spell : :class:`geomancer.spells.base.Spell`
+            Spell to cast
+        target : :class:`pandas.DataFrame`
+            Dataframe containing the points to compare upon
+        dburl : str
+            Database url used to configure backend connection
+        column : str
+            Column to look the geometries from
+        keep_index : boolean
+            Include index in output dataframe
+        features_only : boolean
+            Only return features as output dataframe
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Output dataframe with the same columns as :code:`Spell.cast`
+        """
+        core = spell._get_cast_core(dburl)
+        path = os.path.join(self.directory, self.key(spell, core))
+        names = spell.feature_names
+        hashes = pd.util.hash_pandas_object(
+            target[column], index=False
+        ).to_numpy()
+
+        with self._lock(path):
+            cached = self._read(path, len(names))
+            missing = ~np.isin(hashes, cached.index.to_numpy())
+            missing &= ~pd.Series(hashes).duplicated().to_numpy()
+            if missing.any():
+                logger.debug(
+                    "Casting {} of {} geometries not in cache".format(
+                        missing.sum(), len(hashes)
+                    )
+                )
+                fresh = self._cast_missing(
+                    spell, target, dburl, column, np.flatnonzero(missing)
+                )
+                fresh.index = pd.Index(hashes[missing], name=HASH_COLUMN)
+                self._write(path, fresh)
+                cached = pd.concat([cached, fresh]) if len(cached) else fresh
+        self._evict(keep=path)
+
+        features = cached.reindex(hashes)
+        features.columns = names
+        return spell._assemble(target, features, keep_index, features_only)
+
+    def clear(self):
+        """Remove all cached features"""
+        for path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _cast_missing(self, spell, target, dburl, column, positions):
+        """Cast a spell on the geometries at some positions of the target
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Features aligned with the positions, :code:`NaN` where the spell
+            returned no row
+        """
+        misses = target[[column]].iloc[positions].reset_index(drop=True)
+        features = spell.cast(
+            misses, dburl=dburl, column=column, features_only=True
+        ).set_index("__index_level_0__")
+        # Integer features are kept as nullable integers, so that they can
+        # be read back without losing their dtype
+        features = nullable(features).reindex(pd.RangeIndex(len(misses)))
+        return pd.DataFrame(
+            OrderedDict(
+                (str(i), features[name])
+                for i, name in enumerate(spell.feature_names)
+            )
+        )
+
+    def _lock(self, path):
+        """Lock serializing the casts of a spell's misses within the process
+
+        Other processes may cast the same misses at the same time, but they
+        write them to their own files, see :code:`_write`.
+        """
+        with self._locks_lock:
+            return self._locks[path]
+
+    def _entries(self):
+        """Directories of the cached spells"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            path
+            for path in (
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+            )
+            if os.path.isdir(path)
+        ]
+
+    def _parts(self, path):
+        """Files of a spell's features"""
+        try:
+            names = os.listdir(path)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(path, name)
+            for name in names
+            if name.endswith(".parquet")
+        ]
+
+    def _read(self, path, size, parts=None):
+        """Read the features of a spell, marking them as recently used
+
+        Files removed in the meantime by another process, e.g., when
+        compacting, are skipped. Their rows are then casted again.
+        """
+        frames = []
+        for part in self._parts(path) if parts is None else parts:
+            try:
+                frames.append(pd.read_parquet(part))
+            except FileNotFoundError:
+                continue
+        if not frames:
+            return pd.DataFrame(
+                OrderedDict((str(i), []) for i in range(size)),
+                index=pd.Index([], dtype=np.uint64, name=HASH_COLUMN),
+            )
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        cached = pd.concat(frames) if len(frames) > 1 else frames[0]
+        return cached[~cached.index.duplicated()]
+
+    def _write(self, path, df):
+        """Atomically write features to a new file"""
+        os.makedirs(path, exist_ok=True)
+        part = os.path.join(path, uuid.uuid4().hex + ".parquet")
+        tmp = "{}.{}.tmp".format(part, os.getpid())
+        df.to_parquet(tmp)
+        os.replace(tmp, part)
+
+    def _compact(self, path, parts):
+        """Merge the files of a spell's features into one
+
+        Only the files that were read are removed, so that files written by
+        other processes in the meantime are kept.
+        """
+        logger.debug("Compacting {} files in {}".format(len(parts), path))
+        cached = self._read(path, 0, parts)
+        if len(cached):
+            self._write(path, cached)
+        for part in parts:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, keep=None):
+        """Compact the spells with too many files, and remove the least
+        recently used ones over the size limit
+        """
+        entries = []
+        for path in self._entries():
+            parts = self._parts(path)
+            if len(parts) > MAX_PARTS:
+                with self._lock(path):
+                    self._compact(path, self._parts(path))
+                parts = self._parts(path)
+            size = 0
+            for part in parts:
+                try:
+                    size += os.path.getsize(part)
+                except FileNotFoundError:
+                    pass
+            try:
+                entries.append((os.stat(path).st_mtime, size, path))
+            except FileNotFoundError:
+                pass
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            logger.debug("Evicting {} from the result cache".format(path))
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers for casting only the rows that changed since a previous cast
+
+Targets that grow over time do not need to be featurized from scratch. Given
+the output of a previous cast, :code:`Spell.cast_incremental` and
+:code:`SpellBook.cast_incremental` diff the current target against it by
+primary key and geometry, cast only the new or changed rows, and merge them
+with the previous features:
+
+    .. code-block:: python
+
+        from geomancer.spells import DistanceToNearest
+
+        spell = DistanceToNearest("embassy",
+                                  source_table="gis_osm_pois_free_1",
+                                  feature_name="dist_embassy")
+        previous = spell.cast(df, dburl="sqlite:///source.sqlite",
+                              keep_index=True)
+
+        # ... rows are added to df ...
+        df_with_features = spell.cast_incremental(
+            df, previous, dburl="sqlite:///source.sqlite", keep_index=True
+        )
+
+The previous output must hold the primary key: cast with :code:`keep_index`
+or :code:`features_only` when keying on the index. If it also holds the
+geometry column, rows whose geometry changed are casted again. Targets missing
+from the previous output, e.g., those dropped by a spell because they had no
+features, are casted again as well.
+
+When the source table changes, pass the changeset to update the features of
+the targets near the changed features only:
+
+    .. code-block:: python
+
+        # WKT of added and removed features, and of both the old and the new
+        # location of moved features
+        changes = pd.DataFrame({
+            "fclass": ["embassy", "embassy"],
+            "WKT": ["POINT (121.0 14.6)", "POINT (121.1 14.7)"],
+        })
+        df_with_features = spell.cast_incremental(
+            df, previous, changes=changes, dburl="sqlite:///source.sqlite",
+            keep_index=True
+        )
+
+Targets within :code:`within` meters of a change matching the spell's filter
+are casted again. If the changeset has no column to filter on, all changes are
+considered.
+"""
+
+# Import standard library
+from contextlib import ExitStack
+
+# Import modules
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+CHANGE_ID = "__change_id__"
+
+
+def read_previous(previous, core=None):
+    """Read the output of a previous cast
+
+    Parameters
+    ----------
+    previous : :class:`pandas.DataFrame` or str
+        Previous output, path to a Parquet file, or table URI in the database
+    core : :class:`geomancer.backend.cores.base.DBCore`, optional
+        Core to read a previous output table with
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+
+    Raises
+    ------
+    ValueError
+        If the previous output is a table but no core was given
+    """
+    if isinstance(previous, pd.DataFrame):
+        return previous
+    if previous.endswith(".parquet"):
+        return pd.read_parquet(previous)
+    if core is None:
+        raise ValueError("dburl was not supplied")
+    return core.read_table(previous)
+
+
+def target_keys(df, pkey):
+    """Primary keys of the target rows
+
+    Parameters
+    ----------
+    df : :class:`pandas.DataFrame`
+        Target dataframe
+    pkey : str
+        Primary key column. :code:`__index_level_0__` refers to the index if
+        there is no column with that name.
+
+    Returns
+    -------
+    :class:`pandas.Index`
+    """
+    if pkey in df.columns:
+        return pd.Index(df[pkey])
+    if pkey == "__index_level_0__":
+        return df.index
+    raise ValueError("Primary key {} not found in target".format(pkey))
+
+
+def previous_keys(df, pkey):
+    """Primary keys of the rows of a previous output
+
+    Outputs keep the target's index as an :code:`__index_level_0__` column
+    when casted with :code:`keep_index`, while :code:`SpellBook` outputs keep
+    it as their index.
+
+    Parameters
+    ----------
+    df : :class:`pandas.DataFrame`
+        Previous output
+    pkey : str
+        Primary key column
+
+    Returns
+    -------
+    :class:`pandas.Index`
+    """
+    if pkey in df.columns:
+        return pd.Index(df[pkey])
+    if pkey == "__index_level_0__":
+        return df.index
+    raise ValueError(
+        "Primary key {} not found in previous output, cast with "
+        "keep_index=True or features_only=True".format(pkey)
+    )
+
+
+def diff(target, previous, column, pkey):
+    """Match the target rows with the rows of a previous output
+
+    Parameters
+    ----------
+    target : :class:`pandas.DataFrame`
+        Current target dataframe
+    previous : :class:`pandas.DataFrame`
+        Previous output
+    column : str
+        Geometry column, compared if the previous output has it
+    pkey : str
+        Primary key column
+
+    Returns
+    -------
+    (:class:`numpy.ndarray`, :class:`numpy.ndarray`)
+        Mask of the target rows that are unchanged, and the positions of
+        their rows in the previous output
+    """
+    keys = previous_keys(previous, pkey)
+    if not keys.is_unique:
+        raise ValueError("Primary keys of the previous output are not unique")
+    positions = keys.get_indexer(target_keys(target, pkey))
+    unchanged = positions >= 0
+    if column in previous.columns and len(previous):
+        geometries = previous[column].to_numpy()[positions]
+        unchanged &= geometries == target[column].to_numpy()
+    return unchanged, positions
+
+
+def affected(spells, target, changes, column="WKT", dburl=None):
+    """Find the targets near changed source features
+
+    The changeset is loaded into each spell's database as a table, and a
+    :code:`NumberOf` probe per spell counts the changes within the spell's
+    range of each target. Probes sharing a changeset table are fused into a
+    single query. The changeset tables are dropped afterwards, see
+    :code:`DBCore.session`.
+
+    Parameters
+    ----------
+    spells : list of :class:`geomancer.spells.base.Spell`
+        Spells whose source table changed
+    target : :class:`pandas.DataFrame`
+        Target dataframe
+    changes : :class:`pandas.DataFrame`
+        Geometries of the added, removed, and moved source features in a
+        :code:`WKT` column, optionally with the columns the spells filter on
+    column : str, optional
+        Column to look the target geometries from. Default is :code:`WKT`
+    dburl : str, optional
+        Database url overriding the spells' own
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Mask of the targets within range of a change
+    """
+    # Imported here since the spells depend on this module
+    from .spellbook import SpellBook
+    from .spells import NumberOf
+
+    if changes.empty or target.empty:
+        return np.zeros(len(target), dtype=bool)
+    with ExitStack() as sessions:
+        probes = []
+        for i, spell in enumerate(spells):
+            core = spell._get_cast_core(dburl)
+            sessions.enter_context(core.session())
+            name = spell.source_column
+            frame = pd.DataFrame(
+                {
+                    CHANGE_ID: np.arange(len(changes)),
+                    "WKT": changes["WKT"].to_numpy(),
+                    name: changes[name].to_numpy()
+                    if name in changes.columns
+                    else spell.source_filter,
+                }
+            )
+            source_table = core.load(
+                df=frame, column="WKT", **core._inspect_options(core.options)
+            )
+            probes.append(
+                NumberOf(
+                    "{}:{}".format(spell.source_column, spell.source_filter),
+                    within=spell.radius,
+                    source_table=source_table,
+                    source_id=CHANGE_ID,
+                    feature_name="__affected_{}__".format(i),
+                    dburl=dburl or spell.dburl,
+                    options=spell.options,
+                )
+            )
+        counts = SpellBook(probes, column=column).cast(
+            target, features_only=True
+        )
+        return counts.notnull().any(axis=1).to_numpy()
+
+
+def merge(previous, fresh, unchanged, positions, names):
+    """Combine previous features with the features of the changed rows
+
+    Parameters
+    ----------
+    previous : :class:`pandas.DataFrame`
+        Previous output
+    fresh : :class:`pandas.DataFrame`
+        Features of the changed rows, indexed by their position among them
+    unchanged : :class:`numpy.ndarray`
+        Mask of the target rows that are unchanged, see :code:`diff`
+    positions : :class:`numpy.ndarray`
+        Positions of the target rows in the previous output
+    names : list of str
+        Feature names
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Features indexed by the position of the target rows. Integer features
+        are nullable, see :meth:`geomancer.spells.base.Spell._assemble`
+    """
+    missing = [name for name in names if name not in previous.columns]
+    if missing:
+        raise ValueError(
+            "Features {} not found in previous output".format(missing)
+        )
+    old = previous[names].iloc[positions[unchanged]]
+    old.index = np.flatnonzero(unchanged)
+    new = fresh.reindex(columns=names)
+    new.index = np.flatnonzero(~unchanged)[new.index.to_numpy(dtype=int)]
+    frames = [nullable(df) for df in (old, new) if len(df)]
+    features = pd.concat(frames) if frames else pd.DataFrame(columns=names)
+    return features.reindex(pd.RangeIndex(len(unchanged)))
+
+
+def nullable(df):
+    """Convert integer columns to nullable integers
+
+    This keeps integer features, e.g., counts, from being casted to floats
+    when they are aligned with rows that have no features.
+
+    Parameters
+    ----------
+    df : :class:`pandas.DataFrame`
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+    """
+    return df.astype(
+        {
+            name: "Int64"
+            for name, dtype in df.dtypes.items()
+            if ptypes.is_integer_dtype(dtype)
+        }
+    )
+
+
+def from_nullable(df, columns=None):
+    """Convert nullable numeric columns back to NumPy dtypes
+
+    Integer columns without missing values become :code:`int64`, and the
+    others :code:`float64`, as when features are joined with pandas.
+
+    Parameters
+    ----------
+    df : :class:`pandas.DataFrame`
+    columns : list of str, optional
+        Columns to convert. Default is all columns
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+    """
+    dtypes = {}
+    for name in columns if columns is not None else df.columns:
+        values = df[name]
+        if ptypes.is_extension_array_dtype(values) and ptypes.is_numeric_dtype(
+            values
+        ):
+            integer = (
+                ptypes.is_integer_dtype(values) and values.notnull().all()
+            )
+            dtypes[name] = "int64" if integer else "float64"
+    return df.astype(dtypes)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""Timing and instrumentation of casts
+
+Each stage of a cast (getting the core, uploading the target, reflecting
+tables, building and executing the query, and building the output) is timed as
+a :code:`Span`. Spans are passed to the callbacks subscribed with
+:code:`subscribe` once they end, along with their attributes such as row
+counts, bytes uploaded or fetched, and backend job IDs.
+
+A :code:`Collector` gathers the spans of a block of code and summarizes them:
+
+    .. code-block:: python
+
+        from geomancer.instrumentation import Collector
+
+        with Collector() as collector:
+            spellbook.cast(df)
+
+        print(collector.summary())
+
+Spans are recorded in the thread they run in, so casts in worker threads are
+collected as well. Spans ending in worker processes are not.
+"""
+
+# Import standard library
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Import modules
+import pandas as pd
+from loguru import logger
+
+# Attributes passed down from a span to the spans nested in it
+INHERITED = ("spell",)
+
+_SUBSCRIBERS = []
+_SUBSCRIBERS_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+class Span(object):
+    """A timed stage of a cast
+
+    Attributes
+    ----------
+    name : str
+        Name of the stage, e.g., :code:`load` or :code:`fetch`
+    attributes : dict
+        Attributes of the stage, e.g., :code:`rows`, :code:`bytes`, or
+        :code:`job_id`
+    parent : :class:`geomancer.instrumentation.Span` or None
+        Span this span is nested in
+    start : float
+        Start time, from :func:`time.perf_counter`
+    duration : float or None
+        Duration in seconds, :code:`None` while the span is running
+    error : Exception or None
+        Exception raised within the span
+    """
+
+    def __init__(self, name, attributes, parent=None):
+        self.name = name
+        self.parent = parent
+        self.attributes = OrderedDict(
+            (key, parent.attributes[key])
+            for key in INHERITED
+            if parent is not None and key in parent.attributes
+        )
+        self.attributes.update(attributes)
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes to the span"""
+        self.attributes.update(attributes)
+
+    def __repr__(self):
+        return "Span({!r}, duration={!r}, {})".format(
+            self.name,
+            self.duration,
+            ", ".join(
+                "{}={!r}".format(key, value)
+                for key, value in self.attributes.items()
+            ),
+        )
+
+
+def subscribe(callback):
+    """Call a function with every span that ends
+
+    Parameters
+    ----------
+    callback : callable
+        Function taking a :class:`geomancer.instrumentation.Span`. It is called
+        from the thread the span ran in and must be thread-safe.
+    """
+    with _SUBSCRIBERS_LOCK:
+        _SUBSCRIBERS.append(callback)
+
+
+def unsubscribe(callback):
+    """Stop calling a function subscribed with :code:`subscribe`"""
+    with _SUBSCRIBERS_LOCK:
+        if callback in _SUBSCRIBERS:
+            _SUBSCRIBERS.remove(callback)
+
+
+def current():
+    """Get the innermost running span of this thread, if any"""
+    stack = getattr(_LOCAL, "stack", None)
+    return stack[-1] if stack else None
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost running span of this thread
+
+    This lets code deep in a stage, e.g., a backend submitting a job, report
+    details without having the span passed down to it.
+    """
+    span = current()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a stage of a cast
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage
+    **attributes
+        Initial attributes of the span
+
+    Yields
+    ------
+    :class:`geomancer.instrumentation.Span`
+        The running span, to add attributes to
+    """
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    current_span = Span(name, attributes, stack[-1] if stack else None)
+    stack.append(current_span)
+    try:
+        yield current_span
+    except Exception as e:
+        current_span.error = e
+        raise
+    finally:
+        current_span.duration = time.perf_counter() - current_span.start
+        stack.pop()
+        _emit(current_span)
+
+
+def _emit(ended):
+    """Pass an ended span to the subscribers"""
+    with _SUBSCRIBERS_LOCK:
+        subscribers = list(_SUBSCRIBERS)
+    for callback in subscribers:
+        try:
+            callback(ended)
+        except Exception:
+            logger.exception("Instrumentation callback failed")
+
+
+class Collector(object):
+    """Gather the spans ending while it is active
+
+    Attributes
+    ----------
+    spans : list of :class:`geomancer.instrumentation.Span`
+        Spans collected so far
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def __enter__(self):
+        subscribe(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        unsubscribe(self)
+
+    def to_frame(self):
+        """Get the collected spans as a dataframe
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            One row per span with its :code:`stage`, :code:`parent`,
+            :code:`seconds`, :code:`error` and attributes
+        """
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return pd.DataFrame(
+                columns=["stage", "parent", "seconds", "error"]
+            )
+        return pd.DataFrame(
+            [
+                OrderedDict(
+                    [
+                        ("stage", s.name),
+                        ("parent", s.parent.name if s.parent else None),
+                        ("seconds", s.duration),
+                        ("error", repr(s.error) if s.error else None),
+                    ]
+                    + list(s.attributes.items())
+                )
+                for s in spans
+            ]
+        )
+
+    def summary(self, by="stage"):
+        """Aggregate the collected spans
+
+        Parameters
+        ----------
+        by : str or list of str, optional
+            Columns to group the spans by, e.g., :code:`["spell", "stage"]`.
+            Default is :code:`stage`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Number of spans, total and mean seconds, and total rows and bytes
+            per group, slowest first
+        """
+        df = self.to_frame()
+        for column in ("rows", "bytes"):
+            if column not in df.columns:
+                df[column] = 0
+        by = [by] if isinstance(by, str) else list(by)
+        for column in by:
+            df[column] = df[column].fillna("") if column in df.columns else ""
+        df["seconds"] = df["seconds"].astype(float)
+        grouped = df.groupby(by)
+        summary = pd.DataFrame(
+            OrderedDict(
+                [
+                    ("count", grouped["seconds"].count()),
+                    ("seconds", grouped["seconds"].sum()),
+                    ("mean_seconds", grouped["seconds"].mean()),
+                    ("rows", grouped["rows"].sum(min_count=1)),
+                    ("bytes", grouped["bytes"].sum(min_count=1)),
+                ]
+            )
+        )
+        return summary.sort_values("seconds", ascending=False)
@@ -46,6 +46,6 @@ Now other people can easily reuse your feature extractions in with their own dat
         df_with_features = spellbook.cast(df)
 """
 
-from .spellbook import SpellBook
+from .spellbook import SpellBook, SpellBookCastError
 
-__all__ = ["SpellBook"]
+__all__ = ["SpellBook", "SpellBookCastError"]
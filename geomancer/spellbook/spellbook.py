@@ -2,12 +2,59 @@
 
 
 # Import standard library
+import copy
 import importlib
 import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 
 # Import modules
+import numpy as np
 import pandas as pd
 
+from .. import incremental
+from ..backend.cores import LocalCore
+from ..spells.fused import FusedSpell
+
+
+class SpellBookCastError(Exception):
+    """Raised when some spells of a spell book failed to cast
+
+    Attributes
+    ----------
+    errors : dict
+        Exceptions raised, keyed by the feature names of the failed spells
+    result : :class:`pandas.DataFrame`
+        Output dataframe with the features of the spells that succeeded
+    """
+
+    def __init__(self, errors, result):
+        self.errors = errors
+        self.result = result
+        super(SpellBookCastError, self).__init__(
+            "{} spell(s) failed to cast: {}".format(
+                len(errors),
+                "; ".join(
+                    "{}: {!r}".format(name, error)
+                    for name, error in errors.items()
+                ),
+            )
+        )
+
+
+def _cast_spell(spell, df, column, cache=None):
+    """Cast a spell for a spell book, indexed to be joined with the input"""
+    return spell.cast(
+        df, column=column, features_only=True, cache=cache
+    ).set_index("__index_level_0__")
+
+
+def _cast_spell_in_slot(core, spell, df, column, cache=None):
+    """Cast a spell once the core has a free slot, see DBCore.slots"""
+    with core.slots:
+        return _cast_spell(spell, df, column, cache)
+
 
 class SpellBook(object):
     def __init__(self, spells, column="WKT", author=None, description=None):
@@ -29,28 +76,315 @@ class SpellBook(object):
         self.author = author
         self.description = description
 
-    def cast(self, df):
+    def cast(
+        self, df, fuse=True, max_workers=None, features_only=False, cache=None
+    ):
         """Runs the cast method of each spell in the spell book
 
+        Spells that can be fused and share a source table and database are
+        casted together as a :class:`geomancer.spells.fused.FusedSpell`, so
+        the source table is scanned once for all of them. Targets uploaded
+        while casting are kept until all spells are done, and dropped
+        afterwards, see :code:`DBCore.session`.
+
         Parameters
         ----------
         df : :class:`pandas.DataFrame`
             Dataframe containing the points to compare upon. By default, we
             will look into the :code:`geometry` column. You can specify your
             own column by passing an argument to the :code:`column` parameter.
+        fuse : boolean, optional
+            Fuse spells sharing a source table. Default is :code:`True`
+        max_workers : int, optional
+            Cast up to this many spells concurrently. Spells run in threads,
+            or in processes if their core is CPU-bound (see
+            :code:`DBCore.executor`), and each core runs at most
+            :code:`MAX_CONCURRENCY` of them at a time. If not set, spells are
+            casted one after the other.
+        features_only : boolean, optional
+            Only return the features, indexed like :code:`df`
+        cache : :class:`geomancer.cache.ResultCache`, optional
+            Serve the features of geometries casted before from this cache
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Output dataframe with the features from all spells, in the order
+            of the spells
+
+        Raises
+        ------
+        SpellBookCastError
+            If spells failed when casting concurrently. The features of the
+            other spells are kept in the exception's :code:`result`.
+        """
+        spells = self._fuse_spells() if fuse else self.spells
+        # Spells are casted on a positional index, so their results can be
+        # aligned by position instead of joined on the index
+        target = df.copy(deep=False)
+        target.index = pd.RangeIndex(len(df))
+        with self._sessions(spells):
+            if not max_workers:
+                features = [
+                    _cast_spell(spell, target, self.column, cache)
+                    for spell in spells
+                ]
+                return self._merge(df, features, features_only)
+
+            features, errors = self._cast_concurrently(
+                spells, target, max_workers, cache=cache
+            )
+        result = self._merge(df, features, features_only)
+        if errors:
+            raise SpellBookCastError(
+                OrderedDict(
+                    (", ".join(spells[i].feature_names), error)
+                    for i, error in errors.items()
+                ),
+                result,
+            )
+        return result
+
+    def cast_incremental(
+        self,
+        df,
+        previous,
+        dburl=None,
+        pkey="__index_level_0__",
+        features_only=False,
+        changes=None,
+        **kwargs
+    ):
+        """Runs the spells only on new or changed rows
+
+        The input is diffed against the output of a previous cast by primary
+        key and geometry, see :mod:`geomancer.incremental`. Only the rows that
+        are new or whose geometry changed are casted, and the others keep
+        their previous features. If the source tables changed since, the rows
+        near the changed features are casted again as well.
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Dataframe containing the points to compare upon
+        previous : :class:`pandas.DataFrame` or str
+            Output of a previous :code:`cast`, path to a Parquet file, or
+            table URI in the database
+        dburl : str, optional
+            Database url to read a previous output table from. Default is the
+            database of the first spell.
+        pkey : str, optional
+            The primary key column of the input and the previous output.
+            Default is __index_level_0__, which refers to the input's index.
+        features_only : boolean, optional
+            Only return the features, indexed like :code:`df`
+        changes : :class:`pandas.DataFrame`, optional
+            Geometries of the source features added, removed, or moved since
+            the previous cast in a :code:`WKT` column, see
+            :func:`geomancer.incremental.affected`
+        **kwargs
+            Other arguments of :code:`cast`
 
         Returns
         -------
         :class:`pandas.DataFrame`
             Output dataframe with the features from all spells
         """
-        for spell in self.spells:
-            df = df.join(
-                spell.cast(
-                    df, column=self.column, features_only=True
-                ).set_index("__index_level_0__")
+        dburl = dburl or next(
+            (spell.dburl for spell in self.spells if spell.dburl), None
+        )
+        core = self.spells[0].get_core(dburl) if dburl else None
+        previous = incremental.read_previous(previous, core)
+        unchanged, positions = incremental.diff(
+            df, previous, self.column, pkey
+        )
+        if changes is not None:
+            unchanged &= ~incremental.affected(
+                self.spells, df, changes, self.column
             )
-        return df
+        changed = df.iloc[np.flatnonzero(~unchanged)].reset_index(drop=True)
+        names = [name for spell in self.spells for name in spell.feature_names]
+        if len(changed):
+            fresh = self.cast(changed, features_only=True, **kwargs)
+        else:
+            fresh = pd.DataFrame(columns=names)
+        features = incremental.merge(
+            previous, fresh, unchanged, positions, names
+        )
+        features = incremental.from_nullable(features)
+        features.index = df.index
+        if features_only:
+            return features
+        return pd.concat([df, features], axis=1)
+
+    @staticmethod
+    def _sessions(spells):
+        """Open a session on the core of each spell, see
+        :code:`DBCore.session`
+        """
+        cores = []
+        with ExitStack() as sessions:
+            for spell in spells:
+                if spell.dburl:
+                    core = spell.get_core(spell.dburl)
+                    if core not in cores:
+                        cores.append(core)
+                        sessions.enter_context(core.session())
+            return sessions.pop_all()
+
+    def _cast_concurrently(self, spells, df, max_workers, cache=None):
+        """Cast spells in worker pools
+
+        Returns
+        -------
+        (list, dict)
+            Features of each spell (:code:`None` if it failed), and the
+            exceptions raised keyed by the position of the failed spells
+        """
+        futures = [None] * len(spells)
+        errors = OrderedDict()
+        threads = ThreadPoolExecutor(max_workers)
+        processes = OrderedDict()
+        cores = self._prepare_workers(spells, df, errors)
+        try:
+            for i, (spell, core) in enumerate(zip(spells, cores)):
+                if core is None:
+                    continue
+                try:
+                    if core.executor != "process":
+                        futures[i] = threads.submit(
+                            _cast_spell_in_slot,
+                            core,
+                            spell,
+                            df,
+                            self.column,
+                            cache,
+                        )
+                        continue
+                    if core not in processes:
+                        processes[core] = ProcessPoolExecutor(
+                            min(max_workers, core.options.MAX_CONCURRENCY)
+                        )
+                    # Workers use the tables of the core loaded in this
+                    # process, see DBCore.worker_options
+                    worker_spell = copy.copy(spell)
+                    worker_spell.options = core.worker_options()
+                    futures[i] = processes[core].submit(
+                        _cast_spell, worker_spell, df, self.column, cache
+                    )
+                except Exception as e:
+                    errors[i] = e
+            features = []
+            for i, future in enumerate(futures):
+                try:
+                    features.append(future.result() if future else None)
+                except Exception as e:
+                    errors[i] = e
+                    features.append(None)
+        finally:
+            threads.shutdown()
+            for pool in processes.values():
+                pool.shutdown()
+        return features, OrderedDict(sorted(errors.items()))
+
+    def _prepare_workers(self, spells, df, errors):
+        """Get the core of each spell, and prepare the tables of the ones
+        casted in worker processes
+
+        The target is loaded and every distinct source is prepared in this
+        process before any worker starts, see :code:`DBCore.get_tables`, so
+        that workers reuse them instead of racing to index the same source.
+
+        Returns
+        -------
+        list
+            Core of each spell, :code:`None` if it failed. The exceptions
+            are added to :code:`errors`, keyed by the position of the spell.
+        """
+        cores = [None] * len(spells)
+        prepared = set()
+        for i, spell in enumerate(spells):
+            try:
+                core = spell._get_cast_core(None)
+                source_uri = None
+                if core.executor == "process":
+                    source_uri = spell.source_uri(core)
+                if source_uri and (core, source_uri) not in prepared:
+                    target = df
+                    if spell._geometry_only(core, df, "__index_level_0__"):
+                        target = df[[self.column]]
+                    core.get_tables(
+                        source_uri, target, core.get_engine(), self.column
+                    )
+                    prepared.add((core, source_uri))
+                cores[i] = core
+            except Exception as e:
+                errors[i] = e
+        return cores
+
+    def _merge(self, df, features, features_only=False):
+        """Assemble the output from the features of each spell
+
+        Features are indexed by position in :code:`df`. Their columns are
+        scattered into arrays as long as :code:`df`, and the output frame is
+        built once at the end.
+        """
+        columns = OrderedDict()
+        for feature in features:
+            if feature is None:
+                continue
+            positions = feature.index.to_numpy()
+            for name in feature.columns:
+                columns[name] = self._align(
+                    feature[name].to_numpy(), positions, len(df)
+                )
+        names = [
+            name
+            for spell in self.spells
+            for name in spell.feature_names
+            if name in columns
+        ]
+        result = pd.DataFrame(
+            OrderedDict((name, columns[name]) for name in names),
+            index=df.index,
+        )
+        if features_only:
+            return result
+        return pd.concat([df, result], axis=1)
+
+    @staticmethod
+    def _align(values, positions, length):
+        """Scatter values to their positions, missing values are NaN"""
+        if len(positions) == length:
+            aligned = np.empty(length, dtype=values.dtype)
+        elif values.dtype.kind in "biuf":
+            aligned = np.full(length, np.nan)
+        else:
+            aligned = np.full(length, np.nan, dtype=object)
+        aligned[positions] = values
+        return aligned
+
+    def _fuse_spells(self):
+        """Group the spells that can be casted in a single query"""
+        groups = OrderedDict()
+        for spell in self.spells:
+            if self._can_fuse(spell):
+                key = FusedSpell.group_key(spell)
+            else:
+                key = id(spell)
+            groups.setdefault(key, []).append(spell)
+        return [
+            FusedSpell(spells) if len(spells) > 1 else spells[0]
+            for spells in groups.values()
+        ]
+
+    @staticmethod
+    def _can_fuse(spell):
+        """Check if a spell is fused with the others when casting"""
+        if not (spell.dburl and FusedSpell.supports(spell)):
+            return False
+        # LocalCore evaluates spells in memory, there is no scan to share
+        return not isinstance(spell.get_core(spell.dburl), LocalCore)
 
     def to_json(self, filename=None, **kwargs):
         """Exports spell book as a JSON string
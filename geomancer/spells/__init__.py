@@ -6,7 +6,8 @@ first instantiated, and then casted on a DataFrame of points.
 """
 
 from .distance_to_nearest import DistanceToNearest
+from .k_nearest import KNearest
 from .number_of import NumberOf
 from .length_of import LengthOf
 
-__all__ = ["DistanceToNearest", "NumberOf", "LengthOf"]
+__all__ = ["DistanceToNearest", "KNearest", "NumberOf", "LengthOf"]
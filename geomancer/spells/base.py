@@ -21,14 +21,18 @@ All methods must be implemented in order to not raise a
 import abc
 
 # Import modules
+import numpy as np
 import pandas as pd
 from loguru import logger
+from sqlalchemy import and_
 from sqlalchemy.engine.url import make_url
 from sqlalchemy.sql import select
 
-from ..backend.cores import BigQueryCore, SQLiteCore
+from .. import incremental, instrumentation
+from ..backend.cores import BigQueryCore, LocalCore, SQLiteCore
+from ..backend.cores.base import GEOMETRY_COLUMN
 
-CORES = {"bigquery": BigQueryCore, "sqlite": SQLiteCore}
+CORES = {"bigquery": BigQueryCore, "sqlite": SQLiteCore, "local": LocalCore}
 
 
 class Spell(abc.ABC):
@@ -78,8 +82,264 @@ class Spell(abc.ABC):
         """
         return x.split(":") if len(x.split(":")) == 2 else ("fclass", x)
 
+    def extract_radii(self, within):
+        """Extract the ranges of a spell that accepts several of them
+
+        Parameters
+        ----------
+        within : float or list of float
+            A range, or a list of ranges with a feature for each
+
+        Returns
+        -------
+        list of float or None
+            The distinct ranges in increasing order, or :code:`None` if a
+            single range was given
+
+        Raises
+        ------
+        ValueError
+            If the list of ranges is empty
+        """
+        if np.isscalar(within):
+            return None
+        radii = sorted(set(within))
+        if not radii:
+            raise ValueError("within must have at least one range")
+        return radii
+
+    def radius_names(self, radii):
+        """Column names of the features of each range
+
+        Parameters
+        ----------
+        radii : list of float or None
+            Ranges as returned by :code:`extract_radii`
+
+        Returns
+        -------
+        list of str
+            :code:`<feature_name>_<range>` for each range, or only the
+            :code:`feature_name` if a single range was given
+        """
+        if radii is None:
+            return [self.feature_name]
+        return [
+            "{}_{}".format(
+                self.feature_name, int(r) if float(r).is_integer() else r
+            )
+            for r in radii
+        ]
+
+    @property
+    def radii(self):
+        """list of float or None: Ranges of the features if :code:`within` is
+        a list"""
+        return self.extract_radii(self.within)
+
+    @property
+    def radius(self):
+        """float: Range the target-feature pairs are computed within, the
+        largest one if the spell has several"""
+        radii = self.radii
+        return self.within if radii is None else radii[-1]
+
+    @property
+    def feature_names(self):
+        """list of str: Column names of the output features"""
+        return [self.feature_name]
+
+    def config(self):
+        """Parameters that determine the values of the spell's features
+
+        The feature name, database url and options are left out, so that
+        renamed spells can share cached features, see
+        :class:`geomancer.cache.ResultCache`.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in ("feature_name", "dburl", "options")
+        }
+
+    def feature_filter(self, source):
+        """Clause selecting the source features of the spell
+
+        Parameters
+        ----------
+        source : :class:`sqlalchemy.schema.Table`
+            Source table to extract features from.
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ClauseElement`
+        """
+        return source.c[self.source_column] == self.source_filter
+
+    def source_uri(self, core):
+        """Table to query the features from
+
+        Parameters
+        ----------
+        core : :class:`geomancer.backend.cores.base.DBCore`
+            DBCore instance to access DB-specific methods
+
+        Returns
+        -------
+        str
+            The :code:`source_table` by default
+        """
+        return self.source_table
+
+    def select_features(self, source, core, name, columns=None):
+        """Select the source features matching the spell's filter
+
+        Parameters
+        ----------
+        source : :class:`sqlalchemy.schema.Table`
+            Source table to extract features from.
+        core : :class:`geomancer.backend.cores.base.DBCore`
+            DBCore instance to access DB-specific methods
+        name : str
+            Name of the common table expression
+        columns : list of str, optional
+            Additional source columns to select
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.CTE`
+            Features with the :code:`source_id` and :code:`WKT` columns, the
+            :code:`__geometry__` column if the source was prepared, and a
+            :code:`__rowid__` column if the source has a spatial index
+        """
+        columns = [
+            source.c[self.source_id],
+            source.c.WKT,
+            *[source.c[name] for name in columns or []],
+        ]
+        if GEOMETRY_COLUMN in source.c:
+            columns.append(source.c[GEOMETRY_COLUMN])
+        rowid = core.rowid(source)
+        if rowid is not None:
+            columns.append(rowid.label("__rowid__"))
+        return select(columns, self.feature_filter(source)).cte(name)
+
+    def target_columns(self, target):
+        """Columns of the target to carry over to the output
+
+        Parameters
+        ----------
+        target : :class:`sqlalchemy.sql.expression.FromClause`
+            Target table to add features to.
+
+        Returns
+        -------
+        list of :class:`sqlalchemy.sql.expression.ColumnElement`
+            All columns except the parsed :code:`__geometry__` column
+        """
+        return [col for col in target.columns if col.key != GEOMETRY_COLUMN]
+
+    def candidates(
+        self, core, source, features, target_geom, source_geom, within
+    ):
+        """Cheap predicates prefiltering target-feature pairs
+
+        These come from the core's spatial index and envelope hooks, see
+        :meth:`geomancer.backend.cores.base.DBCore.index_predicate` and
+        :meth:`geomancer.backend.cores.base.DBCore.within_predicate`. Spells
+        put them before their exact geometric predicate.
+
+        Parameters
+        ----------
+        core : :class:`geomancer.backend.cores.base.DBCore`
+            DBCore instance to access DB-specific methods
+        source : :class:`sqlalchemy.schema.Table`
+            Source table the features were selected from
+        features : :class:`sqlalchemy.sql.expression.CTE`
+            Features returned by :code:`select_features`
+        target_geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry of the target
+        source_geom : :class:`sqlalchemy.sql.expression.ColumnElement`
+            Geometry of the feature
+        within : float
+            Search radius in meters
+
+        Returns
+        -------
+        list of :class:`sqlalchemy.sql.expression.ClauseElement`
+            Predicates to add to the pair computation, possibly empty
+        """
+        predicates = [
+            core.index_predicate(source, features, target_geom, within),
+            core.within_predicate(target_geom, source_geom, within),
+        ]
+        return [p for p in predicates if p is not None]
+
+    def select_pairs(self, source, target, core, column, columns=None):
+        """Select the target-feature pairs within range of each other
+
+        The pairs are prefiltered with :code:`candidates`, and their exact
+        distance is measured with
+        :meth:`geomancer.backend.cores.base.DBCore.distance` so that it is in
+        meters like the range.
+
+        Parameters
+        ----------
+        source : :class:`sqlalchemy.schema.Table`
+            Source table to extract features from.
+        target : :class:`sqlalchemy.schema.Table`
+            Target table to add features to.
+        core : :class:`geomancer.backend.cores.base.DBCore`
+            DBCore instance to access DB-specific methods
+        column : str
+            Column to look the target geometries from
+        columns : list of str, optional
+            Additional source columns to select
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.CTE`
+            Pairs with the target columns, the :code:`source_id` and
+            additional columns of the feature, and the :code:`distance`
+            between them, within the spell's :code:`radius`
+        """
+        features = self.select_features(source, core, "pois", columns=columns)
+        target_geom = core.geometry(target, column)
+        source_geom = core.geometry(features, "WKT")
+        distance = core.distance(target_geom, source_geom)
+        return (
+            select(
+                [
+                    *self.target_columns(target),
+                    features.c[self.source_id],
+                    *[features.c[name] for name in columns or []],
+                    distance.label("distance"),
+                ],
+                and_(
+                    *self.candidates(
+                        core,
+                        source,
+                        features,
+                        target_geom,
+                        source_geom,
+                        self.radius,
+                    ),
+                    distance < self.radius,
+                ),
+            )
+            .select_from(features)
+            .cte("pairs")
+        )
+
     def get_core(self, dburl):
-        """Instantiates an appropriate core based on given database url
+        """Get the appropriate core based on given database url
+
+        Cores are shared process-wide per database url and configuration, see
+        :meth:`geomancer.backend.cores.base.DBCore.instance`.
 
         Parameters
         ----------
@@ -93,7 +353,7 @@ class Spell(abc.ABC):
         """
         name = make_url(dburl).get_backend_name()
         Core = CORES[name]
-        return Core(dburl, self.options)
+        return Core.instance(dburl, self.options)
 
     @abc.abstractmethod
     def query(self, source, target, core, column, pkey):
@@ -126,12 +386,226 @@ class Spell(abc.ABC):
         """
         raise NotImplementedError
 
-    def _include_column(self, col, keep_index, features_only):
+    def aggregate(self, pairs):
+        """Conditional aggregate computing the feature over shared pairs
+
+        This lets :class:`geomancer.spells.fused.FusedSpell` compute several
+        spells over the same source table in a single scan. The pairs hold the
+        target columns, the :code:`source_id` and filter columns of the
+        feature, and the :code:`distance` between them.
+
+        Parameters
+        ----------
+        pairs : :class:`sqlalchemy.sql.expression.CTE`
+            Target-feature pairs within the largest radius of the fused spells
+
+        Returns
+        -------
+        :class:`sqlalchemy.sql.expression.ColumnElement`
+            Aggregate over the pairs grouped by target, :code:`NULL` if the
+            spell has no matching features for the target
+
+        Raises
+        ------
+        NotImplementedError
+            If the spell cannot be fused
+        """
+        raise NotImplementedError(
+            "{} cannot be fused".format(type(self).__name__)
+        )
+
+    def aggregates(self, pairs):
+        """Conditional aggregates computing each of the features over shared
+        pairs
+
+        Spells with several features override this, the default is the single
+        feature from :code:`aggregate`.
+
+        Parameters
+        ----------
+        pairs : :class:`sqlalchemy.sql.expression.CTE`
+            Target-feature pairs within the largest radius of the fused spells
+
+        Returns
+        -------
+        list of :class:`sqlalchemy.sql.expression.ColumnElement`
+            An aggregate for each of the :code:`feature_names`
+        """
+        return [self.aggregate(pairs)]
+
+    def evaluate(self, features, points):
+        """Compute the features in-process with a spatial index
+
+        This is used instead of :code:`query` when casting with
+        :class:`geomancer.backend.cores.local.LocalCore`.
+
+        Parameters
+        ----------
+        features : :class:`geomancer.backend.cores.local.FeatureIndex`
+            Spatial index over the source features matching the spell's filter
+        points : :class:`numpy.ndarray`
+            Target points on the unit sphere
+
+        Returns
+        -------
+        (dict, :class:`numpy.ndarray`)
+            Mapping of feature names to arrays of values per point, and a
+            boolean mask of the points to keep in the output
+
+        Raises
+        ------
+        NotImplementedError
+            If the spell can only be casted with SQL cores
+        """
+        raise NotImplementedError(
+            "{} cannot be casted with LocalCore".format(type(self).__name__)
+        )
+
+    def _include_column(self, key, keep_index, features_only):
+        if key == GEOMETRY_COLUMN:
+            return False
         if features_only:
-            return col.key in ("__index_level_0__", self.feature_name)
+            return key == "__index_level_0__" or key in self.feature_names
         if keep_index:
             return True
-        return col.key != "__index_level_0__"
+        return key != "__index_level_0__"
+
+    def _assemble(self, target, features, keep_index, features_only):
+        """Build the output of a cast from features computed in-process
+
+        Parameters
+        ----------
+        target : :class:`pandas.DataFrame`
+            Target dataframe
+        features : :class:`pandas.DataFrame`
+            Features aligned by position with the target's rows, :code:`NaN`
+            where a target has no features. Integer features may be nullable.
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Output dataframe with the same columns as the SQL cores return
+        """
+        names = self.feature_names
+        frame = self._target_frame(target)
+        for name in names:
+            frame[name] = features[name].array
+        frame = frame[frame[names].notnull().any(axis=1).to_numpy()]
+        frame = incremental.from_nullable(frame, names)
+        return self._select_output(frame, keep_index, features_only)
+
+    def _reattach(self, frame, fetched, keep_index, features_only):
+        """Join the features fetched for the geometries of a target back to
+        the rest of its columns
+
+        Parameters
+        ----------
+        frame : :class:`pandas.DataFrame`
+            Target dataframe, see :code:`_target_frame`
+        fetched : :class:`pandas.DataFrame`
+            Features fetched with :code:`features_only`, keyed on the
+            position of the targets in :code:`__index_level_0__`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Output dataframe with the same columns as the SQL cores return
+        """
+        positions = fetched["__index_level_0__"].to_numpy(dtype=int)
+        frame = frame.iloc[positions].reset_index(drop=True)
+        for name in self.feature_names:
+            frame[name] = fetched[name].to_numpy()
+        return self._select_output(frame, keep_index, features_only)
+
+    def _target_frame(self, target):
+        """Copy of a target with its index as a column"""
+        # Here we're mimicking the SQL cores by creating __index_level_0__
+        return target.reset_index().rename(
+            columns={"index": "__index_level_0__"}
+        )
+
+    def _select_output(self, frame, keep_index, features_only):
+        """Keep the output columns of an assembled dataframe"""
+        return frame[
+            [
+                name
+                for name in frame.columns
+                if self._include_column(
+                    name, keep_index or features_only, features_only
+                )
+            ]
+        ].reset_index(drop=True)
+
+    def _geometry_only(self, core, target, pkey):
+        """Whether only the geometries of a target are uploaded
+
+        See the :code:`UPLOAD_GEOMETRY_ONLY` option of the SQL cores.
+        """
+        return (
+            isinstance(target, pd.DataFrame)
+            and pkey == "__index_level_0__"
+            and core.options.UPLOAD_GEOMETRY_ONLY
+        )
+
+    def _get_cast_core(self, dburl):
+        """Get the core to cast the spell with"""
+        dburl = dburl or self.dburl
+        if not dburl:
+            raise ValueError("dburl was not supplied")
+        with instrumentation.span("get_core"):
+            return self.get_core(dburl)
+
+    def _cast_local(
+        self, core, target, column, keep_index, features_only, chunksize=None
+    ):
+        """Evaluate the spell in-process with a LocalCore"""
+        return core.cast(
+            self,
+            target,
+            column,
+            keep_index or features_only,
+            features_only,
+            chunksize or core.options.CHUNKSIZE,
+        )
+
+    def _prepare(self, core, target, column, keep_index, features_only, pkey):
+        """Build the output query of a cast
+
+        Returns
+        -------
+        tuple
+            The :class:`sqlalchemy.engine.base.Engine` and the
+            :class:`sqlalchemy.sql.expression.ClauseElement` to fetch the
+            features with
+        """
+        if features_only:
+            keep_index = True
+
+        # Get engine
+        engine = core.get_engine()
+
+        # Get source and target tables
+        source_table, target_table = core.get_tables(
+            source_uri=self.source_uri(core),
+            target=target,
+            engine=engine,
+            column=column,
+        )
+
+        with instrumentation.span("query"):
+            # Build query
+            query = self.query(source_table, target_table, core, column, pkey)
+
+            # Filter output columns
+            query = select(
+                [
+                    col
+                    for col in query.columns
+                    if self._include_column(col.key, keep_index, features_only)
+                ]
+            ).select_from(query)
+
+        return engine, query
 
     def cast(
         self,
@@ -141,6 +615,8 @@ class Spell(abc.ABC):
         keep_index=False,
         features_only=False,
         pkey="__index_level_0__",
+        as_arrow=False,
+        cache=None,
     ):
         """Apply the feature transform to an input :class:`pandas.DataFrame`
 
@@ -164,42 +640,260 @@ class Spell(abc.ABC):
             The primary key column in the database. Default is
             __index_level_0__. This is useful if the table you're passing
             :code:`cast` to is a database URL rather than a dataframe.
+        as_arrow : boolean, optional
+            Return a :class:`pyarrow.Table` instead of a DataFrame. Requires
+            pyarrow to be installed.
+        cache : :class:`geomancer.cache.ResultCache`, optional
+            Serve the features of geometries casted before from this cache,
+            and only send the others to the database. Only used for dataframe
+            targets.
 
         Returns
         -------
-        :class:`pandas.DataFrame`
+        :class:`pandas.DataFrame` or :class:`pyarrow.Table`
             Output dataframe with the features per given point
         """
-        dburl = dburl or self.dburl
-        if not dburl:
-            raise ValueError("dburl was not supplied")
+        with instrumentation.span(
+            "cast",
+            spell=", ".join(self.feature_names),
+            rows=len(target) if isinstance(target, pd.DataFrame) else None,
+        ):
+            return self._cast(
+                target,
+                dburl,
+                column,
+                keep_index,
+                features_only,
+                pkey,
+                as_arrow,
+                cache,
+            )
+
+    def _cast(
+        self,
+        target,
+        dburl,
+        column,
+        keep_index,
+        features_only,
+        pkey,
+        as_arrow,
+        cache,
+    ):
+        """Cast the spell, see :code:`cast`"""
+        if cache is not None and isinstance(target, pd.DataFrame):
+            results = cache.cast(
+                self, target, dburl, column, keep_index, features_only
+            )
+            if as_arrow:
+                pa = self._get_cast_core(dburl)._import_pyarrow()
+                return pa.Table.from_pandas(results, preserve_index=False)
+            return results
+
+        core = self._get_cast_core(dburl)
+        if isinstance(core, LocalCore):
+            results = pd.concat(
+                list(
+                    self._cast_local(
+                        core, target, column, keep_index, features_only
+                    )
+                ),
+                ignore_index=True,
+            )
+            if as_arrow:
+                pa = core._import_pyarrow()
+                return pa.Table.from_pandas(results, preserve_index=False)
+            return results
+
+        # Tables uploaded for the cast are dropped once it is done
+        with core.session():
+            return self._cast_sql(
+                core, target, column, keep_index, features_only, pkey, as_arrow
+            )
+
+    def _cast_sql(
+        self, core, target, column, keep_index, features_only, pkey, as_arrow
+    ):
+        """Cast the spell with a query against the core's database"""
+        if self._geometry_only(core, target, pkey):
+            # Only the geometries are uploaded, and the other columns of the
+            # target are joined back locally
+            engine, query = self._prepare(
+                core,
+                target[[column]].reset_index(drop=True),
+                column,
+                keep_index=True,
+                features_only=True,
+                pkey=pkey,
+            )
+            results = self._reattach(
+                self._target_frame(target),
+                core.fetch_frame(engine, query),
+                keep_index,
+                features_only,
+            )
+            if as_arrow:
+                pa = core._import_pyarrow()
+                return pa.Table.from_pandas(results, preserve_index=False)
+            return results
+
+        engine, query = self._prepare(
+            core, target, column, keep_index, features_only, pkey
+        )
 
-        if features_only:
-            keep_index = True
+        # Perform query
+        if as_arrow:
+            return core.fetch_arrow(engine, query)
+        return core.fetch_frame(engine, query)
 
-        core = self.get_core(dburl)
+    def cast_incremental(
+        self,
+        target,
+        previous,
+        dburl=None,
+        column="WKT",
+        keep_index=False,
+        features_only=False,
+        pkey="__index_level_0__",
+        changes=None,
+    ):
+        """Apply the feature transform only to new or changed rows
 
-        # Get engine
-        engine = core.get_engine()
+        The target is diffed against the output of a previous cast by primary
+        key and geometry, see :mod:`geomancer.incremental`. Only the rows that
+        are new or whose geometry changed are casted, and the others keep
+        their previous features. If the source table changed since, the rows
+        near the changed features are casted again as well.
 
-        # Get source and target tables
-        source_table, target_table = core.get_tables(
-            source_uri=self.source_table, target=target, engine=engine
+        Parameters
+        ----------
+        target : :class:`pandas.DataFrame`
+            Dataframe containing the points to compare upon
+        previous : :class:`pandas.DataFrame` or str
+            Output of a previous cast, path to a Parquet file, or table URI in
+            the database. It must hold the primary key.
+        dburl : str, optional
+            Database url used to configure backend connection
+        column : str, optional
+            Column to look the geometries from. The default is :code:`WKT`
+        keep_index : boolean, optional
+            Include index in output dataframe
+        features_only : boolean, optional
+            Only return features as output dataframe. Automatically sets
+            :code:`keep_index` to :code:`True`.
+        pkey : str, optional
+            The primary key column of the target and the previous output.
+            Default is __index_level_0__, which refers to the target's index.
+        changes : :class:`pandas.DataFrame`, optional
+            Geometries of the source features added, removed, or moved since
+            the previous cast in a :code:`WKT` column, see
+            :func:`geomancer.incremental.affected`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Output dataframe with the features per given point
+        """
+        core = self._get_cast_core(dburl)
+        previous = incremental.read_previous(previous, core)
+        unchanged, positions = incremental.diff(target, previous, column, pkey)
+        if changes is not None:
+            unchanged &= ~incremental.affected(
+                [self], target, changes, column, dburl
+            )
+        changed = target.iloc[np.flatnonzero(~unchanged)].reset_index(
+            drop=True
         )
+        logger.debug("Casting {} of {} rows".format(len(changed), len(target)))
+        if len(changed):
+            fresh = self.cast(
+                changed, dburl=dburl, column=column, features_only=True
+            ).set_index("__index_level_0__")
+        else:
+            fresh = pd.DataFrame(columns=self.feature_names)
+        features = incremental.merge(
+            previous, fresh, unchanged, positions, self.feature_names
+        )
+        return self._assemble(target, features, keep_index, features_only)
 
-        # Build query
-        query = self.query(source_table, target_table, core, column, pkey)
+    def cast_iter(
+        self,
+        target,
+        chunksize=10000,
+        dburl=None,
+        column="WKT",
+        keep_index=False,
+        features_only=False,
+        pkey="__index_level_0__",
+    ):
+        """Apply the feature transform and stream the output in chunks
 
-        # Filter output columns
-        query = select(
-            [
-                col
-                for col in query.columns
-                if self._include_column(col, keep_index, features_only)
-            ]
-        ).select_from(query)
+        Unlike :code:`cast`, the result set is never materialized as a whole:
+        rows are pulled from the backend in batches of at most
+        :code:`chunksize` and yielded as they arrive. This keeps peak memory
+        bounded for large targets and lets downstream writers start early.
 
-        # Perform query
-        results = engine.execute(query)
+        Parameters
+        ----------
+        target : :class:`pandas.DataFrame` or str
+            Object containing the points to compare upon. Can be a DataFrame or
+            a database URL.
+        chunksize : int, optional
+            Maximum number of rows per yielded chunk. Default is
+            :code:`10000`.
+        dburl : str, optional
+            Database url used to configure backend connection
+        column : str, optional
+            Column to look the geometries from. The default is :code:`WKT`
+        keep_index : boolean, optional
+            Include index in output dataframes
+        features_only : boolean, optional
+            Only return features as output dataframes. Automatically sets
+            :code:`keep_index` to :code:`True`.
+        pkey : str, optional
+            The primary key column in the database. Default is
+            __index_level_0__.
 
-        return pd.DataFrame(list(results), columns=results.keys())
+        Returns
+        -------
+        iterator of :class:`pandas.DataFrame`
+            Chunks of the output dataframe with the features per given point.
+            Against a database, the target is uploaded when the first chunk
+            is requested, and dropped once the iterator is exhausted or
+            closed.
+        """
+        core = self._get_cast_core(dburl)
+        if isinstance(core, LocalCore):
+            return self._cast_local(
+                core, target, column, keep_index, features_only, chunksize
+            )
+        return self._iter_sql(
+            core, target, chunksize, column, keep_index, features_only, pkey
+        )
+
+    def _iter_sql(
+        self, core, target, chunksize, column, keep_index, features_only, pkey
+    ):
+        """Stream the output of a query against the core's database"""
+        with core.session():
+            if self._geometry_only(core, target, pkey):
+                engine, query = self._prepare(
+                    core,
+                    target[[column]].reset_index(drop=True),
+                    column,
+                    keep_index=True,
+                    features_only=True,
+                    pkey=pkey,
+                )
+                frame = self._target_frame(target)
+                for chunk in core.fetch_iter(engine, query, chunksize):
+                    yield self._reattach(
+                        frame, chunk, keep_index, features_only
+                    )
+                return
+
+            engine, query = self._prepare(
+                core, target, column, keep_index, features_only, pkey
+            )
+            for chunk in core.fetch_iter(engine, query, chunksize):
+                yield chunk
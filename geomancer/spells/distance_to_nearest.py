@@ -24,7 +24,8 @@ the nearest embassy:
 """
 
 # Import modules
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import and_, case, func
 from sqlalchemy.sql import select
 
 from .base import Spell
@@ -57,33 +58,35 @@ class DistanceToNearest(Spell):
         self.source_column, self.source_filter = self.extract_columns(on)
         self.within = within
 
-    def query(self, source, target, core, column, pkey):
-        # Get all POIs of fclass `on`
-        pois = select(
-            [source.c[self.source_id], source.c.WKT],
-            source.c[self.source_column] == self.source_filter,
-        ).cte("pois")
-        # Compute the distance from `column` to each POI within given distance
-        distance = func.ST_Distance(
-            core.ST_GeoFromText(target.c[column]),
-            core.ST_GeoFromText(pois.c.WKT),
-        )
-        pairs = (
-            select(
-                [target, distance.label(self.feature_name)],
-                distance < self.within,
-            )
-            .select_from(pois)
-            .cte("pairs")
+    def aggregate(self, pairs):
+        matches = and_(
+            pairs.c[self.source_column] == self.source_filter,
+            pairs.c.distance < self.within,
         )
+        return func.min(case([(matches, pairs.c.distance)]))
+
+    def evaluate(self, features, points):
+        distances, _ = features.nearest(points, self.within)
+        distances = distances[:, 0]
+        return {self.feature_name: distances}, ~np.isnan(distances)
+
+    def query(self, source, target, core, column, pkey):
+        # Compute the distance from `column` to each POI of fclass `on`
+        # within given distance
+        pairs = self.select_pairs(source, target, core, column)
         # Partition results to get the smallest distance (nearest POI)
         query = select(
             [
-                pairs,
+                *[
+                    col
+                    for col in pairs.columns
+                    if col.key not in ["distance", self.source_id]
+                ],
+                pairs.c.distance.label(self.feature_name),
                 func.row_number()
                 .over(
                     partition_by=pairs.c[pkey],
-                    order_by=pairs.c[self.feature_name].asc(),
+                    order_by=pairs.c.distance.asc(),
                 )
                 .label("row_number"),
             ]
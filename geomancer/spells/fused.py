@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Spell FusedSpell computes several spells over the same source table in a single
+query. Spells such as :code:`NumberOf` and :code:`DistanceToNearest` that only
+differ in their filter and range share the same target-feature pairs: these are
+computed once within the largest range, and each feature is then obtained by a
+conditional aggregate over the pairs.
+
+.. code-block:: python
+
+    from geomancer.spells import DistanceToNearest, NumberOf
+    from geomancer.spells.fused import FusedSpell
+    from tests.conftest import sample_points
+
+    # Load sample points
+    df = sample_points()
+
+    # Fuse spells sharing a source table
+    spell = FusedSpell([
+        DistanceToNearest("embassy",
+                          source_table="geospatial.ph_osm.gis_osm_pois_free_1",
+                          feature_name="dist_embassy"),
+        NumberOf("supermarket",
+                 within=5000,
+                 source_table="geospatial.ph_osm.gis_osm_pois_free_1",
+                 feature_name="num_supermarket"),
+    ])
+
+    # Will create the columns `dist_embassy` and `num_supermarket` with a
+    # single query
+    df_with_features = spell.cast(df, dburl="bigquery://geospatial")
+
+A :code:`SpellBook` fuses its spells automatically when casting.
+"""
+
+# Import modules
+from sqlalchemy import or_
+from sqlalchemy.sql import select
+
+from .base import Spell
+
+
+class FusedSpell(Spell):
+    """Compute several spells over the same source table in a single scan"""
+
+    def __init__(self, spells):
+        """Spell constructor
+
+        Parameters
+        ----------
+        spells : list of :class:`geomancer.spells.base.Spell`
+            Spells to fuse. They must implement :code:`aggregate` and share
+            the same :code:`source_table`, :code:`source_id`, :code:`dburl`,
+            and :code:`options`.
+
+        Raises
+        ------
+        ValueError
+            If the spells cannot be fused together
+        """
+        if not spells:
+            raise ValueError("No spells to fuse")
+        first = spells[0]
+        for spell in spells:
+            if not self.supports(spell):
+                raise ValueError(
+                    "{} cannot be fused".format(type(spell).__name__)
+                )
+            if self.group_key(spell) != self.group_key(first):
+                raise ValueError(
+                    "Fused spells must share source_table, source_id, dburl "
+                    "and options"
+                )
+        super(FusedSpell, self).__init__(
+            source_table=first.source_table,
+            feature_name=None,
+            source_id=first.source_id,
+            dburl=first.dburl,
+            options=first.options,
+        )
+        self.spells = list(spells)
+        self.within = max(spell.radius for spell in spells)
+
+    @staticmethod
+    def supports(spell):
+        """Check if a spell can be fused
+
+        Parameters
+        ----------
+        spell : :class:`geomancer.spells.base.Spell`
+
+        Returns
+        -------
+        bool
+            :code:`True` if the spell implements :code:`aggregate`
+        """
+        return type(spell).aggregate is not Spell.aggregate
+
+    @staticmethod
+    def group_key(spell):
+        """Key of the spells that can be fused together
+
+        Parameters
+        ----------
+        spell : :class:`geomancer.spells.base.Spell`
+
+        Returns
+        -------
+        tuple
+        """
+        return (
+            spell.source_table,
+            spell.source_id,
+            spell.dburl,
+            spell.options,
+        )
+
+    @property
+    def feature_names(self):
+        return [name for spell in self.spells for name in spell.feature_names]
+
+    def config(self):
+        return {
+            "spells": [
+                (type(spell).__name__, sorted(spell.config().items()))
+                for spell in self.spells
+            ]
+        }
+
+    @property
+    def filter_columns(self):
+        """list of str: Source columns the fused spells filter on"""
+        columns = []
+        for spell in self.spells:
+            if spell.source_column not in columns:
+                columns.append(spell.source_column)
+        return columns
+
+    def feature_filter(self, source):
+        return or_(*[spell.feature_filter(source) for spell in self.spells])
+
+    def evaluate(self, features, points):
+        raise NotImplementedError(
+            "FusedSpell cannot be casted with LocalCore, cast its spells "
+            "instead"
+        )
+
+    def query(self, source, target, core, column, pkey):
+        # Compute the pairs of POIs matching any of the spells within the
+        # largest range of the spells
+        pairs = self.select_pairs(
+            source, target, core, column, columns=self.filter_columns
+        )
+        # Aggregate each spell's features from the shared pairs
+        keep_columns = [
+            cols
+            for cols in pairs.columns
+            if cols.key
+            not in ["distance", self.source_id, *self.filter_columns]
+        ]
+        query = (
+            select(
+                [
+                    *keep_columns,
+                    *[
+                        aggregate.label(name)
+                        for spell in self.spells
+                        for aggregate, name in zip(
+                            spell.aggregates(pairs), spell.feature_names
+                        )
+                    ],
+                ]
+            )
+            .select_from(pairs)
+            .group_by(*keep_columns)
+        )
+
+        return query
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Spell KNearest obtains the distances to the k nearest Points-of-Interest or
+geographic features. Suppose you want to find the distances to the three
+nearest hospitals:
+
+.. code-block:: python
+
+    from geomancer.spells import KNearest
+    from tests.conftest import sample_points
+
+    # Load sample points
+    df = sample_points()
+
+    # Configure and cast the spell
+    spell = KNearest("hospital",
+                     k=3,
+                     source_table="geospatial.ph_osm.gis_osm_pois_free_1",
+                     feature_name="dist_hospital")
+
+    # Will create new columns, `dist_hospital_1`, `dist_hospital_2`, and
+    # `dist_hospital_3` with the appropriate features
+    df_with_features = spell.cast(df, dburl="bigquery://geospatial")
+
+The target-feature pairs are computed once, and the features of each target
+are ranked by distance. Set :code:`ids` to also get the :code:`source_id` of
+each of the nearest features, and :code:`mean` to get their mean distance.
+Targets with fewer than k features within range have missing values for the
+others.
+"""
+
+# Import modules
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func
+from sqlalchemy.sql import select
+
+from .base import Spell
+
+
+class KNearest(Spell):
+    """Obtain the distances to the k nearest Points-of-Interest or geographic
+    features
+    """
+
+    def __init__(
+        self, on, k=3, within=10 * 1000, ids=False, mean=False, **kwargs
+    ):
+        """Spell constructor
+
+        Parameters
+        ----------
+        on : str
+            Feature class to compare upon
+        k : int, optional
+            Number of nearest features. Default is :code:`3`
+        within : float, optional
+            Look for values within a particular range. Its value is in meters,
+            the default is :code:`10,000` meters.
+        ids : bool, optional
+            Also output the :code:`source_id` of each of the nearest features
+            in the :code:`<feature_name>_id_<i>` columns. Default is
+            :code:`False`
+        mean : bool, optional
+            Also output the mean distance to the nearest features in the
+            :code:`<feature_name>_mean` column. Default is :code:`False`
+        source_table : str
+            Table URI to run queries against.
+        feature_name : str
+            Prefix of the output columns. The distance to the i-th nearest
+            feature is in the :code:`<feature_name>_<i>` column.
+        column : str, optional
+            Column to look the geometries from. The default is :code:`WKT`
+        options : :class:`geomancer.backend.settings.Config`, optional
+            Specify configuration for interacting with the database backend.
+            Auto-detected if not set.
+        """
+        super(KNearest, self).__init__(**kwargs)
+        if k < 1:
+            raise ValueError("k must be at least 1, got {}".format(k))
+        self.source_column, self.source_filter = self.extract_columns(on)
+        self.k = k
+        self.within = within
+        self.ids = ids
+        self.mean = mean
+
+    @property
+    def distance_names(self):
+        """list of str: Columns of the distances, nearest first"""
+        return [
+            "{}_{}".format(self.feature_name, i) for i in range(1, self.k + 1)
+        ]
+
+    @property
+    def id_names(self):
+        """list of str: Columns of the source IDs if :code:`ids` is set"""
+        if not self.ids:
+            return []
+        return [
+            "{}_id_{}".format(self.feature_name, i)
+            for i in range(1, self.k + 1)
+        ]
+
+    @property
+    def mean_names(self):
+        """list of str: Column of the mean distance if :code:`mean` is set"""
+        return ["{}_mean".format(self.feature_name)] if self.mean else []
+
+    @property
+    def feature_names(self):
+        return self.distance_names + self.id_names + self.mean_names
+
+    def evaluate(self, features, points):
+        distances, ids = features.nearest(points, self.within, self.k)
+        values = dict(zip(self.distance_names, distances.T))
+        for name, column in zip(self.id_names, ids.T):
+            # Built from a list so that numeric IDs get a numeric dtype, with
+            # missing neighbors as NaN as with the SQL cores
+            values[name] = pd.Series(list(column)).to_numpy()
+        found = ~np.isnan(distances)
+        if self.mean:
+            counts = found.sum(axis=1)
+            totals = np.where(found, distances, 0).sum(axis=1)
+            values[self.mean_names[0]] = np.divide(
+                totals,
+                counts,
+                out=np.full(len(points), np.nan),
+                where=counts > 0,
+            )
+        return values, found[:, 0]
+
+    def query(self, source, target, core, column, pkey):
+        # Compute the distance from `column` to each POI of fclass `on`
+        # within given distance
+        pairs = self.select_pairs(source, target, core, column)
+        # Rank the POIs of each target by distance, ties broken by ID
+        ranked = (
+            select(
+                [
+                    pairs,
+                    func.row_number()
+                    .over(
+                        partition_by=pairs.c[pkey],
+                        order_by=[
+                            pairs.c.distance.asc(),
+                            pairs.c[self.source_id].asc(),
+                        ],
+                    )
+                    .label("__rank__"),
+                ]
+            )
+            .select_from(pairs)
+            .cte("ranked")
+        )
+        # Pivot the k nearest POIs of each target into columns
+        rank = ranked.c["__rank__"]
+        keep_columns = [
+            cols
+            for cols in ranked.columns
+            if cols.key not in ["distance", self.source_id, "__rank__"]
+        ]
+        features = [
+            func.max(case([(rank == i, ranked.c.distance)])).label(name)
+            for i, name in enumerate(self.distance_names, 1)
+        ]
+        features += [
+            func.max(case([(rank == i, ranked.c[self.source_id])])).label(name)
+            for i, name in enumerate(self.id_names, 1)
+        ]
+        features += [
+            func.avg(ranked.c.distance).label(name) for name in self.mean_names
+        ]
+        query = (
+            select([*keep_columns, *features], rank <= self.k)
+            .select_from(ranked)
+            .group_by(*keep_columns)
+        )
+        return query
@@ -22,22 +22,34 @@ given a set of points:
     # appropriate features
     df_with_features = spell.cast(df, dburl="bigquery://geospatial")
 
+The lines are clipped with a buffer of :code:`within` meters around each
+target, and the lengths of the clipped lines are summed. Each buffer is built
+once per target, each line is only intersected with the buffers whose bounding
+box it overlaps, and only the clipped pieces are measured. Targets without
+lines in range are not part of the output.
 
-.. warning::
+Pass a list of ranges to :code:`within` to get the length within each of them
+in a :code:`<feature_name>_<range>` column. The lines are only matched with
+the largest buffer of each target, and are then clipped with the buffers of
+the ranges they intersect.
 
-    This spell currently doesn't work in BigQuery. In addition, the runtime for
-    casting this spell is slow.
+Long lines have bounding boxes overlapping many buffers. Subdivide them once
+with :code:`prepare_segments`, and the spell then clips the pieces of the
+lines near each target instead of the whole lines:
 
+.. code-block:: python
+
+    spell.get_core("bigquery://geospatial").prepare_segments(
+        "geospatial.ph_osm.gis_osm_roads_free_1", max_length=250
+    )
 """
 
 # Import modules
-from sqlalchemy import func
+from sqlalchemy import and_, case, func
 from sqlalchemy.sql import select
 
 from .base import Spell
-from ..backend.cores.bq import BigQueryCore
-
-from loguru import logger
+from ..backend.cores.base import GEOMETRY_COLUMN
 
 
 class LengthOf(Spell):
@@ -50,97 +62,121 @@ class LengthOf(Spell):
         ----------
         on : str
             Feature class to compare upon
-        within : float, optional
+        within : float or list of float, optional
             Look for values within a particular range. Its value is in meters,
-            the default is :code:`10,000` meters.
+            the default is :code:`10,000` meters. If a list of ranges is
+            given, the lengths are summed within each of them.
         source_table : str
             Table URI to run queries against.
         feature_name : str
-            Column name for the output feature.
+            Column name for the output feature. With a list of ranges, the
+            length within each range is in the
+            :code:`<feature_name>_<range>` column.
         column : str, optional
             Column to look the geometries from. The default is :code:`WKT`
-        options : :class:`geomancer.backend.settings.Config`
+        options : :class:`geomancer.backend.settings.Config`, optional
             Specify configuration for interacting with the database backend.
-            Default is a BigQuery Configuration
+            Auto-detected if not set.
         """
         super(LengthOf, self).__init__(**kwargs)
-        logger.warning(
-            "ST_Buffer is not yet implemented so BigQueryCore won't work: groups.google.com/d/msg/bq-gis-feedback/Yq4Ku6u2A80/ceVXU01RCgAJ"
-        )
         self.source_column, self.source_filter = self.extract_columns(on)
         self.within = within
+        # Fail early on an empty list of ranges
+        self.extract_radii(within)
 
-    def query(self, source, target, core, column, pkey):
-        # ST_Buffer is not yet implemented so BigQueryCore won't work
-        # (groups.google.com/d/msg/bq-gis-feedback/Yq4Ku6u2A80/ceVXU01RCgAJ)
-        if isinstance(core, BigQueryCore):
-            raise ValueError(
-                "The LengthOf feature is currently incompatible with \
-                BigQueryCore because ST_Buffer is not yet implemented"
-            )
+    @property
+    def feature_names(self):
+        return self.radius_names(self.radii)
 
+    def source_uri(self, core):
+        """The subdivided lines of the source table if they were prepared,
+        see :meth:`geomancer.backend.cores.base.DBCore.prepare_segments`
+        """
+        return core.segments(self.source_table) or self.source_table
+
+    def query(self, source, target, core, column, pkey):
         # Get all lines-of-interests (LOIs) of fclass `on`
-        lois = select(
-            [source.c[self.source_id], source.c.WKT],
-            source.c[self.source_column] == self.source_filter,
-        ).cte("lois")
-
-        # Create a buffer `within` a distance/radius around each centroid.
-        # The point has to be converted to EPSG:3857 so that meters can be
-        # used instead of decimal degrees for EPSG:4326.
+        lois = self.select_features(source, core, "lois")
+        loi_geom = core.geometry(lois, "WKT")
+
+        # Create a buffer `within` meters around each target, for each range
+        # if there are several. They are in the same coordinates as the LOIs
+        # so that they are never transformed, and since the CTE is referenced
+        # twice, SQLite builds them once.
+        target_geom = core.geometry(target, column)
+        radii = self.radii or [self.within]
+        buffers = ["__buffer_{}__".format(i) for i in range(len(radii))]
         buff = select(
             [
-                target,
-                func.ST_Buffer(
-                    core.ST_GeoFromText(target.c[column]), self.within
-                ).label("__buffer__"),
+                *self.target_columns(target),
+                target_geom.label(GEOMETRY_COLUMN),
+                *[
+                    core.buffer(target_geom, r).label(name)
+                    for r, name in zip(radii, buffers)
+                ],
             ]
         ).cte("buff")
 
-        # Clip the LOIs with the buffers then calculate the length of all
-        # LOIs inside each buffer.
-        clip = select(
-            [
-                buff,
-                func.ST_Intersection(
-                    core.ST_GeoFromText(lois.c.WKT),
-                    func.ST_Transform(buff.c["__buffer__"], 4326),
-                ).label("__geom__"),
-                func.ST_Length(
-                    func.ST_Intersection(
-                        func.ST_Transform(
-                            core.ST_GeoFromText(lois.c.WKT), 3857
-                        ),
-                        buff.c["__buffer__"],
-                    )
-                ).label("__len__"),
-            ],
-            func.ST_Intersects(
-                core.ST_GeoFromText(lois.c.WKT),
-                func.ST_Transform(buff.c["__buffer__"], 4326),
-            ),
-        ).cte("clip")
-
-        # Sum the length of all LOIs inside each buffer
-        sum_length = (
+        # Clip the LOIs near the largest buffer of each target and sum the
+        # lengths of the clipped pieces, within each range if there are
+        # several. Only the key is grouped on, the other target columns are
+        # joined back afterwards.
+        largest = buff.c[buffers[-1]]
+        sums = [
+            func.sum(
+                case(
+                    [
+                        (
+                            func.ST_Intersects(loi_geom, buff.c[name]),
+                            core.length(
+                                func.ST_Intersection(loi_geom, buff.c[name])
+                            ),
+                        )
+                    ],
+                    else_=0,
+                )
+            )
+            for name in buffers[:-1]
+        ]
+        sums.append(
+            func.sum(core.length(func.ST_Intersection(loi_geom, largest)))
+        )
+        lengths = (
             select(
                 [
-                    clip.c[pkey],
-                    func.sum(clip.c["__len__"]).label(self.feature_name),
-                ]
+                    buff.c[pkey],
+                    *[
+                        total.label(name)
+                        for total, name in zip(sums, self.feature_names)
+                    ],
+                ],
+                and_(
+                    *self.candidates(
+                        core,
+                        source,
+                        lois,
+                        buff.c[GEOMETRY_COLUMN],
+                        loi_geom,
+                        self.radius,
+                    ),
+                    func.ST_Intersects(loi_geom, largest),
+                ),
             )
-            .select_from(clip)
-            .group_by(clip.c[pkey])
-            .cte("sum_length")
+            .select_from(lois)
+            .group_by(buff.c[pkey])
+            .cte("lengths")
         )
 
-        # Join the sum of the length of all LOIs inside each buffer
+        # Join the lengths back to the targets
         query = select(
             [
-                col
-                for col in sum_length.columns
-                if col.key not in ("__len__", "__geom__", "__buffer__")
+                *[
+                    col
+                    for col in buff.columns
+                    if col.key not in (GEOMETRY_COLUMN, *buffers)
+                ],
+                *[lengths.c[name] for name in self.feature_names],
             ],
-            sum_length.c[pkey] == buff.c[pkey],
+            lengths.c[pkey] == buff.c[pkey],
         )
         return query
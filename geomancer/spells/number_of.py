@@ -22,10 +22,26 @@ given a set of points
     # appropriate features
     df_with_features = spell.cast(df, dburl="bigquery://geospatial")
 
+Pass a list of ranges to :code:`within` to count the features in rings of
+increasing size. The target-feature pairs are computed once within the
+largest range and counted for each range, instead of casting a spell for
+each:
+
+.. code-block:: python
+
+    spell = NumberOf("supermarket",
+                     within=[500, 1000, 2000, 5000],
+                     source_table="geospatial.ph_osm.gis_osm_pois_free_1",
+                     feature_name="num_supermarket")
+
+    # Will create the columns `num_supermarket_500`, `num_supermarket_1000`,
+    # `num_supermarket_2000`, and `num_supermarket_5000`
+    df_with_features = spell.cast(df, dburl="bigquery://geospatial")
+
 """
 
 # Import modules
-from sqlalchemy import func, distinct
+from sqlalchemy import and_, case, distinct, func
 from sqlalchemy.sql import select
 
 from .base import Spell
@@ -41,13 +57,16 @@ class NumberOf(Spell):
         ----------
         on : str
             Feature class to compare upon
-        within : float, optional
+        within : float or list of float, optional
             Look for values within a particular range. Its value is in meters,
-            the default is :code:`10,000` meters.
+            the default is :code:`10,000` meters. If a list of ranges is
+            given, the features are counted within each of them.
         source_table : str
             Table URI to run queries against.
         feature_name : str
-            Column name for the output feature.
+            Column name for the output feature. With a list of ranges, the
+            count within each range is in the
+            :code:`<feature_name>_<range>` column.
         column : str, optional
             Column to look the geometries from. The default is :code:`WKT`
         options : :class:`geomancer.backend.settings.Config`, optional
@@ -57,39 +76,69 @@ class NumberOf(Spell):
         super(NumberOf, self).__init__(**kwargs)
         self.source_column, self.source_filter = self.extract_columns(on)
         self.within = within
+        # Fail early on an empty list of ranges
+        self.extract_radii(within)
 
-    def query(self, source, target, core, column, pkey):
-        # Get all POIs of fclass `on`
-        pois = select(
-            [source.c[self.source_id], source.c.WKT],
-            source.c[self.source_column] == self.source_filter,
-        ).cte("pois")
-        # Compute the distance from `column` to each POI within given distance
-        distance = func.ST_Distance(
-            core.ST_GeoFromText(target.c[column]),
-            core.ST_GeoFromText(pois.c.WKT),
-        )
-        pairs = (
-            select(
-                [target, pois.c[self.source_id], distance.label("distance")],
-                distance < self.within,
-            )
-            .select_from(pois)
-            .cte("pairs")
+    @property
+    def feature_names(self):
+        return self.radius_names(self.radii)
+
+    def _count(self, pairs, within):
+        """Count the matching features of the shared pairs within a range"""
+        matches = and_(
+            pairs.c[self.source_column] == self.source_filter,
+            pairs.c.distance < within,
         )
-        # Partition results to get the smallest distance (nearest POI)
+        return func.count(distinct(case([(matches, pairs.c[self.source_id])])))
+
+    def aggregate(self, pairs):
+        return func.nullif(self._count(pairs, self.radius), 0)
+
+    def aggregates(self, pairs):
+        if self.radii is None:
+            return [self.aggregate(pairs)]
+        # Targets without features in the largest range are NULL, as when
+        # casted alone, while the others count zero in the smaller ranges
+        largest = self._count(pairs, self.radius)
+        return [
+            case([(largest > 0, self._count(pairs, r))]) for r in self.radii
+        ]
+
+    def evaluate(self, features, points):
+        radii = self.radii or [self.within]
+        counts = [features.count(points, r) for r in radii]
+        return dict(zip(self.feature_names, counts)), counts[-1] > 0
+
+    def query(self, source, target, core, column, pkey):
+        # Compute the distance from `column` to each POI of fclass `on`
+        # within given distance
+        pairs = self.select_pairs(source, target, core, column)
+        # Count the POIs of each target, within each range if there are
+        # several
         keep_columns = [
             cols
             for cols in pairs.columns
             if cols.key not in ["distance", self.source_id]
         ]
+        if self.radii is None:
+            counts = [func.count(distinct(pairs.c[self.source_id]))]
+        else:
+            counts = [
+                func.count(
+                    distinct(
+                        case([(pairs.c.distance < r, pairs.c[self.source_id])])
+                    )
+                )
+                for r in self.radii
+            ]
         query = (
             select(
                 [
                     *keep_columns,
-                    func.count(distinct(pairs.c[self.source_id])).label(
-                        self.feature_name
-                    ),
+                    *[
+                        count.label(name)
+                        for count, name in zip(counts, self.feature_names)
+                    ],
                 ]
             )
             .select_from(pairs)
@@ -20,16 +20,19 @@ test_requirements = ["pytest==3.6.4", "pytest-cov", "flake8==3.5.0", "tox"]
 # Warehouse-specific installations
 extras = {
     "bq": [
-        "google-cloud-bigquery[pandas,pyarrow]==1.9.0",
+        "google-cloud-bigquery[pandas,pyarrow]==1.25.0",
         "pybigquery",
-        "pyarrow==0.12.1",
+        "pyarrow==0.17.1",
     ],
     "sqlite": [],
     "psql": [],
+    "local": ["scipy"],
 }
 
 # `pip install geomancer` will install everything
-requirements = common + extras["bq"] + extras["sqlite"] + extras["psql"]
+requirements = (
+    common + extras["bq"] + extras["sqlite"] + extras["psql"] + extras["local"]
+)
 
 setup(
     name="geomancer",
@@ -40,7 +43,7 @@ setup(
     author="Thinking Machines Data Science",
     author_email="hello@thinkingmachin.es",
     url="https://github.com/thinkingmachines/geomancer",
-    packages=find_packages(exclude=["docs", "tests"]),
+    packages=find_packages(exclude=["docs", "tests", "benchmarks"]),
     include_package_data=True,
     install_requires=requirements,
     tests_require=test_requirements,
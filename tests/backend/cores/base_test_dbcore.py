@@ -2,10 +2,12 @@
 
 # Import standard library
 import uuid
+from unittest import mock
 
 # Import modules
 import pytest
 from sqlalchemy.engine.base import Engine
+from sqlalchemy.sql import select
 
 
 class BaseTestDBCore:
@@ -25,6 +27,37 @@ class BaseTestDBCore:
         engine = core.get_engine()
         assert isinstance(engine, Engine)
 
+    @pytest.mark.usefixtures("core")
+    def test_get_engine_reused(self, core):
+        """Test if get_engine() reuses the same engine until closed"""
+        engine = core.get_engine()
+        assert core.get_engine() is engine
+        core.close()
+        assert core.get_engine() is not engine
+
+    @pytest.mark.usefixtures("core")
+    def test_instance_shared(self, core):
+        """Test if instance() returns a process-wide core per dburl"""
+        Core = type(core)
+        dburl = str(core.dburl)
+        with Core.instance(dburl) as shared:
+            assert Core.instance(dburl) is shared
+        assert Core.instance(dburl) is not shared
+
+    @pytest.mark.usefixtures("core")
+    def test_instance_options_changed(self, core):
+        """Test if a registered core is found without constructing another,
+        and unregistered after its options are changed
+        """
+        Core = type(core)
+        dburl = str(core.dburl)
+        shared = Core.instance(dburl)
+        with mock.patch.object(Core, "__init__", side_effect=AssertionError):
+            assert Core.instance(dburl) is shared
+        shared.options.MAX_CONCURRENCY += 1
+        shared.close()
+        assert Core.instance(dburl) is not shared
+
     @pytest.mark.usefixtures("core", "sample_points", "test_tables")
     @pytest.mark.parametrize("use_dburl", [True, False])
     def test_get_tables_source_name(
@@ -48,6 +81,7 @@ class BaseTestDBCore:
         self, core, sample_points, test_tables, use_dburl
     ):
         """Test if target table name is a valid UUID v4"""
+        core.options.INLINE_THRESHOLD = 0
         engine = core.get_engine()
         target_uri = (
             core.load(df=sample_points, **core._inspect_options(core.options))
@@ -90,6 +124,61 @@ class BaseTestDBCore:
             set([col.name for col in target_table.columns])
         )
 
+    @pytest.mark.usefixtures("core", "sample_points", "test_tables")
+    def test_get_tables_target_geometry(
+        self, core, sample_points, test_tables
+    ):
+        """Test if uploaded targets store their parsed geometries, unless
+        they are parsed in the spells' queries
+        """
+        stored = getattr(core.options, "MATERIALIZE_GEOMETRY", True)
+        core.options.INLINE_THRESHOLD = 0
+        engine = core.get_engine()
+        source_table, target_table = core.get_tables(
+            source_uri=test_tables,
+            target=sample_points,
+            engine=engine,
+            column="WKT",
+        )
+        assert ("__geometry__" in target_table.columns) == stored
+        reflected_table = core.reflect_table(target_table.name, engine)
+        assert ("__geometry__" in reflected_table.columns) == stored
+
+    @pytest.mark.usefixtures("core", "sample_points", "test_tables")
+    def test_get_tables_inline_target(self, core, sample_points, test_tables):
+        """Test if small targets are embedded in the query"""
+        engine = core.get_engine()
+        source_table, target_table = core.get_tables(
+            source_uri=test_tables,
+            target=sample_points,
+            engine=engine,
+            column="WKT",
+        )
+        assert target_table.name == "__target__"
+        assert "__geometry__" in target_table.columns
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select([target_table.c["__index_level_0__"]])
+            ).fetchall()
+        assert sorted(row[0] for row in rows) == sample_points.index.tolist()
+
+    @pytest.mark.usefixtures("core", "sample_points", "test_tables")
+    def test_get_tables_source_cached(self, core, sample_points, test_tables):
+        """Test if source table metadata is reused until invalidated"""
+        engine = core.get_engine()
+        source_table, _ = core.get_tables(
+            source_uri=test_tables, target=sample_points, engine=engine
+        )
+        cached_table, _ = core.get_tables(
+            source_uri=test_tables, target=sample_points, engine=engine
+        )
+        assert cached_table is source_table
+        core.invalidate(test_tables)
+        reflected_table, _ = core.get_tables(
+            source_uri=test_tables, target=sample_points, engine=engine
+        )
+        assert reflected_table is not source_table
+
     @pytest.mark.usefixtures("core", "sample_points")
     def test_load(self, core, sample_points):
         """Test if load() method returns appropriate type"""
@@ -98,6 +187,14 @@ class BaseTestDBCore:
         )
         assert isinstance(target_uri, str)
 
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_load_content_addressed(self, core, sample_points):
+        """Test if load() reuses tables for identical dataframes"""
+        options = core._inspect_options(core.options)
+        target_uri = core.load(sample_points, **options)
+        assert core.load(sample_points.copy(), **options) == target_uri
+        assert core.load(sample_points.head(2), **options) != target_uri
+
     @pytest.mark.usefixtures("core", "name")
     def test_options(self, core, name):
         """Test if default options are properly set"""
@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 
+# Import standard library
+import os
+from unittest import mock
+
 # Import modules
+import pandas as pd
 import pytest
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+from sqlalchemy import Column, Float, MetaData, String, Table, create_engine
 from tests.backend.cores.base_test_dbcore import BaseTestDBCore
 
 # Import from package
+from geomancer.backend.cores import bq
 from geomancer.backend.cores.bq import BigQueryCore
 
 
@@ -27,3 +36,126 @@ class TestBigQueryCore(BaseTestDBCore):
     )
     def test_tables(self, request):
         return request.param
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake clock advanced by time.sleep, recording the sleeps"""
+    sleeps = []
+    monkeypatch.setattr(bq.time, "sleep", sleeps.append)
+    monkeypatch.setattr(bq.time, "monotonic", lambda: sum(sleeps))
+    return sleeps
+
+
+@pytest.fixture
+def upload_job():
+    """Load job returned by a mocked client"""
+    core = BigQueryCore("bigquery://project")
+    core._client = mock.Mock()
+    core._client_pid = os.getpid()
+    job = core._client.load_table_from_dataframe.return_value
+    job.job_id = "job"
+    return core, job
+
+
+def test_upload_backoff(clock, upload_job):
+    core, job = upload_job
+    job.done.side_effect = [False, False, False, True]
+    core._upload(pd.DataFrame(), None, "project.dataset.table", 60)
+    assert clock == [0.25, 0.5, 1.0]
+    job.result.assert_called_once_with()
+
+
+def test_upload_timeout(clock, upload_job):
+    core, job = upload_job
+    job.done.return_value = False
+    with pytest.raises(TimeoutError, match="job"):
+        core._upload(pd.DataFrame(), None, "project.dataset.table", 30)
+    assert sum(clock) == 30
+    assert max(clock) == bq.MAX_POLL_INTERVAL
+    job.cancel.assert_called_once_with()
+    job.result.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "fields, materialize, materialized",
+    [
+        (["WKT"], True, True),
+        (["WKT", "__geometry__"], True, False),
+        (["WKT"], False, False),
+    ],
+)
+def test_load_existing_table(upload_job, fields, materialize, materialized):
+    """Test if an existing table is reused once its geometries are parsed"""
+    core, _ = upload_job
+    core._fetch_dataset = mock.Mock()
+    core._fetch_dataset.return_value.project = "project"
+    core._fetch_dataset.return_value.dataset_id = "dataset"
+    table = core._client.get_table.return_value
+    table.expires = None
+    table.schema = [bigquery.SchemaField(name, "STRING") for name in fields]
+    df = pd.DataFrame({"WKT": ["POINT (121.0 14.6)"]})
+    table_path = core.load(
+        df,
+        "dataset",
+        column="WKT",
+        expiry=None,
+        materialize_geometry=materialize,
+    )
+    assert table_path.startswith("project.dataset.")
+    core._client.load_table_from_dataframe.assert_not_called()
+    assert core._client.query.called == materialized
+    if materialized:
+        sql = core._client.query.call_args[0][0]
+        assert sql.startswith(
+            "CREATE OR REPLACE TABLE `{}`".format(table_path)
+        )
+
+
+def test_load_index_column(upload_job):
+    """Test if the index of a target is uploaded as a column, and the
+    geometries are left to be parsed in the spells' queries
+    """
+    core, job = upload_job
+    job.done.return_value = True
+    core._fetch_dataset = mock.Mock()
+    core._fetch_dataset.return_value.project = "project"
+    core._fetch_dataset.return_value.dataset_id = "dataset"
+    core._client.get_table.side_effect = NotFound("table")
+    df = pd.DataFrame({"WKT": ["POINT (121.0 14.6)"] * 501})
+    table_path = core.load(df, "dataset", column="WKT", expiry=None)
+    uploaded = core._client.load_table_from_dataframe.call_args[0][0]
+    assert list(uploaded.columns) == ["__index_level_0__", "WKT"]
+    assert uploaded["__index_level_0__"].tolist() == list(range(501))
+    core._client.query.assert_not_called()
+    table = core._table_from_dataframe(
+        table_path, df, create_engine("sqlite://"), "WKT"
+    )
+    assert [col.name for col in table.columns] == list(uploaded.columns)
+
+
+def test_fetch_batches_pages(upload_job):
+    """Test if result pages are fetched one at a time"""
+    core, _ = upload_job
+    core.compile = mock.Mock(return_value="SELECT")
+    fetched = []
+
+    def pages():
+        for start in range(0, 6, 2):
+            fetched.append(start)
+            yield [
+                Row((i, float(i)), {"name": 0, "value": 1})
+                for i in range(start, start + 2)
+            ]
+
+    core._client.query.return_value.result.return_value.pages = pages()
+    source = Table(
+        "src", MetaData(), Column("name", String), Column("value", Float)
+    )
+    batches = core.fetch_batches(None, source.select(), 2)
+    batch = next(batches)
+    assert fetched == [0]
+    assert list(batch) == ["name", "value"]
+    assert batch["value"].dtype == "float64"
+    assert [len(batch["name"]) for batch in batches] == [2, 2]
+    core._client.query.return_value.result.assert_called_once_with(page_size=2)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+# Import modules
+import numpy as np
+import pandas as pd
+import pytest
+
+# Import from package
+from geomancer.backend.cores.local import EARTH_RADIUS
+from geomancer.spells import DistanceToNearest, KNearest, NumberOf
+
+pytest.importorskip("scipy")
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Great-circle distance in meters"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture
+def core(local_pois):
+    return local_pois
+
+
+class TestLocalCore:
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_nearest_distance(self, core, sample_points):
+        """Test if distances are great-circle distances to the nearest POI"""
+        spell = DistanceToNearest(
+            "embassy", source_table="pois", feature_name="dist_embassy"
+        )
+        results = pd.concat(
+            core.cast(spell, sample_points, "WKT", False, False)
+        )
+        coords = sample_points.WKT.str.extract(r"POINT \((\S+) (\S+)\)")
+        lon, lat = coords[0].astype(float), coords[1].astype(float)
+        expected = np.minimum(
+            haversine(lon, lat, 121.005, 14.677),
+            haversine(lon, lat, 121.010, 14.681),
+        )
+        np.testing.assert_allclose(results.dist_embassy, expected)
+        assert results.columns.tolist() == ["WKT", "code", "dist_embassy"]
+
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_k_nearest(self, core, sample_points):
+        """Test if the k nearest POIs are ranked, missing ones are NaN"""
+        spell = KNearest(
+            "embassy",
+            k=4,
+            source_table="pois",
+            feature_name="dist",
+            ids=True,
+            mean=True,
+        )
+        results = pd.concat(core.cast(spell, sample_points, "WKT", True, True))
+        coords = sample_points.WKT.str.extract(r"POINT \((\S+) (\S+)\)")
+        lon, lat = coords[0].astype(float), coords[1].astype(float)
+        first = haversine(lon, lat, 121.005, 14.677)
+        second = haversine(lon, lat, 121.010, 14.681)
+        np.testing.assert_allclose(results.dist_1, np.minimum(first, second))
+        np.testing.assert_allclose(results.dist_2, np.maximum(first, second))
+        assert results.dist_4.isnull().all()
+        assert results.dist_id_4.isnull().all()
+        assert set(results.dist_id_1) <= {1, 2}
+        np.testing.assert_allclose(
+            results.dist_mean, results[["dist_1", "dist_2"]].mean(axis=1)
+        )
+
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_count_drops_empty(self, core, sample_points):
+        """Test if targets without POIs within range are dropped"""
+        spell = NumberOf(
+            "embassy", within=300, source_table="pois", feature_name="num"
+        )
+        results = pd.concat(core.cast(spell, sample_points, "WKT", True, True))
+        assert results.columns.tolist() == ["__index_level_0__", "num"]
+        assert (results.num > 0).all()
+        assert len(results) < len(sample_points)
+
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_count_rings(self, core, sample_points):
+        """Test if a list of ranges counts the features within each"""
+        rings = NumberOf(
+            "embassy",
+            within=[1000, 300],
+            source_table="pois",
+            feature_name="num",
+        )
+        results = pd.concat(core.cast(rings, sample_points, "WKT", True, True))
+        assert results.columns.tolist() == [
+            "__index_level_0__",
+            "num_300",
+            "num_1000",
+        ]
+        assert (results.num_300 <= results.num_1000).all()
+        for within in (300, 1000):
+            spell = NumberOf(
+                "embassy",
+                within=within,
+                source_table="pois",
+                feature_name="num",
+            )
+            expected = pd.concat(
+                core.cast(spell, sample_points, "WKT", True, True)
+            ).set_index("__index_level_0__")["num"]
+            actual = results.set_index("__index_level_0__")[
+                "num_{}".format(within)
+            ]
+            assert actual[actual > 0].equals(expected)
+
+    @pytest.mark.usefixtures("core", "sample_points")
+    def test_cast_chunks(self, core, sample_points):
+        """Test if targets are evaluated in bounded chunks"""
+        spell = DistanceToNearest(
+            "embassy", source_table="pois", feature_name="dist_embassy"
+        )
+        chunks = list(core.cast(spell, sample_points, "WKT", False, False, 4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+    @pytest.mark.usefixtures("pois", "sample_points")
+    def test_read_table_from_file(self, pois, sample_points, tmpdir):
+        """Test if source tables are resolved relative to the dburl"""
+        pois.to_csv(tmpdir.join("pois.csv").strpath, index=False)
+        spell = DistanceToNearest(
+            "embassy",
+            source_table="pois",
+            feature_name="dist_embassy",
+            dburl="local://{}".format(tmpdir.strpath),
+        )
+        results = spell.cast(sample_points)
+        assert len(results) == len(sample_points)
+
+    @pytest.mark.usefixtures("core")
+    def test_non_point_geometries(self, core):
+        """Test if non-point geometries are rejected"""
+        core.register_table(
+            "roads",
+            pd.DataFrame(
+                {
+                    "osm_id": [1],
+                    "fclass": ["primary"],
+                    "WKT": ["LINESTRING (121 14, 122 15)"],
+                }
+            ),
+        )
+        with pytest.raises(ValueError, match="POINT"):
+            core.feature_index("roads", "fclass", "primary", "osm_id")
@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
 
+# Import standard library
+import os
+import sqlite3
+from unittest import mock
+
 # Import modules
+import pandas as pd
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.sql import select
 from tests.backend.cores.base_test_dbcore import BaseTestDBCore
 
 # Import from package
+from geomancer.backend.cores.base import DBCore
 from geomancer.backend.cores.sqlite import SQLiteCore
+from geomancer.backend.settings import SQLiteConfig
+from geomancer.spells import DistanceToNearest, NumberOf
 
 
 class TestSQLiteCore(BaseTestDBCore):
@@ -20,3 +31,256 @@ class TestSQLiteCore(BaseTestDBCore):
     @pytest.fixture(params=["gis_osm_pois_free_1", "gis_osm_roads_free_1"])
     def test_tables(self, request):
         return request.param
+
+    @pytest.mark.usefixtures("core", "test_tables")
+    def test_create_spatial_index(self, core, test_tables):
+        """Test if a spatial index is built and registered on the source"""
+        core.create_spatial_index(test_tables)
+        assert core.has_spatial_index(test_tables)
+        source_table = core.reflect_table(test_tables, core.get_engine())
+        assert "__geometry__" in source_table.columns
+
+    @pytest.mark.usefixtures("core")
+    def test_prepare_segments(self, core):
+        """Test if lines are subdivided into an indexed table"""
+        core.prepare_segments("gis_osm_roads_free_1", max_length=100)
+        segments_uri = core.segments("gis_osm_roads_free_1")
+        assert segments_uri == "gis_osm_roads_free_1__segments"
+        assert core.has_spatial_index(segments_uri)
+        source = core.read_table("gis_osm_roads_free_1")
+        segments = core.read_table(segments_uri)
+        assert len(segments) >= len(source)
+        assert set(segments["osm_id"]) == set(source["osm_id"])
+        assert core.segments("gis_osm_pois_free_1") is None
+
+
+@pytest.mark.usefixtures("sample_points")
+def test_inline_table(sample_points):
+    """Test if inlined targets select the same rows as the dataframe"""
+    core = SQLiteCore("sqlite://")
+    sample_points.loc[1, "code"] = None
+    engine = create_engine("sqlite://")
+    target_table = core.inline_table(sample_points)
+    with engine.connect() as conn:
+        rows = conn.execute(select([target_table])).fetchall()
+    expected = sample_points.reset_index().rename(
+        columns={"index": "__index_level_0__"}
+    )
+    assert [
+        col.key for col in target_table.columns
+    ] == expected.columns.tolist()
+    assert [tuple(row) for row in rows] == list(
+        expected.astype(object)
+        .where(expected.notnull(), None)
+        .itertuples(index=False, name=None)
+    )
+
+
+@pytest.fixture
+def scratch_core(tmpdir):
+    options = SQLiteConfig()
+    options.SCRATCH_DATABASE = str(tmpdir.join("scratch.sqlite"))
+    return SQLiteCore(
+        "sqlite:///{}".format(tmpdir.join("source.sqlite")), options
+    )
+
+
+def _scratch_tables(core):
+    conn = sqlite3.connect(core.scratch_database)
+    try:
+        return [
+            name
+            for name, in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        ]
+    finally:
+        conn.close()
+
+
+@pytest.mark.usefixtures("sample_points", "scratch_core")
+def test_load_bulk(sample_points, scratch_core):
+    """Test if load() inserts all rows and indexes the key"""
+    core = scratch_core
+    sample_points.index = sample_points.index * 10
+    sample_points.loc[10, "code"] = None
+    table_id = core.load(sample_points)
+    assert core.load(sample_points) == table_id
+    assert not os.path.exists(core.dburl.database)
+    conn = sqlite3.connect(core.scratch_database)
+    try:
+        rows = conn.execute(
+            'SELECT * FROM "{}" ORDER BY 1'.format(table_id)
+        ).fetchall()
+        indexes = conn.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = ?",
+            (table_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+    assert rows == [
+        (i * 10, wkt, None if pd.isnull(code) else code)
+        for i, (wkt, code) in enumerate(sample_points.itertuples(index=False))
+    ]
+    assert len(indexes) == 1
+
+
+@pytest.mark.usefixtures("sample_points", "scratch_core")
+def test_session_drops_tables(sample_points, scratch_core):
+    """Test if tables uploaded in a session are dropped when it ends"""
+    core = scratch_core
+    with core.session():
+        with core.session():
+            table_id = core.load(sample_points)
+        assert _scratch_tables(core) == [table_id]
+    assert _scratch_tables(core) == []
+    assert core._cached_upload(table_id) is None
+
+
+@pytest.mark.usefixtures("sample_points")
+def test_session_removes_scratch(sample_points, tmpdir):
+    """Test if the default scratch file is removed after the last session"""
+    core = SQLiteCore("sqlite:///{}".format(tmpdir.join("source.sqlite")))
+    with core.session():
+        with core.session():
+            core.load(sample_points)
+        assert os.path.exists(core.scratch_database)
+    assert not os.path.exists(core.scratch_database)
+    core.load(sample_points)
+    with core.session():
+        pass
+    assert os.path.exists(core.scratch_database)
+    core.close()
+    assert not os.path.exists(core.scratch_database)
+
+
+@pytest.mark.usefixtures("sample_points", "scratch_core")
+def test_close_drops_tables(sample_points, scratch_core):
+    """Test if tables uploaded outside of a session are dropped on close"""
+    core = scratch_core
+    table_id = core.load(sample_points)
+    assert _scratch_tables(core) == [table_id]
+    core.close()
+    assert _scratch_tables(core) == []
+
+
+def test_scratch_database(tmpdir):
+    """Test if each core has its own scratch database"""
+    first = SQLiteCore("sqlite:///{}".format(tmpdir.join("first.sqlite")))
+    second = SQLiteCore("sqlite:///{}".format(tmpdir.join("second.sqlite")))
+    again = SQLiteCore("sqlite:///{}".format(tmpdir.join("first.sqlite")))
+    assert first.scratch_database != second.scratch_database
+    assert first.scratch_database != again.scratch_database
+    assert "-{}-".format(os.getpid()) in first.scratch_database
+    assert first.worker_options().SCRATCH_DATABASE == first.scratch_database
+    assert first.options.SCRATCH_DATABASE is None
+    assert first.executor == "process"
+    options = SQLiteConfig()
+    options.SCRATCH_DATABASE = ":memory:"
+    core = SQLiteCore(
+        "sqlite:///{}".format(tmpdir.join("first.sqlite")), options
+    )
+    assert core.scratch_database.startswith("file:")
+    assert core.executor == "thread"
+    core.close()
+
+
+def test_fingerprint_updates(tmpdir):
+    """Test if the fingerprint changes when rows are updated in place"""
+    path = str(tmpdir.join("source.sqlite"))
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE pois (fclass TEXT, WKT TEXT)")
+        conn.execute("INSERT INTO pois VALUES ('embassy', 'POINT (1 1)')")
+    core = SQLiteCore("sqlite:///{}".format(path))
+    before = core.fingerprint("pois")
+    assert core.fingerprint("pois") == before
+    with conn:
+        conn.execute("UPDATE pois SET WKT = 'POINT (2 2)'")
+    conn.close()
+    assert core.fingerprint("pois") != before
+    core.close()
+
+
+@pytest.mark.parametrize("rows, inlined", [(10, True), (200, False)])
+def test_inline_parameters(rows, inlined, monkeypatch):
+    """Test if targets with more values than SQLite can bind are loaded"""
+    core = SQLiteCore("sqlite://")
+    for name in (
+        "inline_table",
+        "load",
+        "_table_from_dataframe",
+        "reflect_table",
+    ):
+        monkeypatch.setattr(core, name, mock.Mock())
+    target = pd.DataFrame(
+        {name: range(rows) for name in ["WKT", "a", "b", "c", "d"]}
+    )
+    assert rows <= core.options.INLINE_THRESHOLD
+    core.get_tables("gis_osm_pois_free_1", target, None)
+    assert core.inline_table.called == inlined
+    assert core.load.called != inlined
+
+
+@pytest.mark.parametrize("spatial_index", [False, True])
+def test_spatial_index_option(spatial_index, monkeypatch):
+    """Test if source tables are only indexed on first use if enabled"""
+    options = SQLiteConfig()
+    assert not options.SPATIAL_INDEX
+    options.SPATIAL_INDEX = spatial_index
+    core = SQLiteCore("sqlite:///source.sqlite", options)
+    monkeypatch.setattr(DBCore, "get_tables", mock.Mock())
+    monkeypatch.setattr(core, "create_spatial_index", mock.Mock())
+    core.get_tables("gis_osm_pois_free_1", "target", None)
+    assert core.create_spatial_index.called == spatial_index
+
+
+@pytest.mark.parametrize("option", ["READ_ONLY", "IMMUTABLE"])
+def test_connect_read_only(tmpdir, option):
+    """Test if the source database is not writable when read-only"""
+    path = tmpdir.join("source db.sqlite")
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE points (x INTEGER)")
+    conn.close()
+    options = SQLiteConfig()
+    setattr(options, option, True)
+    conn = SQLiteCore("sqlite:///{}".format(path), options)._connect()
+    try:
+        assert conn.execute("SELECT count(*) FROM points").fetchone() == (0,)
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO points VALUES (1)")
+    finally:
+        conn.close()
+
+
+def test_distance_in_meters(tmpdir):
+    """Test if features are compared with within in meters"""
+    path = tmpdir.join("source.sqlite")
+    conn = sqlite3.connect(str(path))
+    # About 443 meters north of the target, and about 540 meters diagonally
+    # away but within the bounding box expanded by 500 meters
+    conn.execute("CREATE TABLE pois (osm_id INTEGER, fclass TEXT, WKT TEXT)")
+    conn.executemany(
+        "INSERT INTO pois VALUES (?, ?, ?)",
+        [
+            (1, "school", "POINT (121.0000 14.6040)"),
+            (2, "school", "POINT (121.0035 14.5965)"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    dburl = "sqlite:///{}".format(path)
+    target = pd.DataFrame({"WKT": ["POINT (121.0 14.6)"]})
+    count = NumberOf(
+        "school", within=500, source_table="pois", feature_name="num"
+    ).cast(target, dburl=dburl, features_only=True)
+    assert count["num"].tolist() == [1]
+    nearest = DistanceToNearest(
+        "school", within=500, source_table="pois", feature_name="dist"
+    ).cast(target, dburl=dburl, features_only=True)
+    assert nearest["dist"].iloc[0] == pytest.approx(443, rel=0.01)
+    farther = DistanceToNearest(
+        "school", within=400, source_table="pois", feature_name="dist"
+    ).cast(target, dburl=dburl, features_only=True)
+    assert farther["dist"].isnull().all()
@@ -4,6 +4,9 @@
 import pandas as pd
 import pytest
 
+# Import from package
+from geomancer.backend.cores import LocalCore
+
 
 @pytest.fixture
 def sample_points():
@@ -16,3 +19,31 @@ def sample_points():
 def spellbook_json():
     with open("tests/data/spellbook.json") as f:
         return f.read()
+
+
+@pytest.fixture
+def pois():
+    """Return a set of POIs in a pandas.DataFrame"""
+    return pd.DataFrame(
+        {
+            "osm_id": [1, 2, 3, 4],
+            "fclass": ["embassy", "embassy", "school", "embassy"],
+            "WKT": [
+                "POINT (121.005 14.677)",
+                "POINT (121.010 14.681)",
+                "POINT (121.000 14.600)",
+                "POINT (125.000 10.000)",
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def local_pois(pois):
+    """Register the POIs as the source table :code:`pois` of the shared
+    LocalCore for :code:`local://`, which is closed afterwards
+    """
+    core = LocalCore.instance("local://")
+    core.register_table("pois", pois)
+    yield core
+    core.close()
@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 
+# Import standard library
+from unittest import mock
+
 # Import modules
 import pandas as pd
 import pytest
 
 # Import from package
-from geomancer.spellbook import SpellBook
+from geomancer.spellbook import SpellBook, SpellBookCastError
 from geomancer.spells import DistanceToNearest, NumberOf
+from geomancer.spells.base import Spell
 
 
 @pytest.mark.usefixtures("sample_points")
@@ -83,6 +87,122 @@ def test_spellbook_spells(spellbook, sample_points):
     assert "num_embassy" in df.columns
 
 
+@pytest.mark.usefixtures("spellbook", "sample_points")
+def test_spellbook_features_only(spellbook, sample_points):
+    sample_points.index = sample_points.index * 10 + 5
+    df = spellbook.cast(sample_points, features_only=True)
+    assert df.columns.tolist() == ["dist_supermarket", "num_embassy"]
+    assert df.index.equals(sample_points.index)
+    expected = sample_points.join(
+        spellbook.spells[0]
+        .cast(sample_points, features_only=True)
+        .set_index("__index_level_0__")
+    )
+    pd.testing.assert_series_equal(
+        df.dist_supermarket, expected.dist_supermarket
+    )
+
+
+@pytest.mark.usefixtures("spellbook")
+def test_spellbook_fuse_spells(spellbook):
+    spells = spellbook._fuse_spells()
+    assert len(spells) == 1
+    assert spells[0].feature_names == ["dist_supermarket", "num_embassy"]
+
+
+@pytest.mark.usefixtures("spellbook", "sample_points")
+def test_spellbook_fused_cast(spellbook, sample_points):
+    fused = spellbook.cast(sample_points)
+    unfused = spellbook.cast(sample_points, fuse=False)
+    pd.testing.assert_frame_equal(fused, unfused, check_dtype=False)
+
+
+@pytest.mark.usefixtures("sample_points")
+def test_spellbook_fused_cast_ranges(sample_points):
+    """Test if fused spells keep their own range"""
+    dburl = "sqlite:///tests/data/source.sqlite"
+    spellbook = SpellBook(
+        [
+            DistanceToNearest(
+                "supermarket",
+                within=10000,
+                source_table="gis_osm_pois_free_1",
+                feature_name="dist_supermarket",
+                dburl=dburl,
+            ),
+            NumberOf(
+                on="supermarket",
+                within=500,
+                source_table="gis_osm_pois_free_1",
+                feature_name="num_supermarket",
+                dburl=dburl,
+            ),
+            NumberOf(
+                on="embassy",
+                within=[1000, 3000],
+                source_table="gis_osm_pois_free_1",
+                feature_name="num_embassy",
+                dburl=dburl,
+            ),
+        ]
+    )
+    assert len(spellbook._fuse_spells()) == 1
+    fused = spellbook.cast(sample_points, features_only=True)
+    unfused = spellbook.cast(sample_points, fuse=False, features_only=True)
+    pd.testing.assert_frame_equal(fused, unfused, check_dtype=False)
+
+
+@pytest.mark.usefixtures("spellbook", "sample_points")
+def test_spellbook_concurrent_cast(spellbook, sample_points):
+    concurrent = spellbook.cast(sample_points, max_workers=2)
+    sequential = spellbook.cast(sample_points)
+    pd.testing.assert_frame_equal(concurrent, sequential)
+
+
+@pytest.mark.usefixtures("spellbook", "sample_points")
+def test_spellbook_concurrent_errors(spellbook, sample_points):
+    spellbook.spells.append(
+        DistanceToNearest(
+            "embassy",
+            source_table="gis_osm_pois_free_1",
+            feature_name="dist_embassy",
+        )
+    )
+    with pytest.raises(SpellBookCastError) as excinfo:
+        spellbook.cast(sample_points, max_workers=2)
+    assert list(excinfo.value.errors) == ["dist_embassy"]
+    assert excinfo.value.result.columns.tolist()[-2:] == [
+        "dist_supermarket",
+        "num_embassy",
+    ]
+
+
+@pytest.mark.usefixtures("spellbook", "sample_points")
+def test_spellbook_prepare_workers(spellbook, sample_points, monkeypatch):
+    """Test if every distinct source is prepared before casting in workers"""
+    spellbook.spells += [
+        NumberOf(
+            on="primary",
+            source_table="gis_osm_roads_free_1",
+            feature_name="num_primary",
+            dburl="sqlite:///tests/data/source.sqlite",
+        ),
+        NumberOf(
+            on="school",
+            source_table="gis_osm_pois_free_1",
+            feature_name="num_school",
+        ),
+    ]
+    core = mock.Mock(executor="process")
+    monkeypatch.setattr(Spell, "get_core", lambda self, dburl: core)
+    errors = {}
+    cores = spellbook._prepare_workers(spellbook.spells, sample_points, errors)
+    assert cores == [core] * 3 + [None]
+    assert list(errors) == [3]
+    sources = [call[0][0] for call in core.get_tables.call_args_list]
+    assert sources == ["gis_osm_pois_free_1", "gis_osm_roads_free_1"]
+
+
 @pytest.mark.usefixtures("spellbook", "spellbook_json")
 def test_spellbook_to_json(spellbook, spellbook_json):
     assert spellbook.to_json() == spellbook_json
@@ -4,6 +4,7 @@
 from collections import namedtuple
 
 # Import modules
+import pandas as pd
 import pytest
 from pandas import DataFrame
 from sqlalchemy.sql.expression import ClauseElement
@@ -59,6 +60,60 @@ class BaseTestSpell:
         results = spelldb.spell.cast(target=sample_points, dburl=spelldb.dburl)
         assert results.values.size != 0
 
+    @pytest.mark.usefixtures("spelldb", "sample_points")
+    def test_cast_excludes_geometry(self, spelldb, sample_points):
+        """Test if parsed geometries are not part of the output"""
+        results = spelldb.spell.cast(
+            target=sample_points, dburl=spelldb.dburl, keep_index=True
+        )
+        assert "__geometry__" not in results.columns
+
+    @pytest.mark.usefixtures("spelldb", "sample_points")
+    def test_cast_iter_chunks(self, spelldb, sample_points):
+        """Test if cast_iter() yields bounded chunks matching cast()"""
+        results = spelldb.spell.cast(target=sample_points, dburl=spelldb.dburl)
+        chunks = list(
+            spelldb.spell.cast_iter(
+                target=sample_points, chunksize=2, dburl=spelldb.dburl
+            )
+        )
+        assert all(isinstance(chunk, DataFrame) for chunk in chunks)
+        assert all(len(chunk) <= 2 for chunk in chunks)
+        assert sum(len(chunk) for chunk in chunks) == len(results)
+
+    @pytest.mark.usefixtures("spelldb", "sample_points")
+    def test_cast_upload_geometry_only(
+        self, spelldb, sample_points, monkeypatch
+    ):
+        """Test if uploading only the geometries gives the same output"""
+        core = spelldb.spell.get_core(spelldb.dburl)
+        flag = core.options.UPLOAD_GEOMETRY_ONLY
+        results = spelldb.spell.cast(
+            target=sample_points, dburl=spelldb.dburl, keep_index=True
+        )
+        monkeypatch.setattr(core.options, "UPLOAD_GEOMETRY_ONLY", not flag)
+        other = spelldb.spell.cast(
+            target=sample_points, dburl=spelldb.dburl, keep_index=True
+        )
+        assert other.columns.tolist() == results.columns.tolist()
+        pd.testing.assert_frame_equal(
+            other.sort_values("__index_level_0__").reset_index(drop=True),
+            results.sort_values("__index_level_0__").reset_index(drop=True),
+            check_dtype=False,
+        )
+
+    @pytest.mark.usefixtures("spelldb", "sample_points")
+    def test_cast_as_arrow(self, spelldb, sample_points):
+        """Test if cast() can return a pyarrow.Table with the same columns"""
+        pa = pytest.importorskip("pyarrow")
+        results = spelldb.spell.cast(target=sample_points, dburl=spelldb.dburl)
+        table = spelldb.spell.cast(
+            target=sample_points, dburl=spelldb.dburl, as_arrow=True
+        )
+        assert isinstance(table, pa.Table)
+        assert table.column_names == results.columns.tolist()
+        assert table.num_rows == len(results)
+
     @pytest.mark.usefixtures("spelldb")
     @pytest.mark.parametrize("on", ["fclass:embassy", "embassy"])
     def test_extract_columns_return_values(self, on, spelldb):
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# Import standard library
+import sqlite3
+
+# Import modules
+import pandas as pd
+import pytest
+from tests.spells.base_test_spell import BaseTestSpell, SpellDB
+
+# Import from package
+from geomancer.spells import KNearest
+
+params = [
+    SpellDB(
+        spell=KNearest(
+            on="embassy",
+            k=3,
+            source_table="gis_osm_pois_free_1",
+            feature_name="dist_embassy",
+            ids=True,
+            mean=True,
+        ),
+        dburl="sqlite:///tests/data/source.sqlite",
+    ),
+    pytest.param(
+        SpellDB(
+            spell=KNearest(
+                on="embassy",
+                k=3,
+                source_table="tm-geospatial.ph_osm.gis_osm_pois_free_1",
+                feature_name="dist_embassy",
+                ids=True,
+                mean=True,
+            ),
+            dburl="bigquery://tm-geospatial",
+        ),
+        marks=pytest.mark.bqtest,
+    ),
+]
+
+
+class TestKNearest(BaseTestSpell):
+    @pytest.fixture(params=params, ids=["pois-sqlite", "pois-bq"])
+    def spelldb(self, request):
+        return request.param
+
+    @pytest.mark.usefixtures("spelldb", "sample_points")
+    def test_cast_ranks_distances(self, spelldb, sample_points):
+        """Test if the k distances are in increasing order"""
+        spell = spelldb.spell
+        results = spell.cast(
+            target=sample_points, dburl=spelldb.dburl, features_only=True
+        )
+        assert results.columns.tolist() == [
+            "__index_level_0__",
+            *spell.feature_names,
+        ]
+        distances = results[spell.distance_names]
+        assert (distances.diff(axis=1).iloc[:, 1:].fillna(0) >= 0).all(None)
+        assert (
+            (results["dist_embassy_mean"] - distances.mean(axis=1)).abs()
+            < 1e-6
+        ).all()
+
+
+def test_feature_names():
+    """Test if each feature has its own column"""
+    spell = KNearest(
+        "hospital", k=2, source_table="pois", feature_name="dist", ids=True
+    )
+    assert spell.feature_names == [
+        "dist_1",
+        "dist_2",
+        "dist_id_1",
+        "dist_id_2",
+    ]
+    with pytest.raises(ValueError):
+        KNearest("hospital", k=0, source_table="pois", feature_name="dist")
+
+
+def test_distances_in_meters(tmpdir):
+    """Test if the distances of known features are in meters"""
+    path = tmpdir.join("source.sqlite")
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE pois (osm_id INTEGER, fclass TEXT, WKT TEXT)")
+    conn.executemany(
+        "INSERT INTO pois VALUES (?, ?, ?)",
+        [
+            (1, "school", "POINT (121.0000 14.6040)"),
+            (2, "school", "POINT (121.0035 14.5965)"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    target = pd.DataFrame({"WKT": ["POINT (121.0 14.6)"]})
+    results = KNearest(
+        "school",
+        k=2,
+        within=1000,
+        source_table="pois",
+        feature_name="dist",
+        ids=True,
+    ).cast(target, dburl="sqlite:///{}".format(path), features_only=True)
+    assert results["dist_1"].iloc[0] == pytest.approx(443, rel=0.01)
+    assert results["dist_2"].iloc[0] == pytest.approx(541, rel=0.01)
+    assert results[["dist_id_1", "dist_id_2"]].iloc[0].tolist() == [1, 2]
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 
+# Import standard library
+import sqlite3
+from unittest import mock
+
 # Import modules
+import pandas as pd
 import pytest
 from google.cloud import bigquery
+from sqlalchemy import Column, Integer, MetaData, String, Table
 from tests.spells.base_test_spell import BaseTestSpell, SpellDB
 
 # Import from package
+from geomancer.backend.cores.sqlite import SQLiteCore
 from geomancer.backend.settings import SQLiteConfig
 from geomancer.spells import LengthOf
 
@@ -19,12 +26,115 @@ params = [
             options=SQLiteConfig(),
         ),
         dburl="sqlite:///tests/data/source.sqlite",
-    )
+    ),
+    pytest.param(
+        SpellDB(
+            spell=LengthOf(
+                on="residential",
+                within=50,
+                source_table="tm-geospatial.ph_osm.gis_osm_roads_free_1",
+                feature_name="len_residential",
+            ),
+            dburl="bigquery://tm-geospatial",
+        ),
+        marks=pytest.mark.bqtest,
+    ),
 ]
 
 
 @pytest.mark.slow
 class TestLengthOf(BaseTestSpell):
-    @pytest.fixture(params=params, ids=["roads-sqlite"])
+    @pytest.fixture(params=params, ids=["roads-sqlite", "roads-bq"])
     def spelldb(self, request):
         return request.param
+
+
+def test_source_uri_prefers_segments():
+    """Test if the subdivided lines are used once they are prepared"""
+    spell = LengthOf(
+        "residential",
+        source_table="gis_osm_roads_free_1",
+        feature_name="len_residential",
+    )
+    core = mock.Mock()
+    core.segments.return_value = None
+    assert spell.source_uri(core) == "gis_osm_roads_free_1"
+    core.segments.return_value = "gis_osm_roads_free_1__segments"
+    assert spell.source_uri(core) == "gis_osm_roads_free_1__segments"
+
+
+def test_feature_names():
+    """Test if each range has its own column"""
+    spell = LengthOf(
+        "residential",
+        within=[1000, 250],
+        source_table="gis_osm_roads_free_1",
+        feature_name="len_residential",
+    )
+    assert spell.radius == 1000
+    assert spell.feature_names == [
+        "len_residential_250",
+        "len_residential_1000",
+    ]
+
+
+def test_query_columns(monkeypatch):
+    """Test if the lengths are returned along with the target columns"""
+    spell = LengthOf(
+        "residential",
+        within=[1000, 250],
+        source_table="roads",
+        feature_name="len_residential",
+    )
+    core = SQLiteCore("sqlite://")
+    monkeypatch.setattr(core, "has_spatial_index", lambda source_uri: False)
+    metadata = MetaData()
+    source = Table(
+        "roads",
+        metadata,
+        Column("osm_id", Integer),
+        Column("fclass", String),
+        Column("WKT", String),
+    )
+    target = Table(
+        "target",
+        metadata,
+        Column("__index_level_0__", Integer),
+        Column("WKT", String),
+        Column("code", String),
+    )
+    query = spell.query(source, target, core, "WKT", "__index_level_0__")
+    assert [col.key for col in query.columns] == [
+        "__index_level_0__",
+        "WKT",
+        "code",
+        "len_residential_250",
+        "len_residential_1000",
+    ]
+
+
+def test_geodesic_length(tmpdir):
+    """Test if lengths are geodesic meters, not Web Mercator meters
+
+    The line runs 0.01 degrees along a meridian at 60 degrees north, where
+    Web Mercator doubles lengths.
+    """
+    path = tmpdir.join("source.sqlite").strpath
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE roads (osm_id INT, fclass TEXT, WKT TEXT)")
+        conn.execute(
+            "INSERT INTO roads VALUES "
+            "(1, 'residential', 'LINESTRING (0 60, 0 60.01)')"
+        )
+    conn.close()
+    spell = LengthOf(
+        "residential",
+        within=5000,
+        source_table="roads",
+        feature_name="len_residential",
+    )
+    target = pd.DataFrame({"WKT": ["POINT (0 60.005)"]})
+    results = spell.cast(target, dburl="sqlite:///{}".format(path))
+    assert results.columns.tolist() == ["WKT", "len_residential"]
+    assert results.len_residential[0] == pytest.approx(1114.12, rel=1e-3)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 # Import modules
+import pandas as pd
 import pytest
 from google.cloud import bigquery
 from tests.spells.base_test_spell import BaseTestSpell, SpellDB
@@ -60,3 +61,54 @@ class TestNumberOf(BaseTestSpell):
     )
     def spelldb(self, request):
         return request.param
+
+
+@pytest.mark.usefixtures("sample_points")
+def test_cast_rings(sample_points):
+    """Test if a list of ranges counts the features within each"""
+    dburl = "sqlite:///tests/data/source.sqlite"
+    spell = NumberOf(
+        on="embassy",
+        within=[5000, 1000],
+        source_table="gis_osm_pois_free_1",
+        feature_name="num_embassy",
+    )
+    results = spell.cast(sample_points, dburl=dburl, features_only=True)
+    assert spell.feature_names == ["num_embassy_1000", "num_embassy_5000"]
+    assert (results[spell.feature_names].fillna(0) > 0).any(axis=None)
+    for within in (1000, 5000):
+        single = NumberOf(
+            on="embassy",
+            within=within,
+            source_table="gis_osm_pois_free_1",
+            feature_name="num_embassy",
+        ).cast(sample_points, dburl=dburl, features_only=True)
+        # Targets without features in a range are missing from the single
+        # cast, and count zero in the smaller ranges of the rings
+        merged = results.merge(single, on="__index_level_0__", how="outer")
+        counts = merged["num_embassy_{}".format(within)].fillna(0)
+        pd.testing.assert_series_equal(
+            counts,
+            merged["num_embassy"].fillna(0),
+            check_dtype=False,
+            check_names=False,
+        )
+
+
+def test_feature_names():
+    """Test if each range has its own column"""
+    spell = NumberOf(
+        "school",
+        within=[2000, 500, 1000.5],
+        source_table="pois",
+        feature_name="num",
+    )
+    assert spell.radius == 2000
+    assert spell.feature_names == ["num_500", "num_1000.5", "num_2000"]
+    single = NumberOf(
+        "school", within=500, source_table="pois", feature_name="num"
+    )
+    assert single.radius == 500
+    assert single.feature_names == ["num"]
+    with pytest.raises(ValueError):
+        NumberOf("school", within=[], source_table="pois", feature_name="num")
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+# Import standard library
+import os
+import shutil
+import sqlite3
+from unittest import mock
+
+# Import modules
+import pandas as pd
+import pytest
+
+# Import from package
+from geomancer import cache as result_cache
+from geomancer.backend.cores import LocalCore, SQLiteCore
+from geomancer.cache import ResultCache
+from geomancer.spellbook import SpellBook
+from geomancer.spells import DistanceToNearest, NumberOf
+
+pytest.importorskip("scipy")
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return ResultCache(tmpdir.strpath)
+
+
+@pytest.mark.parametrize(
+    "spell",
+    [
+        DistanceToNearest(
+            "embassy",
+            source_table="pois",
+            feature_name="dist_embassy",
+            dburl="local://",
+        ),
+        NumberOf(
+            "embassy",
+            within=100,
+            source_table="pois",
+            feature_name="num_embassy",
+            dburl="local://",
+        ),
+    ],
+)
+@pytest.mark.usefixtures("local_pois", "cache", "sample_points")
+def test_cached_cast(spell, local_pois, cache, sample_points):
+    """Test if cached casts return the same output as uncached casts"""
+    expected = spell.cast(sample_points, keep_index=True)
+    for _ in range(2):
+        results = spell.cast(sample_points, keep_index=True, cache=cache)
+        pd.testing.assert_frame_equal(results, expected)
+
+
+@pytest.mark.usefixtures("local_pois", "cache", "sample_points")
+def test_cached_cast_misses(local_pois, cache, sample_points):
+    """Test if only geometries not in cache are sent to the core"""
+    spell = DistanceToNearest(
+        "embassy",
+        source_table="pois",
+        feature_name="dist_embassy",
+        dburl="local://",
+    )
+    spell.cast(sample_points, cache=cache)
+    new_point = pd.DataFrame({"WKT": ["POINT (121.006 14.678)"], "code": [1]})
+    with mock.patch.object(
+        LocalCore, "cast", autospec=True, side_effect=LocalCore.cast
+    ) as cast:
+        results = spell.cast(
+            pd.concat([sample_points, new_point, new_point]), cache=cache
+        )
+    assert len(results) == len(sample_points) + 2
+    assert len(cast.call_args[0][2]) == 1
+
+
+@pytest.mark.usefixtures("local_pois", "cache", "sample_points")
+def test_cache_parts(local_pois, cache, sample_points, monkeypatch):
+    """Test if misses are written to new files, compacted over MAX_PARTS"""
+    monkeypatch.setattr(result_cache, "MAX_PARTS", 2)
+    spell = DistanceToNearest(
+        "embassy",
+        source_table="pois",
+        feature_name="dist_embassy",
+        dburl="local://",
+    )
+    parts = []
+    for stop in range(1, 4):
+        results = spell.cast(sample_points[:stop], cache=cache)
+        (path,) = cache._entries()
+        parts.append(len(cache._parts(path)))
+    assert parts == [1, 2, 1]
+    pd.testing.assert_frame_equal(results, spell.cast(sample_points[:3]))
+
+
+@pytest.mark.usefixtures("local_pois", "cache", "sample_points")
+def test_cached_concurrent_cast(local_pois, cache, sample_points):
+    """Test if spells casted concurrently are served from the cache"""
+    spellbook = SpellBook(
+        [
+            DistanceToNearest(
+                "embassy",
+                source_table="pois",
+                feature_name="dist_embassy",
+                dburl="local://",
+            ),
+            NumberOf(
+                "embassy",
+                within=1000,
+                source_table="pois",
+                feature_name="num_embassy",
+                dburl="local://",
+            ),
+        ]
+    )
+    expected = spellbook.cast(sample_points, max_workers=2, cache=cache)
+    assert len(os.listdir(cache.directory)) == 2
+    with mock.patch.object(
+        LocalCore, "cast", autospec=True, side_effect=LocalCore.cast
+    ) as cast:
+        results = spellbook.cast(sample_points, max_workers=2, cache=cache)
+    assert not cast.called
+    pd.testing.assert_frame_equal(results, expected)
+
+
+@pytest.mark.usefixtures("local_pois", "cache", "sample_points")
+def test_cache_invalidated(local_pois, cache, sample_points):
+    """Test if changes to the source table invalidate the cache"""
+    spell = DistanceToNearest(
+        "embassy",
+        source_table="pois",
+        feature_name="dist_embassy",
+        dburl="local://",
+    )
+    before = spell.cast(sample_points, cache=cache)
+    local_pois.register_table(
+        "pois", local_pois.read_table("pois").assign(fclass="school")
+    )
+    after = spell.cast(sample_points, cache=cache)
+    assert len(before) == len(sample_points)
+    assert after.empty
+    assert len(os.listdir(cache.directory)) == 2
+
+
+@pytest.mark.usefixtures("local_pois", "sample_points", "tmpdir")
+def test_cache_eviction(local_pois, sample_points, tmpdir):
+    """Test if least recently used files are evicted over the size limit"""
+    cache = ResultCache(tmpdir.strpath, max_bytes=1)
+    for within in (100, 200):
+        NumberOf(
+            "embassy",
+            within=within,
+            source_table="pois",
+            feature_name="num_embassy",
+            dburl="local://",
+        ).cast(sample_points, cache=cache)
+    assert len(os.listdir(cache.directory)) == 1
+
+
+@pytest.mark.usefixtures("cache", "sample_points", "tmpdir")
+def test_cached_cast_sqlite(cache, sample_points, tmpdir):
+    """Test if SQLite casts are served from the cache until the source table
+    is updated
+    """
+    path = tmpdir.join("source.sqlite").strpath
+    shutil.copy("tests/data/source.sqlite", path)
+    spell = DistanceToNearest(
+        "embassy",
+        source_table="gis_osm_pois_free_1",
+        feature_name="dist_embassy",
+        dburl="sqlite:///{}".format(path),
+    )
+    expected = spell.cast(sample_points, cache=cache)
+    with mock.patch.object(
+        SQLiteCore,
+        "get_tables",
+        autospec=True,
+        side_effect=SQLiteCore.get_tables,
+    ) as get_tables:
+        results = spell.cast(sample_points, cache=cache)
+        assert not get_tables.called
+        pd.testing.assert_frame_equal(results, expected)
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.execute(
+                "UPDATE gis_osm_pois_free_1 SET fclass = 'school' "
+                "WHERE fclass = 'embassy'"
+            )
+        conn.close()
+        results = spell.cast(sample_points, cache=cache)
+        assert get_tables.called
+    assert not expected.empty
+    assert results.empty
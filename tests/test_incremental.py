@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+# Import standard library
+from unittest import mock
+
+# Import modules
+import numpy as np
+import pandas as pd
+import pytest
+
+# Import from package
+from geomancer import incremental
+from geomancer.backend.cores import LocalCore
+from geomancer.spellbook import SpellBook
+from geomancer.spells import DistanceToNearest, NumberOf
+
+pytest.importorskip("scipy")
+
+
+@pytest.fixture
+def spells(local_pois):
+    """Return spells casted against the shared POIs"""
+    return [
+        NumberOf(
+            "embassy",
+            within=300,
+            source_table="pois",
+            feature_name="num_embassy",
+            dburl="local://",
+        ),
+        DistanceToNearest(
+            "embassy",
+            source_table="pois",
+            feature_name="dist_embassy",
+            dburl="local://",
+        ),
+    ]
+
+
+@pytest.fixture
+def changed_points(sample_points):
+    """Sample points with a moved point"""
+    df = sample_points.copy()
+    df.loc[2, "WKT"] = df.WKT[0]
+    return df
+
+
+@pytest.mark.usefixtures("spells", "sample_points", "changed_points")
+def test_cast_incremental(spells, sample_points, changed_points):
+    """Test if incremental casts return the same output as full casts"""
+    for spell in spells:
+        previous = spell.cast(sample_points.iloc[:6], keep_index=True)
+        results = spell.cast_incremental(
+            changed_points, previous, keep_index=True
+        )
+        expected = spell.cast(changed_points, keep_index=True)
+        pd.testing.assert_frame_equal(results, expected)
+
+
+@pytest.mark.usefixtures("spells", "sample_points", "changed_points")
+def test_cast_incremental_delta(spells, sample_points, changed_points):
+    """Test if only new or moved points are casted"""
+    spell = spells[1]
+    previous = spell.cast(sample_points.iloc[:6], keep_index=True)
+    with mock.patch.object(
+        LocalCore, "cast", autospec=True, side_effect=LocalCore.cast
+    ) as cast:
+        spell.cast_incremental(changed_points, previous)
+    assert cast.call_args[0][2].WKT.tolist() == [
+        changed_points.WKT[i] for i in (2, 6, 7, 8, 9)
+    ]
+
+
+@pytest.mark.usefixtures("spells", "sample_points")
+def test_cast_incremental_pkey(spells, sample_points):
+    """Test if the previous output must hold the primary key"""
+    previous = spells[0].cast(sample_points)
+    with pytest.raises(ValueError, match="keep_index=True"):
+        spells[0].cast_incremental(sample_points, previous, pkey="code_id")
+
+
+@pytest.mark.usefixtures("spells", "sample_points", "changed_points")
+def test_spellbook_cast_incremental(
+    spells, sample_points, changed_points, tmpdir
+):
+    """Test if spell books can be casted incrementally from Parquet files"""
+    spellbook = SpellBook(spells)
+    filename = tmpdir.join("previous.parquet").strpath
+    spellbook.cast(sample_points.iloc[:6]).to_parquet(filename)
+    results = spellbook.cast_incremental(changed_points, filename)
+    pd.testing.assert_frame_equal(results, spellbook.cast(changed_points))
+
+
+@pytest.mark.usefixtures("local_pois", "spells", "sample_points")
+def test_cast_incremental_changes(local_pois, spells, sample_points):
+    """Test if targets near changed source features are casted again"""
+    spellbook = SpellBook(spells)
+    previous = spellbook.cast(sample_points)
+    changes = pd.DataFrame(
+        {
+            "osm_id": [5],
+            "fclass": ["embassy"],
+            "WKT": ["POINT (121.0022 14.6756)"],
+        }
+    )
+    local_pois.register_table(
+        "pois", pd.concat([local_pois.read_table("pois"), changes])
+    )
+    results = spellbook.cast_incremental(
+        sample_points, previous, changes=changes
+    )
+    pd.testing.assert_frame_equal(results, spellbook.cast(sample_points))
+
+
+@pytest.mark.usefixtures("spells", "sample_points")
+def test_affected(spells, sample_points):
+    """Test if only changes matching the spell's filter are considered"""
+    changes = pd.DataFrame(
+        {"fclass": ["school"], "WKT": ["POINT (121.0022 14.6756)"]}
+    )
+    assert not incremental.affected(spells, sample_points, changes).any()
+    mask = incremental.affected(
+        spells[:1], sample_points, changes.drop(columns="fclass")
+    )
+    assert mask.any() and not mask.all()
+
+
+@pytest.mark.usefixtures("spells", "sample_points")
+def test_affected_sqlite(spells, sample_points):
+    """Test if changes loaded in SQLite affect the same targets"""
+    changes = pd.DataFrame(
+        {
+            "fclass": ["embassy", "school"],
+            "WKT": [sample_points.WKT[0], sample_points.WKT[5]],
+        }
+    )
+    expected = incremental.affected(spells[:1], sample_points, changes)
+    mask = incremental.affected(
+        spells[:1],
+        sample_points,
+        changes,
+        dburl="sqlite:///tests/data/source.sqlite",
+    )
+    assert expected[0] and not expected.all()
+    np.testing.assert_array_equal(mask, expected)
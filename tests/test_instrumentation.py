@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+# Import modules
+import pytest
+
+# Import from package
+from geomancer import instrumentation
+from geomancer.instrumentation import Collector
+from geomancer.spells import NumberOf
+
+pytest.importorskip("scipy")
+
+
+@pytest.fixture
+def spell(local_pois):
+    """Return a spell casted against the shared POIs"""
+    return NumberOf(
+        "embassy",
+        within=300,
+        source_table="pois",
+        feature_name="num_embassy",
+        dburl="local://",
+    )
+
+
+def test_span_nesting():
+    with Collector() as collector:
+        with instrumentation.span("outer", spell="a"):
+            with instrumentation.span("inner") as inner:
+                instrumentation.annotate(rows=3)
+    assert [span.name for span in collector.spans] == ["inner", "outer"]
+    assert inner.parent is collector.spans[1]
+    assert inner.attributes == {"spell": "a", "rows": 3}
+    assert all(span.duration >= 0 for span in collector.spans)
+
+
+def test_span_error():
+    with Collector() as collector:
+        with pytest.raises(ValueError):
+            with instrumentation.span("failing"):
+                raise ValueError("failed")
+    assert isinstance(collector.spans[0].error, ValueError)
+    assert instrumentation.current() is None
+
+
+def test_collector_unsubscribes():
+    with Collector() as collector:
+        pass
+    with instrumentation.span("ignored"):
+        pass
+    assert collector.spans == []
+    assert collector.summary().empty
+
+
+@pytest.mark.usefixtures("spell", "sample_points")
+def test_collector_cast(spell, sample_points):
+    with Collector() as collector:
+        spell.cast(sample_points)
+    df = collector.to_frame()
+    assert {"cast", "get_core", "index", "evaluate"} <= set(df.stage)
+    assert set(df.spell) == {"num_embassy"}
+    summary = collector.summary()
+    assert summary.loc["evaluate", "rows"] == len(sample_points)
+    assert summary["count"].sum() == len(df)